@@ -1,13 +1,10 @@
 # -*- coding: utf-8 -*-
-import hashlib
-
 from dj.choices import Country
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.utils.encoding import force_bytes
 from django.utils.translation import ugettext_lazy as _
 from rest_framework.authtoken.models import Token
 
@@ -174,15 +171,43 @@ class RalphUser(
     def autocomplete_str(self):
         return '{} <i>{}</i>'.format(str(self), self.department)
 
+    @property
+    def permissions_snapshot(self):
+        """
+        Snapshot of all permissions of user (computed once and kept in
+        shared cache until permissions of any user or group are changed).
+        """
+        from ralph.lib.permissions.matrix import permissions_matrix
+        return permissions_matrix.get_permissions(self)
+
+    def get_all_permissions(self, obj=None):
+        if obj is None:
+            return set(self.permissions_snapshot['perms'])
+        return super().get_all_permissions(obj=obj)
+
+    def has_perm(self, perm, obj=None):
+        if obj is None:
+            if self.is_active and self.is_superuser:
+                return True
+            return perm in self.permissions_snapshot['perms']
+        return super().has_perm(perm, obj=obj)
+
+    def has_module_perms(self, app_label):
+        if self.is_active and self.is_superuser:
+            return True
+        prefix = app_label + '.'
+        return any(
+            perm.startswith(prefix)
+            for perm in self.permissions_snapshot['perms']
+        )
+
     @property
     def permissions_hash(self):
         """
         Property used in template as a param to cache invalidation.
         Hash for caching is calculated from user ID and its permissions.
         """
-        perms_set = frozenset(self.get_all_permissions())
-        key = ':'.join((str(self.id), str(hash(perms_set))))
-        return hashlib.md5(force_bytes(key)).hexdigest()
+        return self.permissions_snapshot['hash']
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
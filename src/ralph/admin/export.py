@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming export of admin changelists.
+
+django-import-export builds the whole dataset (and the whole file) in memory
+before sending it to the user. Here objects are fetched in chunks (ordered
+by primary key, with related objects prefetched for every chunk separately)
+and rows are written as soon as they are exported:
+* CSV and TSV rows are streamed directly in the response,
+* XLSX is written incrementally (in write-only mode) to temporary file,
+  which is streamed then.
+
+Exports of more than `ASYNC_EXPORT_THRESHOLD` objects are run in background
+job, which saves exported file as an attachment (downloadable only by the
+user who requested the export).
+"""
+import csv
+import logging
+import tempfile
+
+from django.apps import apps
+from django.core.files import File
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from import_export.formats.base_formats import CSV, TSV, XLSX
+from openpyxl import Workbook
+
+from ralph.lib.external_services.base import InternalService
+
+logger = logging.getLogger(__name__)
+
+ASYNC_EXPORT_SERVICE = 'ASYNC_EXPORT'
+EXPORT_CHUNK_SIZE = 1000
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def iterate_in_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of objects of `queryset` ordered by primary key.
+
+    Every chunk is fetched by filtering on the last seen primary key (instead
+    of skipping rows with offset), so `prefetch_related` lookups of queryset
+    are applied only to objects of single chunk.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+class _Echo(object):
+    """
+    File-like object returning written value instead of storing it.
+    """
+    def write(self, value):
+        return value
+
+
+class StreamingExport(object):
+    """
+    Export of queryset using import-export `resource` to `file_format`,
+    written chunk by chunk.
+
+    Iterate over it to get parts of exported file.
+    """
+    delimiters = {
+        CSV: ',',
+        TSV: '\t',
+    }
+
+    def __init__(
+        self, resource, queryset, file_format, chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        self.resource = resource
+        self.queryset = queryset
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def supports(cls, file_format):
+        return type(file_format) in cls.delimiters or isinstance(
+            file_format, XLSX
+        )
+
+    def iter_rows_chunks(self):
+        self.resource.before_export(self.queryset)
+        # see `ralph.data_importer.mixins.ExportChunksMixin`
+        prepare_chunk = getattr(self.resource, 'prepare_export_chunk', None)
+        yield [self.resource.get_export_headers()]
+        for chunk in iterate_in_chunks(self.queryset, self.chunk_size):
+            if prepare_chunk:
+                prepare_chunk(chunk)
+            yield [self.resource.export_resource(obj) for obj in chunk]
+
+    def iter_text(self):
+        writer = csv.writer(
+            _Echo(), delimiter=self.delimiters[type(self.file_format)]
+        )
+        for rows in self.iter_rows_chunks():
+            yield ''.join(writer.writerow(row) for row in rows)
+
+    def write_xlsx(self, fileobj):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(
+            title=str(self.queryset.model._meta.verbose_name_plural)[:31]
+        )
+        for rows in self.iter_rows_chunks():
+            for row in rows:
+                # text cells, the same as in tablib export
+                sheet.append([
+                    None if value is None else str(value) for value in row
+                ])
+        workbook.save(fileobj)
+
+    def iter_xlsx(self):
+        with tempfile.TemporaryFile() as fileobj:
+            self.write_xlsx(fileobj)
+            fileobj.seek(0)
+            yield from iter(lambda: fileobj.read(STREAM_BLOCK_SIZE), b'')
+
+    def __iter__(self):
+        if isinstance(self.file_format, XLSX):
+            return self.iter_xlsx()
+        return self.iter_text()
+
+    def write(self, fileobj):
+        """
+        Write the whole export to (binary) `fileobj`.
+        """
+        if isinstance(self.file_format, XLSX):
+            self.write_xlsx(fileobj)
+            return
+        for part in self.iter_text():
+            fileobj.write(part.encode('utf-8'))
+
+
+def schedule_export(model_admin, request, format_index):
+    """
+    Create export job for changelist of `model_admin` (filtered according to
+    `request`) and queue it after commit of current transaction.
+    """
+    from ralph.lib.external_services.models import Job
+    opts = model_admin.model._meta
+    job = Job.objects.create(
+        service_name=ASYNC_EXPORT_SERVICE,
+        username=request.user.username,
+        _dumped_params=Job.prepare_params(
+            requester=request.user,
+            app_label=opts.app_label,
+            model_name=opts.model_name,
+            path=request.path,
+            query=request.GET.urlencode(),
+            file_format=format_index,
+        )
+    )
+    service = InternalService(ASYNC_EXPORT_SERVICE)
+    transaction.on_commit(lambda: service.run_async(job_id=job.id))
+    return job
+
+
+def _export_to_attachment(job):
+    from ralph.admin.sites import ralph_site
+    from ralph.attachments.models import Attachment
+    params = job.params
+    model_admin = ralph_site._registry[
+        apps.get_model(params['app_label'], params['model_name'])
+    ]
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = params['path']
+    request.GET = QueryDict(params['query'])
+    request.user = job.user
+    file_format = model_admin.get_export_formats()[params['file_format']]()
+    export = model_admin.get_streaming_export(request, file_format)
+    filename = model_admin.get_export_filename(file_format)
+    with tempfile.TemporaryFile() as fileobj:
+        export.write(fileobj)
+        # the same file could be already exported (attachments are unique)
+        attachment = Attachment.objects.filter(
+            md5=Attachment.get_md5_sum(fileobj)
+        ).first()
+        if attachment is None:
+            attachment = Attachment(
+                original_filename=filename,
+                uploaded_by=job.user,
+                mime_type=file_format.get_content_type(),
+            )
+            attachment.file.save(filename, File(fileobj))
+    return attachment, filename
+
+
+def run_async_export(job_id):
+    from ralph.lib.external_services.models import Job
+    job = Job.objects.get(pk=job_id)
+    job.start()
+    try:
+        attachment, filename = _export_to_attachment(job)
+    except Exception as e:
+        logger.exception(e)
+        job.fail(str(e))
+    else:
+        job.params.update(attachment=attachment, filename=filename)
+        job.success()
@@ -6,6 +6,7 @@ from copy import copy
 
 from django import forms
 from django.conf import settings
+from django.conf.urls import url
 from django.contrib import admin, messages
 from django.contrib.admin.templatetags.admin_static import static
 from django.contrib.admin.views.main import ORDER_VAR
@@ -14,17 +15,31 @@ from django.contrib.contenttypes.admin import GenericTabularInline
 from django.core import checks
 from django.core.exceptions import FieldDoesNotExist
 from django.db import models
-from django.http import HttpResponseRedirect
+from django.http import (
+    FileResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse
+)
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.html import format_html
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import TemplateView
 from import_export.admin import ImportExportModelAdmin
+from import_export.forms import ExportForm
+from import_export.signals import post_export
 from import_export.widgets import ForeignKeyWidget
 from mptt.admin import MPTTAdminForm, MPTTModelAdmin
 from reversion.admin import VersionAdmin
 
 from ralph.admin import widgets
 from ralph.admin.autocomplete import AjaxAutocompleteMixin
+from ralph.admin.export import (
+    ASYNC_EXPORT_SERVICE,
+    EXPORT_CHUNK_SIZE,
+    schedule_export,
+    StreamingExport
+)
 from ralph.admin.helpers import get_field_by_relation_path
 from ralph.admin.sites import ralph_site
 from ralph.admin.views.main import BULK_EDIT_VAR, BULK_EDIT_VAR_IDS
@@ -396,8 +411,19 @@ class RalphAdminMixin(DashboardChangelistMixin, RalphAutocompleteMixin):
 
 class RalphAdminImportExportMixin(ImportExportModelAdmin):
     _export_queryset_manager = None
+    export_chunk_size = EXPORT_CHUNK_SIZE
 
     def get_export_queryset(self, request):
+        # cast to list to consider all prefetch_related (django-import-export
+        # use queryset.iterator() to "save memory", but then for every row
+        # sql queries are made to fetch all m2m relations)
+        return list(self.get_lazy_export_queryset(request))
+
+    def get_lazy_export_queryset(self, request):
+        """
+        Return (not evaluated) export queryset with related objects of
+        resource selected and prefetched.
+        """
         # mark request as "exporter" request
         request._is_export = True
         queryset = super().get_export_queryset(request)
@@ -421,10 +447,110 @@ class RalphAdminImportExportMixin(ImportExportModelAdmin):
         )
         if resource_prefetch_related:
             queryset = queryset.prefetch_related(*resource_prefetch_related)
-        # cast to list to consider all prefetch_related (django-import-export
-        # use queryset.iterator() to "save memory", but then for every row
-        # sql queries are made to fetch all m2m relations)
-        return list(queryset)
+        return queryset
+
+    def get_streaming_export(self, request, file_format):
+        resource_class = self.get_export_resource_class()
+        return StreamingExport(
+            resource_class(**self.get_export_resource_kwargs(request)),
+            self.get_lazy_export_queryset(request),
+            file_format,
+            chunk_size=self.export_chunk_size,
+        )
+
+    def export_action(self, request, *args, **kwargs):
+        """
+        Stream export in formats supported by `StreamingExport` (or run it in
+        background, when there is a lot of objects to export).
+        """
+        if request.method == 'POST' and self.has_export_permission(request):
+            formats = self.get_export_formats()
+            form = ExportForm(formats, request.POST)
+            if form.is_valid():
+                format_index = int(form.cleaned_data['file_format'])
+                file_format = formats[format_index]()
+                if StreamingExport.supports(file_format):
+                    return self._streaming_export_response(
+                        request, file_format, format_index
+                    )
+        return super().export_action(request, *args, **kwargs)
+
+    def _get_changelist_url(self, request):
+        opts = self.model._meta
+        url = reverse('admin:{}_{}_changelist'.format(
+            opts.app_label, opts.model_name
+        ))
+        if request.GET:
+            url += '?' + request.GET.urlencode()
+        return url
+
+    def _streaming_export_response(self, request, file_format, format_index):
+        export = self.get_streaming_export(request, file_format)
+        threshold = settings.ASYNC_EXPORT_THRESHOLD
+        if threshold and export.queryset.count() > threshold:
+            job = schedule_export(self, request, format_index)
+            opts = self.model._meta
+            messages.info(request, format_html(
+                _(
+                    'Export is being prepared in the background. '
+                    '<a href="{}">Download it</a> when it\'s ready.'
+                ),
+                reverse(
+                    'admin:{}_{}_export_job'.format(
+                        opts.app_label, opts.model_name
+                    ),
+                    args=(job.id,)
+                )
+            ))
+            return HttpResponseRedirect(self._get_changelist_url(request))
+        response = StreamingHttpResponse(
+            export, content_type=file_format.get_content_type()
+        )
+        response['Content-Disposition'] = 'attachment; filename=%s' % (
+            self.get_export_filename(file_format),
+        )
+        post_export.send(sender=None, model=self.model)
+        return response
+
+    def export_job_view(self, request, job_id):
+        """
+        Download file exported in the background.
+        """
+        from ralph.lib.external_services.models import Job, JobStatus
+        job = get_object_or_404(
+            Job,
+            pk=job_id,
+            service_name=ASYNC_EXPORT_SERVICE,
+            username=request.user.username,
+        )
+        if job.status == JobStatus.FINISHED:
+            attachment = job.params['attachment']
+            response = FileResponse(
+                attachment.file.open('rb'), content_type=attachment.mime_type
+            )
+            response['Content-Disposition'] = 'attachment; filename=%s' % (
+                job.params['filename'],
+            )
+            return response
+        if job.is_running:
+            messages.info(request, _('Export is not ready yet.'))
+        else:
+            messages.error(request, _('Export has failed.'))
+        return HttpResponseRedirect(self._get_changelist_url(request))
+
+    def get_urls(self):
+        urls = super().get_urls()
+        opts = self.model._meta
+        _urls = [
+            url(
+                r'^export/(?P<job_id>[0-9a-f-]{36})/$',
+                self.admin_site.admin_view(self.export_job_view),
+                name='{}_{}_export_job'.format(
+                    opts.app_label, opts.model_name
+                ),
+            ),
+        ]
+        return _urls + urls
 
     def get_export_resource_class(self):
         """
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Pagination of Ralph API listings.
+
+By default limit/offset pagination with total count of objects is used.
+Clients walking through big collections could opt in to:
+* cursor (keyset) pagination, by passing `cursor` query param (empty for
+  the first page) - every page is fetched by filtering on the last seen key
+  (`cursor_ordering` of the viewset) instead of skipping `offset` rows, so
+  walking through the whole collection is linear,
+* skipping (`count=none`) or estimating (`count=estimate`) total count of
+  objects - estimated count is exact up to `estimated_count_limit` objects
+  (and this limit is returned above it, with `count_estimated` flag set), so
+  it never scans the whole (filtered) table.
+"""
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+COUNT_QUERY_PARAM = 'count'
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+
+class CountModeMixin(object):
+    """
+    Count objects of paginated queryset according to `count` query param.
+    """
+    default_count_mode = COUNT_EXACT
+    estimated_count_limit = 10000
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(COUNT_QUERY_PARAM)
+        return mode if mode in COUNT_MODES else self.default_count_mode
+
+    def count_objects(self, queryset, request):
+        """
+        Return count of objects in `queryset` (or None if client asked to
+        skip it).
+        """
+        self.count_mode = self.get_count_mode(request)
+        self.count_estimated = False
+        if self.count_mode == COUNT_NONE:
+            return None
+        if self.count_mode == COUNT_ESTIMATE:
+            count = queryset[:self.estimated_count_limit].count()
+            self.count_estimated = count >= self.estimated_count_limit
+            return count
+        return queryset.count()
+
+    def get_count_data(self):
+        data = OrderedDict([('count', self.count)])
+        if self.count_mode == COUNT_ESTIMATE:
+            data['count_estimated'] = self.count_estimated
+        return data
+
+
+class RalphCursorPagination(CountModeMixin, CursorPagination):
+    default_count_mode = COUNT_NONE
+    page_size_query_param = 'limit'
+    ordering = ('id',)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return ordering defined by the viewset (`cursor_ordering`).
+
+        Ordering requested by client (`ordering` query param) is ignored,
+        because cursor position has to be (nearly) unique.
+        """
+        return tuple(getattr(view, 'cursor_ordering', None) or self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.count_objects(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict(
+            list(self.get_count_data().items()) + [
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data),
+            ]
+        ))
+
+
+class RalphPagination(CountModeMixin, LimitOffsetPagination):
+    """
+    Limit/offset pagination, switched to cursor pagination when `cursor`
+    query param is passed.
+
+    When total count is skipped or estimated, one more object is fetched to
+    check if there is next page.
+    """
+    cursor_pagination_class = RalphCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            results = self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+            self.display_page_controls = (
+                self.cursor_paginator.display_page_controls
+            )
+            return results
+        if self.get_count_mode(request) == COUNT_EXACT:
+            self.count_mode = COUNT_EXACT
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.request = request
+        self.count = self.count_objects(queryset, request)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return Response(OrderedDict(
+            list(self.get_count_data().items()) + [
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data),
+            ]
+        ))
+
+    def get_next_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.limit_query_param,
+            self.limit
+        )
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def to_html(self):
+        if self.cursor_paginator:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
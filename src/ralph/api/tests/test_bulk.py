@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from rest_framework import status
+from rest_framework.test import APITestCase
+from reversion.models import Version
+
+from ralph.accounts.api import RalphUserViewSet
+from ralph.assets.api.views import ManufacturerViewSet
+from ralph.assets.models import Manufacturer
+from ralph.assets.tests.factories import ManufacturerFactory
+
+
+@patch.object(ManufacturerViewSet, 'bulk_write', True)
+class BulkWriteViewSetTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+        self.manufacturer_1 = ManufacturerFactory(name='Dell')
+        self.manufacturer_2 = ManufacturerFactory(name='HP')
+
+    def test_bulk_create(self):
+        response = self.client.post(
+            '/api/manufacturers/bulk/', [{'name': 'A'}, {'name': 'B'}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([obj['name'] for obj in response.data], ['A', 'B'])
+        self.assertEqual(Manufacturer.objects.count(), 4)
+
+    def test_bulk_create_saves_single_revision(self):
+        self.client.post(
+            '/api/manufacturers/bulk/', [{'name': 'A'}, {'name': 'B'}],
+            format='json'
+        )
+        versions = Version.objects.get_for_model(Manufacturer)
+        self.assertEqual(versions.count(), 2)
+        self.assertEqual(
+            len({version.revision_id for version in versions}), 1
+        )
+
+    def test_bulk_update(self):
+        response = self.client.patch('/api/manufacturers/bulk/', [
+            {'id': self.manufacturer_1.id, 'name': 'Dell2'},
+            {'id': self.manufacturer_2.id, 'name': 'HP2'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.manufacturer_1.refresh_from_db()
+        self.manufacturer_2.refresh_from_db()
+        self.assertEqual(self.manufacturer_1.name, 'Dell2')
+        self.assertEqual(self.manufacturer_2.name, 'HP2')
+
+    def test_bulk_update_of_not_existing_object(self):
+        response = self.client.patch('/api/manufacturers/bulk/', [
+            {'id': self.manufacturer_1.id, 'name': 'Dell2'},
+            {'id': 999999, 'name': 'HP2'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        self.manufacturer_1.refresh_from_db()
+        self.assertEqual(self.manufacturer_1.name, 'Dell')
+
+    def test_bulk_upsert(self):
+        response = self.client.put('/api/manufacturers/bulk/', [
+            {'id': self.manufacturer_1.id, 'name': 'Dell2'},
+            {'name': 'Lenovo'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.manufacturer_1.refresh_from_db()
+        self.assertEqual(self.manufacturer_1.name, 'Dell2')
+        self.assertTrue(Manufacturer.objects.filter(name='Lenovo').exists())
+
+    def test_bulk_create_with_invalid_object_saves_nothing(self):
+        response = self.client.post('/api/manufacturers/bulk/', [
+            {'name': 'A'}, {'name': 'Dell'}, {'name': 'B'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('name', response.data[1])
+        self.assertEqual(response.data[2], {})
+        self.assertEqual(Manufacturer.objects.count(), 2)
+
+    def test_bulk_save_requires_list(self):
+        for data in ({'name': 'A'}, []):
+            response = self.client.post(
+                '/api/manufacturers/bulk/', data, format='json'
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_bulk_save_without_permissions(self):
+        get_user_model().objects.create_user(
+            'regular', 'regular@test.test', 'regular'
+        )
+        self.client.login(username='regular', password='regular')
+        response = self.client.post(
+            '/api/manufacturers/bulk/', [{'name': 'A'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Manufacturer.objects.count(), 2)
+
+    def test_bulk_save_integrity_error(self):
+        with patch.object(
+            ManufacturerViewSet, 'perform_create',
+            side_effect=IntegrityError('UNIQUE constraint failed: xyz')
+        ):
+            response = self.client.post(
+                '/api/manufacturers/bulk/', [{'name': 'A'}], format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data[0],
+            {'non_field_errors': ['Object could not be saved.']}
+        )
+
+    @patch.object(RalphUserViewSet, 'bulk_write', True)
+    def test_bulk_upsert_does_not_create_when_post_is_not_allowed(self):
+        user = get_user_model().objects.get(username='test')
+        response = self.client.put('/api/users/bulk/', [
+            {'id': user.id, 'first_name': 'Test'},
+            {'username': 'new'},
+        ], format='json')
+        self.assertEqual(
+            response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(username='new').exists()
+        )
+
+
+class BulkWriteDisabledTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+
+    def test_bulk_save_is_disabled_by_default(self):
+        response = self.client.post(
+            '/api/manufacturers/bulk/', [{'name': 'A'}], format='json'
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+        self.assertFalse(Manufacturer.objects.exists())
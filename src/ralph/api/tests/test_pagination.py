@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from ralph.api.pagination import RalphPagination
+from ralph.assets.models import BaseObject
+from ralph.assets.tests.factories import ManufacturerFactory
+from ralph.back_office.tests.factories import BackOfficeAssetFactory
+from ralph.data_center.tests.factories import DataCenterAssetFactory
+
+
+class RalphPaginationTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+        self.manufacturers = [
+            ManufacturerFactory(name='manufacturer {}'.format(i))
+            for i in range(5)
+        ]
+
+    def _walk(self, url):
+        ids = []
+        responses = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            responses.append(response)
+            ids.extend(obj['id'] for obj in response.data['results'])
+            url = response.data['next']
+        return ids, responses
+
+    def test_limit_offset_pagination_with_count(self):
+        response = self.client.get('/api/manufacturers/?limit=2')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('offset=2', response.data['next'])
+
+    def test_limit_offset_pagination_without_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            ids, responses = self._walk(
+                '/api/manufacturers/?limit=2&count=none'
+            )
+        self.assertEqual(
+            ids, [manufacturer.id for manufacturer in self.manufacturers]
+        )
+        self.assertEqual(len(responses), 3)
+        self.assertIsNone(responses[0].data['count'])
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_limit_offset_pagination_with_estimated_count(self):
+        with patch.object(RalphPagination, 'estimated_count_limit', 3):
+            response = self.client.get(
+                '/api/manufacturers/?limit=2&count=estimate'
+            )
+        self.assertEqual(response.data['count'], 3)
+        self.assertTrue(response.data['count_estimated'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_cursor_pagination(self):
+        ids, responses = self._walk('/api/manufacturers/?limit=2&cursor=')
+        self.assertEqual(
+            ids, [manufacturer.id for manufacturer in self.manufacturers]
+        )
+        self.assertEqual(len(responses), 3)
+        self.assertIsNone(responses[0].data['count'])
+        self.assertIsNone(responses[0].data['previous'])
+        self.assertIsNotNone(responses[1].data['previous'])
+
+    def test_cursor_pagination_ignores_requested_ordering(self):
+        ids, _ = self._walk(
+            '/api/manufacturers/?limit=2&cursor=&ordering=-name'
+        )
+        self.assertEqual(
+            ids, [manufacturer.id for manufacturer in self.manufacturers]
+        )
+
+    def test_cursor_pagination_with_filter_and_count(self):
+        ids, responses = self._walk(
+            '/api/manufacturers/?limit=1&cursor=&count=exact'
+            '&name=manufacturer 3'
+        )
+        self.assertEqual(ids, [self.manufacturers[3].id])
+        self.assertEqual(responses[0].data['count'], 1)
+
+    def test_cursor_pagination_of_polymorphic_objects(self):
+        DataCenterAssetFactory.create_batch(2)
+        BackOfficeAssetFactory.create_batch(2)
+        ids, _ = self._walk('/api/base-objects/?limit=2&cursor=')
+        self.assertEqual(ids, list(
+            BaseObject.objects.order_by('id').values_list('id', flat=True)
+        ))
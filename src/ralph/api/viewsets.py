@@ -1,9 +1,23 @@
 # -*- coding: utf-8 -*-
 import inspect
+import logging
 
 from django.contrib.admin import SimpleListFilter
+from django.db import IntegrityError, transaction
+from django.utils.translation import ugettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, relations, viewsets
+from rest_framework import (
+    exceptions,
+    filters,
+    permissions,
+    relations,
+    status,
+    viewsets
+)
+from rest_framework.decorators import list_route
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from reversion import revisions as reversion
 
 from ralph.admin.sites import ralph_site
 from ralph.api.filters import (
@@ -14,6 +28,7 @@ from ralph.api.filters import (
     PolymorphicDescendantsFilterBackend,
     TagsFilterBackend
 )
+from ralph.api.pagination import RalphPagination
 from ralph.api.serializers import RalphAPISaveSerializer, ReversedChoiceField
 from ralph.api.utils import QuerysetRelatedMixin
 from ralph.lib.custom_fields.api import CustomFieldsFilterBackend
@@ -21,6 +36,9 @@ from ralph.lib.permissions.api import (
     PermissionsForObjectFilter,
     RalphPermission
 )
+from ralph.signals import coalesce_post_commit
+
+logger = logging.getLogger(__name__)
 
 
 class AdminSearchFieldsMixin(object):
@@ -73,6 +91,10 @@ class RalphAPIViewSetMixin(QuerysetRelatedMixin, AdminSearchFieldsMixin):
         CustomFieldsFilterBackend
     ]
     permission_classes = [RalphPermission]
+    pagination_class = RalphPagination
+    # ordering used in cursor pagination (`?cursor=`); first field should be
+    # unique or nearly unique (ex. ('modified', 'id'))
+    cursor_ordering = ('id',)
     save_serializer_class = None
     # define dict of extended filters by single field name (usefull for
     # polymorphic models)
@@ -127,6 +149,154 @@ class RalphAPIViewSetMixin(QuerysetRelatedMixin, AdminSearchFieldsMixin):
         return base_serializer
 
 
+class BulkWriteViewSetMixin(object):
+    """
+    Bulk create (POST), update (PATCH) and upsert (PUT) of objects using
+    list of objects as a payload (`<resource>/bulk/`).
+
+    Every object is validated and saved using the same serializer (and
+    viewset hooks) as single object, but the whole batch is saved in single
+    transaction and history revision, and post commit handlers (ex. publishing
+    host updates) are called once for every saved object. Objects to update
+    are matched by `bulk_lookup_field` (fetched using single query).
+
+    When any object is invalid, nothing is saved and errors are returned as
+    a list (in the same order as objects in the payload).
+
+    Bulk endpoint has to be turned on (`bulk_write`) for every viewset.
+    Objects are created (also by upsert) only when viewset allows POST.
+    """
+    bulk_write = False
+    bulk_lookup_field = 'id'
+    bulk_max_size = 1000
+
+    @list_route(methods=['post', 'patch', 'put'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        if not self.bulk_write:
+            raise exceptions.MethodNotAllowed(request.method)
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise exceptions.ValidationError(
+                _('Expected non-empty list of objects.')
+            )
+        if len(items) > self.bulk_max_size:
+            raise exceptions.ValidationError(
+                _('Too many objects (max %(max)s).') % {
+                    'max': self.bulk_max_size
+                }
+            )
+        if request.method == 'POST':
+            self._check_bulk_create_allowed(request)
+        instances = self._get_bulk_instances(items)
+        if request.method == 'PUT':
+            self._check_bulk_add_permission(request, items, instances)
+        with transaction.atomic():
+            with coalesce_post_commit(), reversion.create_revision():
+                reversion.set_comment('API Bulk Save')
+                reversion.set_user(request.user)
+                results, errors = self._bulk_save(
+                    request.method, items, instances
+                )
+            if any(errors):
+                transaction.set_rollback(True)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            results,
+            status=(
+                status.HTTP_201_CREATED
+                if request.method == 'POST' else status.HTTP_200_OK
+            )
+        )
+
+    def _get_bulk_lookup_value(self, item):
+        if isinstance(item, dict):
+            return item.get(self.bulk_lookup_field)
+        return None
+
+    def _get_bulk_instances(self, items):
+        """
+        Return objects (to which user has access) matching payload items,
+        by the value of `bulk_lookup_field`.
+        """
+        if self.request.method == 'POST':
+            return {}
+        values = {
+            str(value) for value in map(self._get_bulk_lookup_value, items)
+            if value is not None
+        }
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{
+            '{}__in'.format(self.bulk_lookup_field): values
+        })
+        return {
+            str(getattr(obj, self.bulk_lookup_field)): obj for obj in queryset
+        }
+
+    def _check_bulk_create_allowed(self, request):
+        """
+        Check if objects could be created using this viewset.
+        """
+        if 'post' not in self.http_method_names:
+            raise exceptions.MethodNotAllowed(request.method)
+
+    def _check_bulk_add_permission(self, request, items, instances):
+        """
+        Check if user could create objects, when any of upserted objects does
+        not exist yet.
+        """
+        model = self.get_queryset().model
+        if all(
+            str(self._get_bulk_lookup_value(item)) in instances
+            for item in items
+        ):
+            return
+        self._check_bulk_create_allowed(request)
+        perms = RalphPermission().get_required_permissions('POST', model)
+        if not request.user.has_any_perms(perms):
+            self.permission_denied(request)
+
+    def _bulk_save(self, method, items, instances):
+        results = []
+        errors = []
+        for item in items:
+            instance = None
+            if method != 'POST':
+                instance = instances.get(
+                    str(self._get_bulk_lookup_value(item))
+                )
+                if instance is None and method == 'PATCH':
+                    errors.append({
+                        self.bulk_lookup_field: [_('Object not found.')]
+                    })
+                    continue
+            if instance is None:
+                serializer = self.get_serializer(data=item)
+            else:
+                serializer = self.get_serializer(
+                    instance, data=item, partial=method == 'PATCH'
+                )
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            try:
+                with transaction.atomic():
+                    if instance is None:
+                        self.perform_create(serializer)
+                    else:
+                        self.perform_update(serializer)
+            except IntegrityError:
+                logger.exception('Bulk save of %s failed', item)
+                errors.append({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        _('Object could not be saved.')
+                    ]
+                })
+                continue
+            errors.append({})
+            results.append(serializer.data)
+        return results, errors
+
+
 _viewsets_registry = {}
 
 
@@ -146,6 +316,7 @@ class RalphAPIViewSetMetaclass(type):
 
 class RalphAPIViewSet(
     RalphAPIViewSetMixin,
+    BulkWriteViewSetMixin,
     viewsets.ModelViewSet,
     metaclass=RalphAPIViewSetMetaclass
 ):
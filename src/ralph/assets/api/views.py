@@ -172,6 +172,7 @@ class AssetHolderViewSet(RalphAPIViewSet):
 class EthernetViewSet(RalphAPIViewSet):
     queryset = models.Ethernet.objects.all()
     serializer_class = serializers.EthernetSerializer
+    bulk_write = True
     filter_fields = ["base_object", "ipaddress__address"]
     prefetch_related = ["base_object", "base_object__tags"]
 
@@ -190,6 +191,7 @@ class EthernetViewSet(RalphAPIViewSet):
 class MemoryViewSet(RalphAPIViewSet):
     queryset = models.Memory.objects.all()
     serializer_class = serializers.MemorySerializer
+    bulk_write = True
     filter_fields = ["base_object", "size"]
     prefetch_related = ["base_object", "base_object__tags"]
 
@@ -197,6 +199,7 @@ class MemoryViewSet(RalphAPIViewSet):
 class FibreChannelCardViewSet(RalphAPIViewSet):
     queryset = models.FibreChannelCard.objects.all()
     serializer_class = serializers.FibreChannelCardSerializer
+    bulk_write = True
     filter_fields = ["base_object", "wwn"]
     prefetch_related = ["base_object", "base_object__tags"]
 
@@ -204,6 +207,7 @@ class FibreChannelCardViewSet(RalphAPIViewSet):
 class ProcessorViewSet(RalphAPIViewSet):
     queryset = models.Processor.objects.all()
     serializer_class = serializers.ProcessorSerializer
+    bulk_write = True
     filter_fields = ["base_object", "cores"]
     prefetch_related = ["base_object", "base_object__tags"]
 
@@ -211,6 +215,7 @@ class ProcessorViewSet(RalphAPIViewSet):
 class DiskViewSet(RalphAPIViewSet):
     queryset = models.Disk.objects.all()
     serializer_class = serializers.DiskSerializer
+    bulk_write = True
     filter_fields = ["base_object", "serial_number", "size"]
     prefetch_related = ["base_object", "base_object__tags"]
 
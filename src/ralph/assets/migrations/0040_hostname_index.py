@@ -0,0 +1,19 @@
+# Generated by Django 2.0.13 on 2026-10-18 23:25
+
+from django.db import migrations
+import ralph.lib.mixins.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0039_merge_20241008_1243'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='asset',
+            name='hostname',
+            field=ralph.lib.mixins.fields.NullableCharFieldWithAutoStrip(blank=True, db_index=True, default=None, max_length=255, null=True, verbose_name='hostname'),
+        ),
+    ]
@@ -6,7 +6,7 @@ from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 from mptt.models import MPTTModel, TreeForeignKey
 
@@ -294,6 +294,11 @@ class Category(
 
 
 class AssetLastHostname(models.Model):
+    # number of candidates checked in the first (and the biggest) round of
+    # looking for free hostnames
+    FREE_HOSTNAMES_WINDOW = 10
+    MAX_FREE_HOSTNAMES_WINDOW = 1000
+
     prefix = models.CharField(max_length=30, db_index=True)
     counter = models.PositiveIntegerField(default=1)
     postfix = models.CharField(max_length=30, db_index=True)
@@ -325,23 +330,99 @@ class AssetLastHostname(models.Model):
             return obj
 
     @classmethod
-    def get_next_free_hostname(
-        cls, prefix, postfix, fill=5, availability_checker=None, _counter=1
+    def _get_next_free_counters(
+        cls, prefix, postfix, fill, counter, count, taken_filter=None
+    ):
+        """
+        Return `count` next free counters (greater than `counter`).
+
+        Candidates are checked in windows (growing twice every round), so
+        `taken_filter` is called once per window instead of once per
+        candidate. `taken_filter` receives list of hostnames and should
+        return (lowercased) set of taken ones.
+        """
+        counters = []
+        window = max(2 * count, cls.FREE_HOSTNAMES_WINDOW)
+        while len(counters) < count:
+            candidates = [
+                (
+                    cls(
+                        prefix=prefix, counter=candidate, postfix=postfix
+                    ).formatted_hostname(fill=fill),
+                    candidate
+                )
+                for candidate in range(counter + 1, counter + window + 1)
+            ]
+            taken = set()
+            if taken_filter is not None:
+                taken = taken_filter([hostname for hostname, _ in candidates])
+            counters.extend(
+                candidate for hostname, candidate in candidates
+                if hostname.lower() not in taken
+            )
+            counter += window
+            window = min(2 * window, cls.MAX_FREE_HOSTNAMES_WINDOW)
+        return counters[:count]
+
+    @classmethod
+    def get_next_free_hostnames(
+        cls, prefix, postfix, fill=5, count=1, taken_filter=None
     ):
+        """
+        Return `count` next free hostnames (without reserving them).
+        """
         try:
-            last_hostname = cls.objects.get(prefix=prefix, postfix=postfix)
+            counter = cls.objects.get(prefix=prefix, postfix=postfix).counter
         except cls.DoesNotExist:
-            last_hostname = cls(prefix=prefix, postfix=postfix, counter=0)
+            counter = 0
+        return [
+            cls(
+                prefix=prefix, counter=free_counter, postfix=postfix
+            ).formatted_hostname(fill=fill)
+            for free_counter in cls._get_next_free_counters(
+                prefix, postfix, fill, counter, count, taken_filter
+            )
+        ]
 
-        last_hostname.counter += _counter
-        hostname = last_hostname.formatted_hostname(fill=fill)
+    @classmethod
+    def get_next_free_hostname(
+        cls, prefix, postfix, fill=5, taken_filter=None
+    ):
+        return cls.get_next_free_hostnames(
+            prefix, postfix, fill, taken_filter=taken_filter
+        )[0]
 
-        if availability_checker is None or availability_checker(hostname):
-            return hostname
-        else:
-            return cls.get_next_free_hostname(
-                prefix, postfix, fill, availability_checker, _counter + 1
+    @classmethod
+    def issue_next_free_hostnames(
+        cls, prefix, postfix, fill=5, count=1, taken_filter=None
+    ):
+        """
+        Reserve `count` next free hostnames and return them.
+
+        Counter row is locked (select_for_update) until the end of
+        transaction, so concurrent calls never issue the same hostname.
+        """
+        if count < 1:
+            return []
+        with transaction.atomic():
+            cls.objects.get_or_create(
+                prefix=prefix, postfix=postfix, defaults={'counter': 0}
             )
+            last_hostname = cls.objects.select_for_update().get(
+                prefix=prefix, postfix=postfix
+            )
+            counters = cls._get_next_free_counters(
+                prefix, postfix, fill, last_hostname.counter, count,
+                taken_filter
+            )
+            last_hostname.counter = counters[-1]
+            last_hostname.save(update_fields=['counter'])
+        return [
+            cls(
+                prefix=prefix, counter=counter, postfix=postfix
+            ).formatted_hostname(fill=fill)
+            for counter in counters
+        ]
 
     def __str__(self):
         return self.formatted_hostname()
@@ -373,6 +454,7 @@ class Asset(AdminAbsoluteUrlMixin, PriceMixin, BaseObject):
         max_length=255,
         null=True,
         verbose_name=_('hostname'),  # TODO: unique
+        db_index=True,
     )
     sn = NullableCharField(
         blank=True,
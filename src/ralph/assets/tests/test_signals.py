@@ -1,10 +1,14 @@
 from unittest.mock import patch
 
 from ddt import data, ddt, unpack
-from django.test import TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.test import override_settings, TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
 
 from ralph.assets.models import ConfigurationClass, Ethernet
 from ralph.assets.signals import custom_field_change
+from ralph.assets.tests.factories import EthernetFactory
 from ralph.back_office.tests.factories import BackOfficeAssetFactory
 from ralph.data_center.tests.factories import (
     ClusterFactory,
@@ -136,3 +140,40 @@ class TestRelatedObjectsChangeHandler(TransactionTestCase):
             conf_class.module.name = 'another_module'
             conf_class.module.save()
             self.assertEqual(mock.call_count, 2)
+
+
+@override_settings(HERMES_HOST_UPDATE_TOPIC_NAME='ralph.host_update')
+class TestBulkSaveHostPublishing(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+        publish_patcher = patch('ralph.data_center.publishers.publish')
+        self.publish_mock = publish_patcher.start()
+        self.addCleanup(publish_patcher.stop)
+        self.dc_asset = DataCenterAssetFactory()
+        self.ethernets = [
+            EthernetFactory(base_object=self.dc_asset) for _ in range(3)
+        ]
+        self.publish_mock.reset_mock()
+
+    def test_host_is_published_once_per_batch(self):
+        response = self.client.patch('/api/ethernets/bulk/', [
+            {'id': eth.id, 'label': 'eth{}'.format(i)}
+            for i, eth in enumerate(self.ethernets)
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.publish_mock.call_count, 1)
+        self.assertEqual(
+            self.publish_mock.call_args[0][1]['id'], self.dc_asset.id
+        )
+
+    def test_nothing_is_published_when_batch_is_invalid(self):
+        response = self.client.patch('/api/ethernets/bulk/', [
+            {'id': self.ethernets[0].id, 'label': 'eth0'},
+            {'id': self.ethernets[1].id, 'mac': 'invalid'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.publish_mock.called)
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 from dateutil.relativedelta import relativedelta
 from dj.choices import Country
@@ -586,10 +586,10 @@ class TestBackOfficeAssetTransitions(TransitionTestCase, RalphTestCase):
                 requester=self.user_pl
             )
 
-    @patch.object(ExternalService, "run")
+    @patch.object(ExternalService, "run_many")
     def test_a_report_is_generated(self, mock_method):
         GENERATED_FILE_CONTENT = REPORT_TEMPLATE = b'some-content'
-        mock_method.return_value = GENERATED_FILE_CONTENT
+        mock_method.return_value = [GENERATED_FILE_CONTENT]
         report_template = ReportTemplateFactory(template__data=REPORT_TEMPLATE)
         user = UserFactory()
         instances = [
@@ -610,6 +610,30 @@ class TestBackOfficeAssetTransitions(TransitionTestCase, RalphTestCase):
         self.assertEqual(attachment[0].original_filename, correct_filename)
         self.assertEqual(attachment[0].file.read(), GENERATED_FILE_CONTENT)
 
+    @patch.object(ExternalService, "run_many")
+    def test_report_parts_are_generated_at_once(self, mock_method):
+        mock_method.return_value = [b'part-1', b'part-2', b'part-3']
+        report_template = ReportTemplateFactory(template__data=b'template')
+        user = UserFactory()
+        instances = BackOfficeAssetFactory.create_batch(
+            25, user=UserFactory()
+        )
+        context = BackOfficeAsset._get_report_context(instances)
+        attachments = generate_report(
+            report_template.name, user, instances, report_template.language,
+            context=context)
+
+        mock_method.assert_called_once_with(ANY)
+        kwargs_list = mock_method.call_args[0][0]
+        self.assertEqual(
+            [len(kwargs['data']['assets']) for kwargs in kwargs_list],
+            [10, 10, 5]
+        )
+        self.assertEqual(
+            [attachment.file.read() for attachment in attachments],
+            [b'part-1', b'part-2', b'part-3']
+        )
+
     @patch.object(ralph.back_office.models, 'get_hook')
     def test_send_attachments_to_user_action_sends_email(self, mock_get_hook):
         mock_get_hook.return_value = lambda transition_name: EmailContext(
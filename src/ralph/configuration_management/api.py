@@ -3,14 +3,48 @@ from functools import reduce
 
 from django.conf.urls import url
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from rest_framework import status
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions, serializers, status
+from rest_framework.decorators import list_route
 from rest_framework.response import Response
 
 from ralph.api import RalphAPISerializer, RalphAPIViewSet, router
 from ralph.api.serializers import RalphAPISaveSerializer
-from ralph.assets.models import BaseObject
-from ralph.configuration_management.models import SCMStatusCheck
+from ralph.assets.models import Asset, BaseObject
+from ralph.configuration_management.models import SCMCheckResult, SCMStatusCheck
+from ralph.data_center.models import Cluster
+from ralph.helpers import bulk_update
+from ralph.virtual.models import CloudHost, VirtualServer
+
+HOSTNAME_MODELS = [Asset, CloudHost, Cluster, VirtualServer]
+
+
+def get_base_objects_ids(hostnames):
+    """
+    Return dict with id of base object (asset, cloud host, cluster or
+    virtual server) for every hostname from `hostnames` which was found.
+
+    All hostnames are resolved in single query (using indexes on hostname
+    of every model). When the same hostname is used by many objects, the one
+    with the lowest id is returned.
+    """
+    hostnames = set(hostnames)
+    if not hostnames:
+        return {}
+    queries = [
+        model._default_manager.filter(
+            hostname__in=hostnames
+        ).order_by().values_list('hostname', 'pk')
+        for model in HOSTNAME_MODELS
+    ]
+    result = {}
+    for hostname, pk in queries[0].union(*queries[1:], all=True):
+        if hostname not in result or pk < result[hostname]:
+            result[hostname] = pk
+    return result
 
 
 class SCMInfoSerializer(RalphAPISerializer):
@@ -26,12 +60,20 @@ class SCMInfoSaveSerializer(RalphAPISaveSerializer):
         model = SCMStatusCheck
 
 
+class SCMInfoBulkSaveSerializer(SCMInfoSaveSerializer):
+    hostname = serializers.CharField(max_length=255, trim_whitespace=True)
+
+    class Meta(SCMInfoSaveSerializer.Meta):
+        fields = ('hostname',) + SCMInfoSaveSerializer.Meta.fields
+
+
 class SCMInfoViewSet(RalphAPIViewSet):
     queryset = SCMStatusCheck.objects.all()
     serializer_class = SCMInfoSerializer
     save_serializer_class = SCMInfoSaveSerializer
 
     select_related = ['base_object']
+    bulk_max_size = 10000
 
     def get_baseobject(self, hostname):
         fields = [
@@ -99,9 +141,103 @@ class SCMInfoViewSet(RalphAPIViewSet):
 
         return Response(self.serializer_class(scan).data, status=res_status)
 
+    @list_route(methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        Sets SCM scan records for many objects at once. Payload is a list of
+        `{hostname, last_checked, check_result}` objects.
+
+        All hostnames are resolved in single query, existing records are
+        updated (in batches) and missing ones are created using single
+        query. Hostnames which weren't found are returned in `not_found`.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            raise exceptions.ValidationError(
+                _('Expected non-empty list of objects.')
+            )
+        if len(request.data) > self.bulk_max_size:
+            raise exceptions.ValidationError(
+                _('Too many objects (max %(max)s).') % {
+                    'max': self.bulk_max_size
+                }
+            )
+        serializer = SCMInfoBulkSaveSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        # the last entry wins when hostname is sent multiple times
+        checks = {
+            item['hostname']: item for item in serializer.validated_data
+        }
+        base_objects_ids = get_base_objects_ids(checks)
+        to_save = {
+            base_objects_ids[hostname]: item
+            for hostname, item in checks.items()
+            if hostname in base_objects_ids
+        }
+        with transaction.atomic():
+            created, updated = self._bulk_upsert(to_save)
+        return Response({
+            'created': created,
+            'updated': updated,
+            'not_found': sorted(set(checks) - set(base_objects_ids)),
+        })
+
+    def _bulk_upsert(self, checks):
+        """
+        Save `checks` (dict with check data by base object id). Return
+        number of created and updated records.
+        """
+        existing = dict(SCMStatusCheck.objects.filter(
+            base_object_id__in=checks
+        ).values_list('base_object_id', 'pk'))
+        new = [
+            SCMStatusCheck(
+                base_object_id=base_object_id,
+                last_checked=item['last_checked'],
+                check_result=item['check_result'],
+                # `save` (which sets `ok`) isn't called by bulk_create
+                ok=item['check_result'] == SCMCheckResult.scm_ok.id,
+            )
+            for base_object_id, item in checks.items()
+            if base_object_id not in existing
+        ]
+        try:
+            with transaction.atomic():
+                SCMStatusCheck.objects.bulk_create(new)
+        except IntegrityError:
+            # record created in the meantime by another request
+            for scan in new:
+                SCMStatusCheck.objects.update_or_create(
+                    base_object_id=scan.base_object_id,
+                    defaults={
+                        'last_checked': scan.last_checked,
+                        'check_result': scan.check_result,
+                    }
+                )
+        now = timezone.now()
+        bulk_update(SCMStatusCheck.objects.all(), {
+            pk: {
+                'last_checked': checks[base_object_id]['last_checked'],
+                'check_result': checks[base_object_id]['check_result'],
+                'ok': (
+                    checks[base_object_id]['check_result'] ==
+                    SCMCheckResult.scm_ok.id
+                ),
+                'modified': now,
+            }
+            for base_object_id, pk in existing.items()
+        })
+        return len(new), len(existing)
+
 
 router.register('scm-info', SCMInfoViewSet)
 urlpatterns = [
+    # has to be matched before hostname url
+    url(
+            r'^scm-info/bulk/$',
+            SCMInfoViewSet.as_view({'post': 'bulk'}),
+            name='scm-info-bulk'
+    ),
     url(
             r'^scm-info/(?P<hostname>[\w\.-]+)',
             SCMInfoViewSet.as_view({'post': 'create', 'delete': 'delete'}),
@@ -4,9 +4,17 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
 
 from ralph.api.tests._base import RalphAPITestCase
+from ralph.configuration_management.api import get_base_objects_ids
 from ralph.configuration_management.models import SCMCheckResult, SCMStatusCheck
 from ralph.configuration_management.tests.factories import SCMStatusCheckFactory
-from ralph.virtual.tests.factories import VirtualServerFullFactory
+from ralph.data_center.tests.factories import (
+    ClusterFactory,
+    DataCenterAssetFactory
+)
+from ralph.virtual.tests.factories import (
+    CloudHostFactory,
+    VirtualServerFullFactory
+)
 
 
 class TestSCMScanAPI(RalphAPITestCase):
@@ -181,3 +189,77 @@ class TestSCMScanAPI(RalphAPITestCase):
             resp.data.get('base_object'),
             v_server_1.baseobject_ptr_id
         )
+
+
+class TestSCMScanBulkAPI(RalphAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('scm-info-bulk')
+
+    def test_get_base_objects_ids(self):
+        asset = DataCenterAssetFactory(hostname='asset.local')
+        cloud_host = CloudHostFactory(hostname='cloudhost.local')
+        cluster = ClusterFactory(hostname='cluster.local')
+        v_server = VirtualServerFullFactory(hostname='vserver.local')
+        with self.assertNumQueries(1):
+            result = get_base_objects_ids([
+                'asset.local', 'cloudhost.local', 'cluster.local',
+                'vserver.local', 'deadbeef.local'
+            ])
+        self.assertEqual(result, {
+            'asset.local': asset.pk,
+            'cloudhost.local': cloud_host.pk,
+            'cluster.local': cluster.pk,
+            'vserver.local': v_server.pk,
+        })
+
+    def test_bulk_post_creates_and_updates_scm_status_records(self):
+        v_server_1 = VirtualServerFullFactory()
+        v_server_2 = VirtualServerFullFactory()
+        existing_scan = SCMStatusCheckFactory(
+            base_object=v_server_1.baseobject_ptr,
+            check_result=SCMCheckResult.scm_ok
+        )
+        last_checked = datetime(2019, 1, 2, 3, 4, 5)
+        data = [
+            {
+                'hostname': v_server_1.hostname,
+                'last_checked': last_checked.isoformat(),
+                'check_result': SCMCheckResult.scm_error.id,
+            },
+            {
+                'hostname': v_server_2.hostname,
+                'last_checked': last_checked.isoformat(),
+                'check_result': SCMCheckResult.scm_ok.id,
+            },
+            {
+                'hostname': 'deadbeef.local',
+                'last_checked': last_checked.isoformat(),
+                'check_result': SCMCheckResult.scm_ok.id,
+            },
+        ]
+
+        resp = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data, {
+            'created': 1, 'updated': 1, 'not_found': ['deadbeef.local']
+        })
+        updated_scan = SCMStatusCheck.objects.get(pk=existing_scan.pk)
+        self.assertEqual(updated_scan.check_result, SCMCheckResult.scm_error)
+        self.assertEqual(updated_scan.last_checked, last_checked)
+        self.assertFalse(updated_scan.ok)
+        new_scan = SCMStatusCheck.objects.get(
+            base_object=v_server_2.baseobject_ptr
+        )
+        self.assertEqual(new_scan.check_result, SCMCheckResult.scm_ok)
+        self.assertTrue(new_scan.ok)
+
+    def test_bulk_post_with_invalid_data_returns_400(self):
+        v_server = VirtualServerFullFactory()
+        data = [{'hostname': v_server.hostname, 'check_result': 'invalid'}]
+
+        resp = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(SCMStatusCheck.objects.exists())
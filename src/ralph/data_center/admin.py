@@ -490,11 +490,12 @@ class DataCenterAssetAdmin(
         }),
     )
 
-    def get_export_queryset(self, request):
+    def get_lazy_export_queryset(self, request):
         return DataCenterAsset.polymorphic_objects.select_related(
             *self.list_select_related
         ).polymorphic_prefetch_related(
-            DataCenterAsset=['tags', 'ethernet_set__ipaddress', 'parent__ethernet_set__ipaddress'],
+            # IP addresses are fetched by resource for every chunk
+            DataCenterAsset=['tags', 'parent'],
         )
 
     def get_multiadd_fields(self, obj=None):
@@ -654,6 +655,9 @@ class DCHostAdmin(
     RalphAdmin
 ):
     change_list_template = 'admin/data_center/dchost/change_list.html'
+    # DC hosts list mixes many models - stay on the list (as for other
+    # polymorphic lists) even when single host is found
+    redirect_to_detail_view_if_one_search_result = False
     search_fields = [
         'remarks',
         'asset__hostname',
@@ -6,6 +6,8 @@ import pyhermes
 from django.conf import settings
 from pyhermes.publishing import publish
 
+from ralph.signals import called_in_coalesced_batch
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,8 +39,13 @@ def _get_host_data(instance):
 def publish_host_update(instance):
     """
     Publish information about DC Host updates using DCHost API serializer.
+
+    Every host is published only once in single batch of coalesced post
+    commit handlers (ex. when many components of host are saved at once).
     """
     if settings.HERMES_HOST_UPDATE_TOPIC_NAME:
+        if called_in_coalesced_batch(('publish_host_update', instance.pk)):
+            return
         logger.info(
             'Publishing host update for {}'.format(instance),
             extra={
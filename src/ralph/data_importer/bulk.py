@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk import mode (`importer` command with `--bulk` option).
+
+By default every imported row costs a few queries: mapping of old primary key
+to the new one is fetched (for every foreign key) and saved (for every
+object) separately, related objects are fetched once per cell and existing
+objects are fetched once per row. In bulk mode:
+* mapping of old primary keys (`ImportedObjects`) is loaded into memory once
+  per content type and new mappings are saved in batches,
+* related objects are fetched once per distinct value,
+* existing objects are fetched once per imported file,
+* new objects of simple models (without parent models, custom `save` and
+  many-to-many fields) are inserted using `bulk_create` in batches (notice
+  that `pre_save` and `post_save` signals are not sent for them).
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, models
+from import_export.widgets import ManyToManyWidget
+
+from ralph.data_importer.models import ImportedObjects
+
+DEFAULT_BATCH_SIZE = 1000
+
+_local = threading.local()
+
+
+class BulkImport(object):
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        # content type id -> {old pk: new pk}
+        self._mappings = {}
+        self._pending_imported_objects = []
+        # (model, field, value) -> related object
+        self._related_objects = {}
+
+    def _get_mapping(self, content_type):
+        if content_type.pk not in self._mappings:
+            self._mappings[content_type.pk] = dict(
+                ImportedObjects.objects.filter(
+                    content_type=content_type
+                ).values_list('old_object_pk', 'object_pk')
+            )
+        return self._mappings[content_type.pk]
+
+    def get_object_pk(self, content_type, old_pk):
+        """
+        Return primary key of object imported with `old_pk` (or None).
+        """
+        return self._get_mapping(content_type).get(str(old_pk))
+
+    def add_imported_object(self, content_type, object_pk, old_pk):
+        """
+        Save mapping of `old_pk` to `object_pk` (new mappings are saved in
+        batches).
+        """
+        old_pk = str(old_pk)
+        mapping = self._get_mapping(content_type)
+        current_pk = mapping.get(old_pk)
+        if current_pk == object_pk:
+            return
+        if current_pk is None:
+            self._pending_imported_objects.append(ImportedObjects(
+                content_type=content_type,
+                object_pk=object_pk,
+                old_object_pk=old_pk,
+            ))
+            if len(self._pending_imported_objects) >= self.batch_size:
+                self.flush()
+        else:
+            # mapping could be still waiting for save
+            self.flush()
+            ImportedObjects.objects.filter(
+                content_type=content_type, old_object_pk=old_pk
+            ).update(object_pk=object_pk)
+        mapping[old_pk] = object_pk
+
+    def get_related_object(self, model, field, value):
+        """
+        Return object of `model` with `field` equal to `value`, fetching it
+        only once during the whole import.
+
+        Raises `model.DoesNotExist` if there is no such object.
+        """
+        key = (model, field, str(value))
+        if key not in self._related_objects:
+            self._related_objects[key] = model._default_manager.get(
+                **{field: value}
+            )
+        return self._related_objects[key]
+
+    def can_bulk_create(self, model, import_fields):
+        """
+        Return True if new objects of `model` could be saved using
+        `bulk_create`.
+        """
+        return (
+            not model._meta.parents and
+            model.save is models.Model.save and
+            not any(
+                isinstance(field.widget, ManyToManyWidget)
+                for field in import_fields
+            )
+        )
+
+    def bulk_create(self, model, instances):
+        """
+        Save new `instances` of `model` in batches.
+
+        When database could not return ids of inserted rows, objects without
+        primary key are saved one by one.
+        """
+        if not connection.features.can_return_ids_from_bulk_insert:
+            without_pk = [obj for obj in instances if obj.pk is None]
+            instances = [obj for obj in instances if obj.pk is not None]
+            for obj in without_pk:
+                obj.save(force_insert=True)
+        model._default_manager.bulk_create(
+            instances, batch_size=self.batch_size
+        )
+
+    def flush(self):
+        if self._pending_imported_objects:
+            ImportedObjects.objects.bulk_create(
+                self._pending_imported_objects, batch_size=self.batch_size
+            )
+            self._pending_imported_objects = []
+
+
+def get_bulk_import():
+    """
+    Return current `BulkImport` (or None if bulk mode is not active).
+    """
+    return getattr(_local, 'bulk_import', None)
+
+
+@contextmanager
+def bulk_import(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Run import in bulk mode in this context.
+    """
+    _local.bulk_import = BulkImport(batch_size)
+    try:
+        yield _local.bulk_import
+        _local.bulk_import.flush()
+    finally:
+        _local.bulk_import = None
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import csv
 import glob
+import itertools
 import logging
+import multiprocessing
 import os
 import tempfile
 import zipfile
@@ -11,9 +13,11 @@ import tablib
 from django.apps import apps
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from import_export import resources
 
 from ralph.data_importer import resources as ralph_resources
+from ralph.data_importer.bulk import bulk_import, DEFAULT_BATCH_SIZE
 from ralph.data_importer.models import ImportedObjects
 from ralph.data_importer.resources import RalphModelResource
 
@@ -34,6 +38,14 @@ def get_resource(model_name):
     return resource()
 
 
+def _import_file(options):
+    """Import single file (in worker process)."""
+    try:
+        Command().from_file(options)
+    finally:
+        connections.close_all()
+
+
 class Command(BaseCommand):
 
     help = "Imports data for specified model from specified file"
@@ -78,6 +90,33 @@ class Command(BaseCommand):
             action='store_true',
             help="Use it when importing data from Ralph 2.",
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            default=False,
+            help=(
+                "Import in bulk mode (mapping of imported IDs is kept in "
+                "memory and new objects are saved in batches, without "
+                "sending save signals)."
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of objects saved at once in bulk mode",
+        )
+        parser.add_argument(
+            '-j', '--jobs',
+            dest='jobs',
+            type=int,
+            default=1,
+            help=(
+                "Number of processes importing files with the same order "
+                "number in parallel (for dir and zip)"
+            ),
+        )
 
     def from_zip(self, options):
         with open(options.get('source'), 'rb') as f:
@@ -99,11 +138,25 @@ class Command(BaseCommand):
                 'sort': int(file_name[0])
             })
         file_list = sorted(file_list, key=lambda x: x['sort'])
-        for item in file_list:
-            logger.info('Import to model: {}'.format(item['model']))
-            options['model_name'] = item['model']
-            options['source'] = item['path']
-            self.from_file(options)
+        # files with the same order number are independent of each other
+        for _, items in itertools.groupby(file_list, lambda x: x['sort']):
+            files_options = []
+            for item in items:
+                logger.info('Import to model: {}'.format(item['model']))
+                files_options.append(dict(
+                    options, model_name=item['model'], source=item['path']
+                ))
+            if options.get('jobs', 1) > 1 and len(files_options) > 1:
+                self.from_files_in_parallel(files_options, options['jobs'])
+            else:
+                for file_options in files_options:
+                    self.from_file(file_options)
+
+    def from_files_in_parallel(self, files_options, jobs):
+        # database connection can't be shared with worker processes
+        connections.close_all()
+        with multiprocessing.Pool(min(jobs, len(files_options))) as pool:
+            pool.map(_import_file, files_options)
 
     def delete_objs(self, data, model):
         counter = 0
@@ -150,8 +203,18 @@ class Command(BaseCommand):
                 obj.get('id', None) for obj in dataset.dict
                 if int(obj.get('deleted', 0)) == 1
             ]
-            result = model_resource.import_data(dataset, dry_run=False)
+            if options.get('bulk'):
+                with bulk_import(options['batch_size']):
+                    result = model_resource.import_data(
+                        dataset, dry_run=False
+                    )
+            else:
+                result = model_resource.import_data(dataset, dry_run=False)
             if result.has_errors():
+                for error in result.base_errors:
+                    self.stderr.write(
+                        'error message: {}\n'.format(error.error)
+                    )
                 for idx, row in enumerate(result.rows):
                     for error in row.errors:
                         error_msg = '\n'.join([
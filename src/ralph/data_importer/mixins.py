@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 from collections import OrderedDict
 
+import tablib
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import QuerySet
 from import_export import fields, widgets
+from import_export.instance_loaders import CachedInstanceLoader
+from import_export.resources import Diff
 
+from ralph.admin.export import EXPORT_CHUNK_SIZE, iterate_in_chunks
+from ralph.data_importer.bulk import get_bulk_import
 from ralph.data_importer.models import ImportedObjects
 from ralph.data_importer.widgets import (
     ExportForeignKeyStrWidget,
@@ -75,6 +81,15 @@ class ImportForeignKeyMeta(type):
         return new_class
 
 
+class _NoDiff(Diff):
+    def __init__(self, resource, instance, new):
+        self.left = self.right = []
+        self.new = new
+
+    def compare_with(self, resource, instance, dry_run=False):
+        pass
+
+
 class ImportForeignKeyMixin(object):
 
     """ImportForeignKeyMixin class for django import-export resources."""
@@ -89,6 +104,47 @@ class ImportForeignKeyMixin(object):
             instance_loader, row
         )
 
+    def before_import(self, dataset, using_transactions, dry_run, **kwargs):
+        # new objects waiting for `bulk_create` (with their old pks)
+        self._bulk_created = []
+        self._cached_instance_loader = None
+        return super().before_import(
+            dataset, using_transactions, dry_run, **kwargs
+        )
+
+    def get_instance(self, instance_loader, row):
+        """
+        In bulk mode fetch all existing objects of imported file at once.
+        """
+        if (
+            get_bulk_import() is None or
+            'id' not in instance_loader.dataset.headers
+        ):
+            return super().get_instance(instance_loader, row)
+        if self._cached_instance_loader is None:
+            self._cached_instance_loader = CachedInstanceLoader(
+                self, instance_loader.dataset
+            )
+        return self._cached_instance_loader.get_instance(row)
+
+    def get_diff_class(self):
+        # diff is not displayed by importer command
+        if get_bulk_import() is not None:
+            return _NoDiff
+        return super().get_diff_class()
+
+    def save_instance(self, instance, using_transactions=True, dry_run=False):
+        bulk = get_bulk_import()
+        if (
+            bulk is None or dry_run or not instance._state.adding or
+            not bulk.can_bulk_create(
+                self._meta.model, self.get_import_fields()
+            )
+        ):
+            return super().save_instance(instance, using_transactions, dry_run)
+        self.before_save_instance(instance, using_transactions, dry_run)
+        self._bulk_created.append((instance, self.old_object_pk))
+
     def after_save_instance(
         self,
         instance,
@@ -99,12 +155,39 @@ class ImportForeignKeyMixin(object):
     ):
         if not dry_run and self.old_object_pk:
             content_type = ContentType.objects.get_for_model(self._meta.model)
+            bulk = get_bulk_import()
+            if bulk is not None:
+                bulk.add_imported_object(
+                    content_type, instance.pk, self.old_object_pk
+                )
+                return
             ImportedObjects.objects.update_or_create(
                 content_type=content_type,
                 old_object_pk=self.old_object_pk,
                 defaults={'object_pk': instance.pk}
             )
 
+    def after_import(
+        self, dataset, result, using_transactions, dry_run, **kwargs
+    ):
+        bulk = get_bulk_import()
+        if bulk is not None and self._bulk_created:
+            bulk.bulk_create(
+                self._meta.model,
+                [instance for instance, _ in self._bulk_created]
+            )
+            content_type = ContentType.objects.get_for_model(self._meta.model)
+            for instance, old_object_pk in self._bulk_created:
+                if old_object_pk:
+                    bulk.add_imported_object(
+                        content_type, instance.pk, old_object_pk
+                    )
+            self._bulk_created = []
+            bulk.flush()
+        return super().after_import(
+            dataset, result, using_transactions, dry_run, **kwargs
+        )
+
     def import_field(self, field, obj, data, is_m2m=False):
         """
         Calls :meth:`import_export.fields.Field.save` if ``Field.attribute``
@@ -114,3 +197,91 @@ class ImportForeignKeyMixin(object):
             field.save(obj, data, is_m2m=False)
         elif field.attribute and field.column_name in data:
             field.save(obj, data, is_m2m)
+
+
+class ExportChunksMixin(object):
+    """
+    Export objects in chunks (of `export_chunk_size` objects) and call
+    `prepare_export_chunk` for every chunk - ex. to fetch related objects of
+    the whole chunk in single query, when `prefetch_related` could not be
+    used.
+
+    Querysets are exported in order of primary key.
+    """
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def prepare_export_chunk(self, objs):
+        pass
+
+    def iter_export_chunks(self, queryset):
+        if isinstance(queryset, QuerySet):
+            chunks = iterate_in_chunks(queryset, self.export_chunk_size)
+        else:
+            objs = list(queryset)
+            chunks = (
+                objs[i:i + self.export_chunk_size]
+                for i in range(0, len(objs), self.export_chunk_size)
+            )
+        for chunk in chunks:
+            self.prepare_export_chunk(chunk)
+            yield chunk
+
+    def export(self, queryset=None, *args, **kwargs):
+        self.before_export(queryset, *args, **kwargs)
+        if queryset is None:
+            queryset = self.get_queryset()
+        data = tablib.Dataset(headers=self.get_export_headers())
+        for chunk in self.iter_export_chunks(queryset):
+            for obj in chunk:
+                data.append(self.export_resource(obj))
+        self.after_export(queryset, data, *args, **kwargs)
+        return data
+
+
+class IPAddressesExportMixin(ExportChunksMixin):
+    """
+    Fetch IP addresses of all exported (base) objects of the chunk in single
+    query (`prefetch_related` of `ethernet_set` does not work for models with
+    multiple inheritance, like DataCenterAsset).
+
+    Use `get_ip_addresses` in `dehydrate_*` methods to get them.
+    """
+    # fetch IP addresses of parents of exported objects too
+    export_parents_ip_addresses = False
+
+    def prepare_export_chunk(self, objs):
+        super().prepare_export_chunk(objs)
+        base_objects_ids = set()
+        for obj in objs:
+            base_objects_ids.add(obj.pk)
+            if self.export_parents_ip_addresses and obj.parent_id:
+                base_objects_ids.add(obj.parent_id)
+        self._ip_addresses = self._fetch_ip_addresses(base_objects_ids)
+
+    def _fetch_ip_addresses(self, base_objects_ids):
+        from ralph.networks.models import IPAddress
+        ip_addresses = {pk: [] for pk in base_objects_ids}
+        for ip in IPAddress.objects.filter(
+            ethernet__base_object__in=base_objects_ids
+        ).select_related('ethernet').order_by('ethernet__mac'):
+            ip_addresses[ip.ethernet.base_object_id].append(ip)
+        return ip_addresses
+
+    def get_ip_addresses(self, obj):
+        """
+        Return list of IP addresses of `obj` (ordered by MAC address of
+        ethernet). IP addresses of object outside of prepared chunk are
+        fetched separately (every time - object could be changed in the
+        meantime, ex. exported before and after import of its row).
+        """
+        if obj is None:
+            return []
+        ip_addresses = getattr(self, '_ip_addresses', None) or {}
+        if obj.pk in ip_addresses:
+            return ip_addresses[obj.pk]
+        return self._fetch_ip_addresses([obj.pk])[obj.pk]
+
+    def before_import_row(self, row, **kwargs):
+        super().before_import_row(row, **kwargs)
+        # IP addresses of exported objects could be changed by import
+        self._ip_addresses = None
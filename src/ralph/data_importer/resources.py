@@ -16,7 +16,8 @@ from ralph.data_center.models import hosts, physical
 from ralph.data_importer.fields import PriceField, ThroughField
 from ralph.data_importer.mixins import (
     ImportForeignKeyMeta,
-    ImportForeignKeyMixin
+    ImportForeignKeyMixin,
+    IPAddressesExportMixin
 )
 from ralph.data_importer.widgets import (
     AssetServiceEnvWidget,
@@ -263,7 +264,9 @@ class IPAddressResource(RalphModelResource):
         return False
 
 
-class DataCenterAssetResource(ResourceWithPrice, RalphModelResource):
+class DataCenterAssetResource(
+    IPAddressesExportMixin, ResourceWithPrice, RalphModelResource
+):
     parent = fields.Field(
         column_name='parent',
         attribute='parent',
@@ -302,6 +305,7 @@ class DataCenterAssetResource(ResourceWithPrice, RalphModelResource):
     )
     # no need for str field - management_ip will be exported as str
     management_ip._skip_str_field = True
+    export_parents_ip_addresses = True
 
     class Meta:
         model = physical.DataCenterAsset
@@ -315,16 +319,11 @@ class DataCenterAssetResource(ResourceWithPrice, RalphModelResource):
         return str(dc_asset.depreciation_rate)
 
     def _get_management_ip(self, dc_asset):
-        if dc_asset:
-            # find first management_ip here
-            # notice that dc_asset.management_ip property could not be used
-            # here, because it will omit prefetch_related cache
-            for eth in dc_asset.ethernet_set.all():
-                try:
-                    if eth.ipaddress and eth.ipaddress.is_management:
-                        return eth.ipaddress
-                except physical.IPAddress.DoesNotExist:
-                    pass
+        # notice that dc_asset.management_ip property could not be used
+        # here, because it will fetch IP addresses of every asset separately
+        for ip in self.get_ip_addresses(dc_asset):
+            if ip.is_management:
+                return ip
 
     def dehydrate_parent_str(self, dc_asset) -> str:
         try:
@@ -1,5 +1,7 @@
 import ipaddress
 import os
+import tempfile
+from unittest.mock import patch
 
 from ddt import data, ddt, unpack
 from django.contrib.auth import get_user_model
@@ -323,6 +325,104 @@ class DataImporterTestCase(TestCase):
             name="From zip London"
         ).exists())
 
+    def test_from_dir_command_in_bulk_mode(self):
+        warehouse_dir = os.path.join(
+            self.base_dir,
+            'tests/samples/warehouses'
+        )
+        management.call_command(
+            'importer',
+            warehouse_dir,
+            '--bulk',
+            type='dir',
+            map_imported_id_to_new_id=True
+        )
+
+        warehouse = Warehouse.objects.get(name="From dir London")
+        warehouse_content_type = ContentType.objects.get_for_model(Warehouse)
+        self.assertEqual(ImportedObjects.objects.get(
+            content_type=warehouse_content_type,
+            old_object_pk=60
+        ).object_pk, warehouse.pk)
+
+    def test_importer_command_in_bulk_mode_with_skipid(self):
+        warehouse_csv = os.path.join(
+            self.base_dir,
+            'tests/samples/warehouses_skipid.csv'
+        )
+        management.call_command(
+            'importer',
+            warehouse_csv,
+            '--skipid',
+            '--bulk',
+            type='file',
+            model_name='Warehouse',
+            map_imported_id_to_new_id=True
+        )
+        warehouse = Warehouse.objects.get(name="Cupertino")
+        self.assertNotEqual(warehouse.pk, 200)
+        warehouse_content_type = ContentType.objects.get_for_model(Warehouse)
+        self.assertEqual(ImportedObjects.objects.get(
+            content_type=warehouse_content_type,
+            old_object_pk=200
+        ).object_pk, warehouse.pk)
+
+    def test_importer_command_back_office_asset_in_bulk_mode(self):
+        back_office_csv = os.path.join(
+            self.base_dir,
+            'tests/samples/back_office_assets.csv'
+        )
+        management.call_command(
+            'importer',
+            back_office_csv,
+            '--bulk',
+            type='file',
+            model_name='BackOfficeAsset',
+            map_imported_id_to_new_id=True
+        )
+        back_office_asset = BackOfficeAsset.objects.get(sn="bo_asset_sn")
+        self.assertEqual(back_office_asset.warehouse.name, "warehouse_1")
+        self.assertEqual(back_office_asset.model.name, "asset_model_1")
+        self.assertTrue(ImportedObjects.objects.filter(
+            content_type=ContentType.objects.get_for_model(BackOfficeAsset),
+            object_pk=back_office_asset.pk
+        ).exists())
+
+    @patch.object(importer.connections, 'close_all')
+    @patch.object(importer.multiprocessing, 'Pool')
+    def test_from_dir_command_in_parallel(self, pool_mock, close_all_mock):
+        # run "workers" in this process (and transaction)
+        pool_mock.return_value.__enter__.return_value.map.side_effect = (
+            lambda func, items: [func(item) for item in items]
+        )
+        source_dir = tempfile.mkdtemp()
+        for file_name, name in [
+            ('1_Warehouse.csv', 'Parallel warehouse'),
+            ('1_Manufacturer.csv', 'Parallel manufacturer'),
+            ('2_Warehouse.csv', 'Next warehouse'),
+        ]:
+            with open(os.path.join(source_dir, file_name), 'w') as f:
+                f.write('id,name\n,{}\n'.format(name))
+        management.call_command(
+            'importer',
+            source_dir,
+            '--skipid',
+            '--jobs=4',
+            type='dir',
+        )
+
+        pool_mock.assert_called_once_with(2)
+        self.assertTrue(close_all_mock.called)
+        self.assertTrue(
+            Warehouse.objects.filter(name='Parallel warehouse').exists()
+        )
+        self.assertTrue(
+            Manufacturer.objects.filter(name='Parallel manufacturer').exists()
+        )
+        self.assertTrue(
+            Warehouse.objects.filter(name='Next warehouse').exists()
+        )
+
 
 class IPManagementTestCase(TestCase):
     def setUp(self):
@@ -1,15 +1,29 @@
+import csv
+import json
 from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
 
 from ddt import data, ddt, unpack
+from django.contrib.auth import get_user_model
 from django.db import connections
-from django.test import RequestFactory, TestCase
+from django.test import override_settings, RequestFactory, TestCase
 from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from import_export.formats import base_formats
+from openpyxl import load_workbook
 
 from ralph.accounts.tests.factories import UserFactory
+from ralph.admin.export import (
+    ASYNC_EXPORT_SERVICE,
+    iterate_in_chunks,
+    run_async_export
+)
 from ralph.admin.sites import ralph_site
 from ralph.data_center.models import DataCenterAsset
 from ralph.data_center.tests.factories import DataCenterAssetFullFactory
+from ralph.data_importer.resources import DataCenterAssetResource
+from ralph.lib.external_services.models import Job, JobStatus
 from ralph.licences.models import Licence
 from ralph.licences.tests.factories import (
     BackOfficeAssetLicenceFactory,
@@ -178,3 +192,148 @@ class BaseObjectsSupportExporterTestCase(SimulateAdminExportTestCase):
             export_data.dict[0]['support__price_per_object'],
             str(expected_price)
         )
+
+
+class StreamingExportTestCase(TestCase):
+    def setUp(self):
+        self.user = UserFactory(
+            username='exporter', is_superuser=True, is_staff=True
+        )
+        self.user.set_password('exporter')
+        self.user.save()
+        self.client.login(username='exporter', password='exporter')
+        self.licences = LicenceFactory.create_batch(5)
+        self.admin_class = ralph_site._registry[Licence]
+        self.export_url = reverse('admin:licences_licence_export')
+
+    def _get_format_index(self, format_class):
+        return next(
+            i for i, f in enumerate(self.admin_class.get_export_formats())
+            if f is format_class
+        )
+
+    def _post_export(self, format_class, query=''):
+        return self.client.post(
+            self.export_url + query,
+            {'file_format': self._get_format_index(format_class)}
+        )
+
+    def test_iterate_in_chunks(self):
+        chunks = list(iterate_in_chunks(
+            Licence.objects.order_by('-id'), chunk_size=2
+        ))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            [obj.id for chunk in chunks for obj in chunk],
+            sorted(licence.id for licence in self.licences)
+        )
+
+    def test_csv_export_is_streamed(self):
+        with patch.object(self.admin_class, 'export_chunk_size', 2):
+            response = self._post_export(base_formats.CSV)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(
+            b''.join(response.streaming_content).decode().splitlines()
+        ))
+        self.assertEqual(
+            rows[0], self.admin_class.get_export_resource_class()(
+            ).get_export_headers()
+        )
+        id_index = rows[0].index('id')
+        self.assertEqual(
+            [int(row[id_index]) for row in rows[1:]],
+            sorted(licence.id for licence in self.licences)
+        )
+
+    def test_csv_export_respects_filters(self):
+        licence = self.licences[0]
+        response = self._post_export(
+            base_formats.CSV, '?id__exact={}'.format(licence.id)
+        )
+        rows = list(csv.DictReader(
+            b''.join(response.streaming_content).decode().splitlines()
+        ))
+        self.assertEqual([row['id'] for row in rows], [str(licence.id)])
+
+    def test_xlsx_export_is_streamed(self):
+        response = self._post_export(base_formats.XLSX)
+        self.assertTrue(response.streaming)
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        rows = [[cell.value for cell in row] for row in workbook.active.rows]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(
+            rows[1][rows[0].index('id')], str(self.licences[0].id)
+        )
+
+    def test_not_streamable_format_is_exported_at_once(self):
+        response = self._post_export(base_formats.JSON)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(json.loads(response.content.decode())), 5)
+
+    @override_settings(ASYNC_EXPORT_THRESHOLD=3)
+    def test_big_export_is_run_in_background(self):
+        response = self._post_export(base_formats.CSV)
+        self.assertEqual(response.status_code, 302)
+        job = Job.objects.get(service_name=ASYNC_EXPORT_SERVICE)
+        job_url = reverse(
+            'admin:licences_licence_export_job', args=(job.id,)
+        )
+        # not ready yet
+        self.assertEqual(self.client.get(job_url).status_code, 302)
+
+        run_async_export(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FINISHED)
+        response = self.client.get(job_url)
+        self.assertEqual(response.status_code, 200)
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 6)
+
+    @override_settings(ASYNC_EXPORT_THRESHOLD=3)
+    def test_background_export_is_available_only_for_requester(self):
+        self._post_export(base_formats.CSV)
+        job = Job.objects.get(service_name=ASYNC_EXPORT_SERVICE)
+        run_async_export(job.id)
+        UserFactory(username='other', is_superuser=True, is_staff=True)
+        self.client.force_login(get_user_model().objects.get(
+            username='other'
+        ))
+        response = self.client.get(reverse(
+            'admin:licences_licence_export_job', args=(job.id,)
+        ))
+        self.assertEqual(response.status_code, 404)
+
+    def test_data_center_asset_export_is_streamed(self):
+        assets = DataCenterAssetFullFactory.create_batch(3)
+        response = self.client.post(
+            reverse('admin:data_center_datacenterasset_export'),
+            {'file_format': self._get_format_index(base_formats.CSV)}
+        )
+        rows = list(csv.DictReader(
+            b''.join(response.streaming_content).decode().splitlines()
+        ))
+        self.assertEqual(
+            [int(row['id']) for row in rows],
+            sorted(asset.id for asset in assets)
+        )
+        self.assertNotIn('None', [row['management_ip'] for row in rows])
+
+
+class DataCenterAssetImportDiffTestCase(TestCase):
+    def test_import_diff_shows_changed_management_ip(self):
+        dca = DataCenterAssetFullFactory()
+        dca.management_ip = '10.20.30.1'
+        resource = DataCenterAssetResource()
+        dataset = resource.export(DataCenterAsset.objects.filter(pk=dca.pk))
+        column = dataset.headers.index('management_ip')
+        row = list(dataset[0])
+        row[column] = '10.20.30.2'
+        dataset[0] = row
+
+        result = DataCenterAssetResource().import_data(dataset, dry_run=True)
+
+        self.assertFalse(result.has_errors())
+        # diff is rendered from export of asset before and after import
+        diff = result.rows[0].diff[column]
+        self.assertIn('<del style="background:#ffe6e6;">1</del>', diff)
+        self.assertIn('<ins style="background:#e6ffe6;">2</ins>', diff)
@@ -8,6 +8,7 @@ from import_export import widgets
 from ralph.assets.models.assets import ServiceEnvironment
 from ralph.back_office.models import BackOfficeAsset
 from ralph.data_center.models.physical import DataCenterAsset
+from ralph.data_importer.bulk import get_bulk_import
 from ralph.data_importer.models import ImportedObjects
 
 logger = logging.getLogger(__name__)
@@ -23,10 +24,19 @@ def get_imported_obj(model, old_pk):
     :rtype: tuple
     """
     content_type = ContentType.objects.get_for_model(model)
-    imported_obj = ImportedObjects.objects.filter(
-        content_type=content_type,
-        old_object_pk=str(old_pk)
-    ).first()
+    bulk = get_bulk_import()
+    if bulk is not None:
+        object_pk = bulk.get_object_pk(content_type, old_pk)
+        imported_obj = None if object_pk is None else ImportedObjects(
+            content_type=content_type,
+            object_pk=object_pk,
+            old_object_pk=str(old_pk)
+        )
+    else:
+        imported_obj = ImportedObjects.objects.filter(
+            content_type=content_type,
+            old_object_pk=str(old_pk)
+        ).first()
     if not imported_obj:
         msg = (
             "Record with pk %s not found for model %s of '%s'"
@@ -200,6 +210,9 @@ class ImportedForeignKeyWidget(widgets.ForeignKeyWidget):
                 )
                 if imported_obj:
                     value = imported_obj.object_pk
+        bulk = get_bulk_import()
+        if bulk is not None and value:
+            return bulk.get_related_object(self.model, self.field, value)
         return super().clean(value)
 
 
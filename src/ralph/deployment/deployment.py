@@ -20,14 +20,14 @@ Deployment order:
 """
 import ipaddress
 import logging
-import time
 from datetime import datetime
 from functools import partial
 
 from django import forms
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import CharField, Q, Subquery
+from django.db.models.functions import Cast
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
@@ -38,9 +38,17 @@ from ralph.dhcp.models import DHCPEntry, DHCPServer
 from ralph.dns.dnsaas import DNSaaS
 from ralph.dns.forms import RecordType
 from ralph.dns.views import DNSaaSIntegrationNotEnabledError
+from ralph.lib.external_services.models import JobStatus
 from ralph.lib.mixins.forms import ChoiceFieldWithOtherOption, OTHER
 from ralph.lib.transitions.decorators import transition_action
-from ralph.lib.transitions.exceptions import FreezeAsyncTransition
+from ralph.lib.transitions.exceptions import (
+    FreezeAsyncTransition,
+    RescheduleAsyncTransitionActionLater
+)
+from ralph.lib.transitions.models import (
+    TransitionJob,
+    TransitionJobActionStatus
+)
 from ralph.networks.models import IPAddress, Network, NetworkEnvironment
 from ralph.virtual.models import VirtualServer
 
@@ -432,8 +440,8 @@ def assign_new_hostname(cls, instances, network_environment, **kwargs):
         net_env = NetworkEnvironment.objects.get(
             pk=network_environment['value']
         )
-        for instance in instances:
-            new_hostname = net_env.issue_next_free_hostname()
+        new_hostnames = net_env.issue_next_free_hostnames(len(instances))
+        for instance, new_hostname in zip(instances, new_hostnames):
             _assign_hostname(instance, new_hostname, net_env)
 
 
@@ -488,9 +496,10 @@ def check_ip_from_defined_network(address):
     run_after=['assign_new_hostname'],
 )
 def assign_new_ip(cls, instances, network, **kwargs):
-    for instance in instances:
-        network = Network.objects.get(pk=network)
-        ip = network.issue_next_free_ip()
+    network = Network.objects.get(pk=network)
+    # reserve IPs for all instances at once
+    ips = network.issue_next_free_ips(len(instances))
+    for instance, ip in zip(instances, ips):
         logger.info('Assigning {} to {}'.format(ip, instance))
         ethernet = Ethernet.objects.create(base_object=instance)
         logger.info('Bounding {} to {} ethernet'.format(ip, ethernet))
@@ -612,10 +621,10 @@ def create_dhcp_entries(cls, instances, ip_or_network, ethernet, **kwargs):
         kwargs['shared_params']['ip_addresses'][instances[0].pk] = ip
     else:
         for instance, (ip, ethernet) in zip(
+            instances,
             _create_dhcp_entries_for_many_instances(
                 instances, ip_or_network
             ),
-            instances
         ):
             _store_history(instance, ip, ethernet)
             kwargs['shared_params']['ip_addresses'][instance.pk] = ip
@@ -646,6 +655,16 @@ def _create_dhcp_entries_for_single_instance(
             pk=ip_or_network['value']
         )
         ip = network.issue_next_free_ip()
+    return _create_dhcp_entry(instance, ip, ethernet_id)
+
+
+def _create_dhcp_entry(instance, ip, ethernet_id):
+    """
+    Assign (already reserved) IP to instance's ethernet and expose it in DHCP.
+
+    Returns:
+        tuple with (IP, ethernet component)
+    """
     logger.info('Assigning {} to {}'.format(ip, instance))
     # pass base_object as param to make sure that this ethernet is assigned
     # to currently transitioned instance
@@ -661,16 +680,18 @@ def _create_dhcp_entries_for_single_instance(
 def _create_dhcp_entries_for_many_instances(instances, ip_or_network):
     """
     Assign IP and create DHCP entries for multiple instances.
+
+    IPs for all instances are reserved at once (in single transaction).
     """
-    for instance in instances:
+    network = Network.objects.get(pk=ip_or_network['value'])
+    ips = network.issue_next_free_ips(len(instances))
+    for instance, ip in zip(instances, ips):
         # when IP is assigned to many instances, mac is not provided through
         # form and first non-mgmt mac should be used
         ethernet = _get_non_mgmt_ethernets(instance).values_list(
             'id', flat=True
         ).first()  # TODO: is first the best choice here?
-        yield _create_dhcp_entries_for_single_instance(
-            instance, ip_or_network, ethernet
-        )
+        yield _create_dhcp_entry(instance, ip, ethernet)
 
 
 @deployment_action(
@@ -682,22 +703,51 @@ def _create_dhcp_entries_for_many_instances(instances, ip_or_network):
 def wait_for_dhcp_servers(cls, instances, **kwargs):
     """
     Wait until DHCP servers ping to Ralph.
+
+    Job is frozen until then (instead of holding worker) - it's unfrozen by
+    sync request of DHCP server (see `unfreeze_waiting_for_dhcp_servers`).
     """
     created = kwargs['shared_params']['dhcp_entry_created_date']
-    # TODO: rescheduler instead of while
     network_environment_ids = []
     for ip in kwargs['shared_params']['ip_addresses'].values():
         network_environment_ids.append(ip.network.network_environment_id)
 
-    while True:
-        servers_sync_list = DHCPServer.objects.filter(
-            Q(network_environment__isnull=True) |
-            Q(network_environment_id__in=network_environment_ids)
-        ).values_list('last_synchronized', flat=True)
-        for server_sync_date in servers_sync_list:
-            if created < server_sync_date:
-                return
-        time.sleep(1)
+    servers_sync_list = DHCPServer.objects.filter(
+        Q(network_environment__isnull=True) |
+        Q(network_environment_id__in=network_environment_ids)
+    ).values_list('last_synchronized', flat=True)
+    for server_sync_date in servers_sync_list:
+        if server_sync_date and created < server_sync_date:
+            return
+    raise RescheduleAsyncTransitionActionLater(freeze=True)
+
+
+def unfreeze_waiting_for_dhcp_servers(dhcp_server):
+    """
+    Unfreeze transition jobs waiting (in `wait_for_dhcp_servers`) for
+    synchronization of `dhcp_server`.
+    """
+    jobs = TransitionJob.objects.filter(
+        status=JobStatus.FROZEN,
+        transition_job_actions__action_name=wait_for_dhcp_servers.__name__,
+        transition_job_actions__status=TransitionJobActionStatus.STARTED,
+    ).distinct()
+    if dhcp_server.network_environment_id is not None:
+        # server of single environment - unfreeze only jobs of objects with
+        # IPs in this environment
+        jobs = jobs.filter(object_id__in=Subquery(
+            IPAddress.objects.filter(
+                network__network_environment_id=(
+                    dhcp_server.network_environment_id
+                ),
+            ).annotate(
+                base_object_id_str=Cast('ethernet__base_object_id', CharField())
+            ).values('base_object_id_str')
+        ))
+    for job in jobs:
+        # job could be already unfrozen by sync of another server
+        if job.unfreeze():
+            logger.info('%s unfrozen after DHCP server sync', job)
 
 
 @deployment_action(
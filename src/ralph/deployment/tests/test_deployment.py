@@ -3,11 +3,15 @@ from unittest import mock
 
 from ddt import data, ddt, unpack
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.test import override_settings, TestCase
 
 from ralph.assets.models import Ethernet
-from ralph.assets.tests.factories import ServiceEnvironmentFactory
+from ralph.assets.tests.factories import (
+    EthernetFactory,
+    ServiceEnvironmentFactory
+)
 from ralph.data_center.tests.factories import (
     DataCenterAssetFactory,
     RackFactory
@@ -15,11 +19,21 @@ from ralph.data_center.tests.factories import (
 from ralph.deployment.deployment import (
     autocomplete_service_env,
     check_if_network_environment_exists,
+    unfreeze_waiting_for_dhcp_servers,
     validate_ip_address
 )
 from ralph.deployment.tests.factories import _get_deployment
 from ralph.deployment.utils import _render_configuration
 from ralph.dhcp.models import DHCPServer
+from ralph.lib.external_services.models import JobStatus
+from ralph.lib.transitions.exceptions import (
+    RescheduleAsyncTransitionActionLater
+)
+from ralph.lib.transitions.models import (
+    TransitionJobAction,
+    TransitionJobActionStatus
+)
+from ralph.lib.transitions.tests.factories import TransitionJobFactory
 from ralph.networks.models.networks import IPAddress, IPAddressStatus, Network
 from ralph.networks.tests.factories import (
     IPAddressFactory,
@@ -138,6 +152,87 @@ class _BaseTestDeploymentActionsTestCase(object):
         }
         self.instance.__class__.wait_for_dhcp_servers([self.instance], **kwargs)
 
+    def test_dhcp_servers_wait_freezes_job_until_sync(self):
+        net = Network.objects.create(
+            name='net', address='192.169.58.0/24',
+            network_environment=NetworkEnvironmentFactory()
+        )
+        ip = IPAddress.objects.create(address='192.169.58.1')
+        DHCPServer.objects.create(
+            ip='10.0.0.1',
+            network_environment=net.network_environment,
+            last_synchronized=None
+        )
+        kwargs = {
+            'shared_params': {
+                'dhcp_entry_created_date': datetime.datetime.now(),
+                'ip_addresses': {
+                    self.instance.pk: ip
+                }
+            }
+        }
+        with self.assertRaises(RescheduleAsyncTransitionActionLater) as e:
+            self.instance.__class__.wait_for_dhcp_servers(
+                [self.instance], **kwargs
+            )
+        self.assertTrue(e.exception.freeze)
+
+    def _create_job_waiting_for_dhcp(self, network_environment):
+        IPAddressFactory(
+            ethernet__base_object=self.instance,
+            network=NetworkFactory(
+                address='10.20.30.0/24',
+                network_environment=network_environment
+            ),
+            address='10.20.30.40',
+        )
+        job = TransitionJobFactory(
+            content_type=ContentType.objects.get_for_model(self.instance),
+            object_id=self.instance.pk,
+            status=JobStatus.FROZEN,
+        )
+        TransitionJobAction.objects.create(
+            transition_job=job,
+            action_name='wait_for_dhcp_servers',
+            status=TransitionJobActionStatus.STARTED,
+        )
+        return job
+
+    @mock.patch('ralph.lib.transitions.models.TransitionJob.unfreeze')
+    def test_unfreeze_waiting_for_dhcp_servers(self, unfreeze_mock):
+        network_environment = NetworkEnvironmentFactory()
+        self._create_job_waiting_for_dhcp(network_environment)
+        unfreeze_waiting_for_dhcp_servers(DHCPServer.objects.create(
+            ip='10.0.0.1', network_environment=network_environment,
+        ))
+        self.assertEqual(unfreeze_mock.call_count, 1)
+
+    @mock.patch('ralph.lib.external_services.models.InternalService')
+    def test_unfreeze_waiting_for_dhcp_servers_queues_job_once(
+        self, service_mock
+    ):
+        network_environment = NetworkEnvironmentFactory()
+        job = self._create_job_waiting_for_dhcp(network_environment)
+        for ip in ('10.0.0.1', '10.0.0.2'):
+            unfreeze_waiting_for_dhcp_servers(DHCPServer.objects.create(
+                ip=ip, network_environment=network_environment,
+            ))
+        service_mock.return_value.run_async.assert_called_once_with(
+            job_id=job.id
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+
+    @mock.patch('ralph.lib.transitions.models.TransitionJob.unfreeze')
+    def test_unfreeze_waiting_for_dhcp_servers_other_environment(
+        self, unfreeze_mock
+    ):
+        self._create_job_waiting_for_dhcp(NetworkEnvironmentFactory())
+        unfreeze_waiting_for_dhcp_servers(DHCPServer.objects.create(
+            ip='10.0.0.1', network_environment=NetworkEnvironmentFactory(),
+        ))
+        self.assertEqual(unfreeze_mock.call_count, 0)
+
     def test_clean_ipaddresses(self):
         ip = IPAddressFactory(ethernet__base_object=self.instance)
         ip_mgmt = IPAddressFactory(
@@ -321,6 +416,40 @@ class DataCenterAssetDeploymentActionsTestCase(
         self.instance.rack = self.rack
         self.instance.save()
 
+    def test_create_dhcp_entries_for_many_instances(self):
+        self._prepare_rack()
+        self.net.reserved_from_beginning = 0
+        self.net.save()
+        instances = [self.instance, DataCenterAssetFactory(rack=self.rack)]
+        for i, instance in enumerate(instances):
+            instance.hostname = 's1000{}.mydc.net'.format(i)
+            instance.save()
+            EthernetFactory(
+                base_object=instance, mac='aa:bb:cc:dd:ee:0{}'.format(i)
+            )
+        history = {instance.pk: {} for instance in instances}
+        shared_params = {'ip_addresses': {}}
+        self.instance.__class__.create_dhcp_entries(
+            instances,
+            ip_or_network={'value': self.net.pk},
+            ethernet=None,
+            history_kwargs=history,
+            shared_params=shared_params,
+        )
+        self.assertEqual(history, {
+            instances[0].pk: {
+                'ip': '10.20.30.1', 'mac': 'AA:BB:CC:DD:EE:00'
+            },
+            instances[1].pk: {
+                'ip': '10.20.30.2', 'mac': 'AA:BB:CC:DD:EE:01'
+            },
+        })
+        for i, instance in enumerate(instances):
+            ip = shared_params['ip_addresses'][instance.pk]
+            self.assertTrue(ip.dhcp_expose)
+            self.assertEqual(ip.hostname, instance.hostname)
+            self.assertEqual(ip.ethernet.base_object.pk, instance.pk)
+
 
 class VirtualServerDeploymentActionsTestCase(
     _BaseTestDeploymentActionsTestCase, TestCase
@@ -1,9 +1,18 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from ralph.assets.models import Ethernet
+from ralph.deployment.models import Deployment
+from ralph.dhcp.snapshots import invalidate_snapshots
 from ralph.lib.mixins.models import AdminAbsoluteUrlMixin, NamedMixin
-from ralph.networks.models.networks import IPAddress, NetworkEnvironment
+from ralph.networks.models.networks import (
+    IPAddress,
+    Network,
+    NetworkEnvironment
+)
+from ralph.signals import post_commit
 
 
 class DHCPEntryManager(models.Manager):
@@ -100,3 +109,12 @@ class DNSServer(AdminAbsoluteUrlMixin, models.Model):
 
     def __str__(self):
         return self.ip_address
+
+
+# every change of data used in DHCP configs makes config snapshots outdated
+for model in (
+    Network, NetworkEnvironment, IPAddress, DHCPEntry, Ethernet, Deployment,
+    DNSServer, DNSServerGroup, DNSServerGroupOrder,
+):
+    for signal in (post_save, post_delete):
+        post_commit(invalidate_snapshots, model, signal, single_call=False)
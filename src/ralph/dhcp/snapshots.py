@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of rendered DHCP configs (snapshots).
+
+Every DHCP server polls for the same config (for the same set of network
+environments), so rendered config is stored in Django cache and shared by
+all of them. Snapshots are keyed by version of DHCP data, which is changed
+after commit of every change of related models (see `ralph.dhcp.models`),
+so config is rendered (at most) once per change.
+"""
+import gzip
+import logging
+import zlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'ralph.dhcp.snapshots.version'
+
+
+def get_snapshots_version():
+    """
+    Return current version of DHCP data (None if it could not be stored in
+    cache).
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def invalidate_snapshots(instance=None):
+    """
+    Change version of DHCP data (making every snapshot outdated).
+    """
+    cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+def get_snapshot_key(name, *parts):
+    """
+    Return cache key of snapshot of config `name` for passed key parts
+    (or None if snapshots are not available).
+    """
+    if not settings.USE_CACHE:
+        return None
+    version = get_snapshots_version()
+    if version is None:
+        return None
+    return 'ralph.dhcp.snapshots.{}:{}:{}'.format(
+        name, version, ':'.join(str(part) for part in parts)
+    )
+
+
+def get_snapshot(key):
+    """
+    Return (content, compressed) of snapshot stored under `key` or None.
+    """
+    return cache.get(key)
+
+
+def set_snapshot(key, content):
+    """
+    Store rendered config (compressed, if DHCP_CONFIG_SNAPSHOT_COMPRESS is
+    set) under `key`.
+
+    Returns:
+        (content, compressed) tuple, as stored in cache
+    """
+    snapshot = (content, False)
+    if settings.DHCP_CONFIG_SNAPSHOT_COMPRESS:
+        snapshot = (gzip.compress(content), True)
+    cache.set(key, snapshot, settings.DHCP_CONFIG_SNAPSHOT_TIMEOUT)
+    logger.debug('DHCP config snapshot %s stored', key)
+    return snapshot
+
+
+def store_snapshot_chunks(key, chunks):
+    """
+    Yield rendered config chunks (bytes) and store the whole config as
+    snapshot under `key` after the last one (compressing it on the fly, if
+    DHCP_CONFIG_SNAPSHOT_COMPRESS is set).
+    """
+    compressed = settings.DHCP_CONFIG_SNAPSHOT_COMPRESS
+    # gzip file format (the same as `gzip.compress`)
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    parts = []
+    for chunk in chunks:
+        parts.append(compressor.compress(chunk) if compressed else chunk)
+        yield chunk
+    if compressed:
+        parts.append(compressor.flush())
+    cache.set(
+        key, (b''.join(parts), compressed),
+        settings.DHCP_CONFIG_SNAPSHOT_TIMEOUT
+    )
+    logger.debug('DHCP config snapshot %s stored', key)
@@ -1,14 +1,17 @@
+import gzip
 import re
+from unittest.mock import patch
 
 from ddt import data, ddt, unpack
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import override_settings, TestCase, TransactionTestCase
 from django.urls import reverse
 from django.utils.http import http_date
 
 from ralph.assets.tests.factories import EthernetFactory
 from ralph.data_center.tests.factories import DataCenterAssetFactory
-from ralph.dhcp.models import DHCPEntry
+from ralph.dhcp.models import DHCPEntry, DHCPServer, DNSServer
+from ralph.dhcp.snapshots import get_snapshots_version
 from ralph.dhcp.views import DHCPEntriesView
 from ralph.networks.models.networks import Network
 from ralph.networks.tests.factories import IPAddressFactory, NetworkFactory
@@ -46,6 +49,28 @@ class DHCPConfigTest(TestCase):
         )
         self.assertEqual(response.status_code, 304)
 
+    def test_config_endpoint_should_return_304_for_matching_etag(self):
+        network = NetworkFactory(address='192.168.1.0/24')
+        url = '{}?env={}'.format(
+            reverse('dhcp_config_entries'), network.network_environment
+        )
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_config_endpoint_should_not_render_config_for_304(self):
+        network = NetworkFactory(address='192.168.1.0/24')
+        url = '{}?env={}'.format(
+            reverse('dhcp_config_entries'), network.network_environment
+        )
+        with patch.object(DHCPEntriesView, 'get_context_data') as mock:
+            response = self.client.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE=http_date(network.modified.timestamp())
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(mock.called)
+
     @unpack
     @data(
         ('dc=foo&env=bar', 'Only DC or ENV mode available.'),
@@ -137,13 +162,29 @@ class DHCPEntriesViewTest(TestCase):
             ethernet.modified.strftime("%Y-%m-%d %H:%M:%S")
         )
 
-    def test_get_last_modified_should_run_5_queries(self):
+    def test_get_last_modified_should_run_1_query(self):
         network = NetworkFactory(address='192.168.1.0/24')
-        with self.assertNumQueries(5):
+        with self.assertNumQueries(1):
             self.view.get_last_modified(
                 Network.objects.filter(id__in=[network.id])
             )
 
+    def test_etag_should_change_after_removing_entry(self):
+        network = NetworkFactory(address='192.168.1.0/24')
+        ip = IPAddressFactory(
+            address='192.168.1.2', hostname='host1.mydc.net',
+            ethernet=EthernetFactory(base_object=DataCenterAssetFactory()),
+            dhcp_expose=True
+        )
+        networks = Network.objects.filter(id__in=[network.id])
+        last_modified, etag = self.view.get_config_state(networks)
+        self.assertEqual(DHCPEntry.objects.count(), 1)
+        # removing entry doesn't change last modified date
+        ip.delete()
+        new_last_modified, new_etag = self.view.get_config_state(networks)
+        self.assertLessEqual(new_last_modified, last_modified)
+        self.assertNotEqual(new_etag, etag)
+
     def test_filter_duplicated_hostnames(self):
         network = NetworkFactory(address='192.168.1.0/24')
         asset = DataCenterAssetFactory()
@@ -171,3 +212,131 @@ class DHCPEntriesViewTest(TestCase):
         self.assertEqual(DHCPEntry.objects.count(), 3)
         self.assertEqual(len(entries), 1)
         self.assertEqual(entries[0].pk, ip.pk)
+
+
+class DHCPEntriesStreamingTest(TestCase):
+    def setUp(self):
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+        network = NetworkFactory(address='192.168.1.0/24')
+        for i, hostname in enumerate([
+            'host1.mydc.net', 'host2.mydc.net', 'h&3.mydc.net',
+            'host4.mydc.net', 'host5.mydc.net',
+        ], start=2):
+            IPAddressFactory(
+                address='192.168.1.{}'.format(i), hostname=hostname,
+                ethernet=EthernetFactory(base_object=DataCenterAssetFactory()),
+                dhcp_expose=True
+            )
+        self.url = '{}?env={}'.format(
+            reverse('dhcp_config_entries'), network.network_environment
+        )
+
+    def _get_streamed_content(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    @override_settings(
+        DHCP_ENTRIES_STREAMING=True, DHCP_ENTRIES_STREAMING_CHUNK_SIZE=2
+    )
+    def test_streamed_config_should_be_the_same_as_rendered(self):
+        streamed = self._get_streamed_content()
+        with override_settings(DHCP_ENTRIES_STREAMING=False):
+            rendered = self.client.get(self.url).content
+        self.assertEqual(streamed, rendered)
+        self.assertIn(b'h&amp;3.mydc.net', streamed)
+
+    @override_settings(DHCP_ENTRIES_STREAMING=True)
+    def test_streamed_config_without_entries(self):
+        DHCPEntry.objects.all().delete()
+        streamed = self._get_streamed_content()
+        with override_settings(DHCP_ENTRIES_STREAMING=False):
+            rendered = self.client.get(self.url).content
+        self.assertEqual(streamed, rendered)
+
+    @override_settings(DHCP_ENTRIES_STREAMING=True, USE_CACHE=True)
+    def test_streamed_config_should_be_stored_as_snapshot(self):
+        streamed = self._get_streamed_content()
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.streaming)
+        self.assertEqual(gzip.decompress(response.content), streamed)
+
+
+@override_settings(USE_CACHE=True)
+class DHCPConfigSnapshotTest(TransactionTestCase):
+    def setUp(self):
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+        network = NetworkFactory(address='192.168.1.0/24')
+        IPAddressFactory(
+            address='192.168.1.2', hostname='host1.mydc.net',
+            ethernet=EthernetFactory(base_object=DataCenterAssetFactory()),
+            dhcp_expose=True
+        )
+        self.url = '{}?env={}'.format(
+            reverse('dhcp_config_entries'), network.network_environment
+        )
+
+    def test_config_should_be_rendered_once(self):
+        with patch.object(
+            DHCPEntriesView, 'get_context_data',
+            side_effect=DHCPEntriesView.get_context_data, autospec=True
+        ) as get_context_data_mock:
+            response = self.client.get(self.url)
+            response2 = self.client.get(self.url)
+        self.assertEqual(get_context_data_mock.call_count, 1)
+        self.assertIn(b'host1.mydc.net', response.content)
+        self.assertEqual(response.content, response2.content)
+
+    def test_config_should_be_returned_compressed(self):
+        content = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), content)
+
+    def test_snapshot_should_be_invalidated_after_change(self):
+        self.client.get(self.url)
+        version = get_snapshots_version()
+        DNSServer.objects.create(ip_address='10.0.0.1')
+        self.assertNotEqual(get_snapshots_version(), version)
+
+    @override_settings(DHCP_CONFIG_SNAPSHOT_COMPRESS=False)
+    def test_config_should_be_rendered_after_change(self):
+        self.client.get(self.url)
+        ip = DHCPEntry.objects.get()
+        ip.hostname = 'host2.mydc.net'
+        ip.save()
+        response = self.client.get(self.url)
+        self.assertIn(b'host2.mydc.net', response.content)
+
+
+class DHCPSyncViewTest(TransactionTestCase):
+    def setUp(self):
+        get_user_model().objects.create_superuser(
+            'test', 'test@test.test', 'test'
+        )
+        self.client.login(username='test', password='test')
+        self.dhcp_server = DHCPServer.objects.create(ip='10.0.0.1')
+
+    @patch('ralph.dhcp.views.unfreeze_waiting_for_dhcp_servers')
+    def test_sync_should_unfreeze_waiting_transitions(self, unfreeze_mock):
+        response = self.client.get(
+            reverse('dhcp_config_sync'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.dhcp_server.refresh_from_db()
+        self.assertIsNotNone(self.dhcp_server.last_synchronized)
+        unfreeze_mock.assert_called_once_with(self.dhcp_server)
+
+    @patch('ralph.dhcp.views.unfreeze_waiting_for_dhcp_servers')
+    def test_sync_of_unknown_server_should_return_404(self, unfreeze_mock):
+        response = self.client.get(
+            reverse('dhcp_config_sync'), REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(unfreeze_mock.called)
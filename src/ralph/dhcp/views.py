@@ -1,21 +1,47 @@
+import gzip
+import hashlib
 import logging
+from functools import partial
 
-from django.db.models import Count, Prefetch
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count,
+    F,
+    IntegerField,
+    Max,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum
+)
 from django.http import (
     HttpResponse,
     HttpResponseBadRequest,
     HttpResponseNotFound,
-    HttpResponseNotModified
+    StreamingHttpResponse
 )
-from django.utils.http import http_date, parse_http_date_safe
+from django.middleware.gzip import re_accepts_gzip
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.views.generic.base import TemplateView
 from rest_framework.views import APIView
 
 from ralph.admin.helpers import get_client_ip
 from ralph.assets.models.components import Ethernet
 from ralph.data_center.models import DataCenter
+from ralph.deployment.deployment import unfreeze_waiting_for_dhcp_servers
 from ralph.deployment.models import Deployment
 from ralph.dhcp.models import DHCPEntry, DHCPServer, DNSServer
+from ralph.dhcp.snapshots import (
+    get_snapshot,
+    get_snapshot_key,
+    set_snapshot,
+    store_snapshot_chunks
+)
 from ralph.networks.models.networks import (
     IPAddress,
     Network,
@@ -25,37 +51,77 @@ from ralph.networks.models.networks import (
 logger = logging.getLogger(__name__)
 
 
-def last_modified_date(qs, filter_dict=None):
-    last_date = None
-    if filter_dict is None:
-        filter_dict = {}
-    obj = qs.filter(**filter_dict).order_by('-modified').first()
-    if obj:
-        last_date = obj.modified
-    return last_date
+def latest_modified(qs):
+    """
+    Return (correlated) subquery selecting the latest ``modified`` date from
+    queryset.
+    """
+    return Subquery(qs.order_by('-modified').values('modified')[:1])
+
+
+def count_subquery(qs, group_by):
+    """
+    Return (correlated) subquery counting rows of queryset.
+    """
+    return Subquery(
+        qs.order_by().values(group_by).annotate(
+            count=Count('pk')
+        ).values('count')[:1],
+        output_field=IntegerField()
+    )
+
+
+def _max_date(*dates):
+    dates = [date for date in dates if date is not None]
+    if not dates:
+        return None
+    return max(dates)
 
 
 class LastModifiedMixin(object):
-    """Add last modified to HTTP response if last_modified attr is exist."""
+    """
+    Add Last-Modified and ETag headers to HTTP response (when
+    `get_config_state` returns them) and return 304 Not Modified response
+    without rendering the config if client has the current version already.
+    """
+    last_modified = None
+    etag = None
 
     @property
     def last_timestamp(self):
         last_modified = getattr(self, 'last_modified', None)
         return last_modified and int(last_modified.timestamp())
 
-    def is_modified(self, request):
-        http_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
-        if http_modified_since is None or self.last_timestamp is None:
-            return True
-        return self.last_timestamp > parse_http_date_safe(http_modified_since)
+    def get_config_state(self, networks):
+        """
+        Return (last modified date, ETag) of the config for networks.
+        """
+        raise NotImplementedError()
+
+    def get_last_modified(self, networks):
+        return self.get_config_state(networks)[0]
 
     def dispatch(self, request, *args, **kwargs):
+        not_modified = get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_timestamp
+        )
+        if not_modified is not None:
+            return not_modified
         response = super().dispatch(request, *args, **kwargs)
-        if not self.is_modified(request):
-            return HttpResponseNotModified()
-        response['Last-Modified'] = http_date(self.last_timestamp)
+        if self.last_timestamp is not None:
+            response['Last-Modified'] = http_date(self.last_timestamp)
+        if self.etag is not None:
+            response['ETag'] = self.etag
         return response
 
+    @staticmethod
+    def _make_etag(*values):
+        if any(value is None for value in values):
+            return None
+        return quote_etag(hashlib.md5(
+            ':'.join(str(value) for value in values).encode()
+        ).hexdigest())
+
 
 class DHCPConfigMixin(object):
     content_type = 'text/plain'
@@ -104,16 +170,74 @@ class DHCPConfigMixin(object):
                     content_type='text/plain'
                 )
             environments = found
+        self.environments = environments
         self.networks = Network.objects.select_related(
             'network_environment'
         ).filter(
             network_environment__in=environments,
             dhcp_broadcast=True,
         )
-        self.last_modified = self.get_last_modified(self.networks)
+        self.last_modified, self.etag = self.get_config_state(self.networks)
         return super().dispatch(request, *args, **kwargs)
 
 
+class DHCPConfigSnapshotMixin(object):
+    """
+    Serve rendered config from snapshot (see `ralph.dhcp.snapshots`) shared
+    by every DHCP server asking for the same network environments.
+    """
+    snapshot_name = None
+
+    def is_streaming(self):
+        """
+        Return True if config should be rendered in chunks (see
+        `iter_content`) and streamed to the client.
+        """
+        return False
+
+    def iter_content(self):
+        raise NotImplementedError()
+
+    def get_snapshot_key(self):
+        environments_ids = sorted(
+            self.environments.values_list('pk', flat=True)
+        )
+        return get_snapshot_key(
+            self.snapshot_name,
+            ','.join(str(pk) for pk in environments_ids),
+            self.etag,
+        )
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_snapshot_key()
+        snapshot = get_snapshot(key) if key else None
+        if snapshot is None:
+            if self.is_streaming():
+                chunks = self.iter_content()
+                if key is not None:
+                    chunks = store_snapshot_chunks(key, chunks)
+                return StreamingHttpResponse(
+                    chunks, content_type=self.content_type
+                )
+            response = super().get(request, *args, **kwargs)
+            if key is None:
+                return response
+            snapshot = set_snapshot(
+                key, response.rendered_content.encode(settings.DEFAULT_CHARSET)
+            )
+        content, compressed = snapshot
+        accepts_gzip = re_accepts_gzip.search(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if compressed and not accepts_gzip:
+            content, compressed = gzip.decompress(content), False
+        response = HttpResponse(content, content_type=self.content_type)
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
 class DHCPSyncView(APIView):
     def get(self, request, *args, **kwargs):
         ip = get_client_ip(request)
@@ -122,46 +246,57 @@ class DHCPSyncView(APIView):
             return HttpResponseNotFound(
                 'DHCP server doesn\'t exist.', content_type='text/plain'
             )
+        # wake up transitions waiting for this server (after commit, to let
+        # them see new synchronization date)
+        transaction.on_commit(partial(
+            unfreeze_waiting_for_dhcp_servers, DHCPServer.objects.get(ip=ip)
+        ))
         return HttpResponse('OK', content_type='text/plain')
 
 
 class DHCPEntriesView(
-    DHCPConfigMixin, LastModifiedMixin, TemplateView, APIView
+    DHCPConfigMixin, LastModifiedMixin, DHCPConfigSnapshotMixin, TemplateView,
+    APIView
 ):
     http_method_names = ['get']
     template_name = 'dhcp/entries.conf'
+    snapshot_name = 'entries'
 
-    def get_last_modified(self, networks):
+    def get_config_state(self, networks):
         """
         Return the latest date based on ``modified`` field from networks,
-        IP (DHCP entry), ethernet.
-        """
-        last_items = []
-
-        try:
-            last_items.append(Deployment.objects.latest('modified').modified)
-        except Deployment.DoesNotExist:
-            pass
-        last_items.append(last_modified_date(networks))
-        last_items.append(
-            last_modified_date(DHCPEntry.objects, filter_dict={
-                'network__in': networks
-            })
-        )
-        last_items.append(
-            last_modified_date(Ethernet.objects, filter_dict={
-                'ipaddress__network__in': networks
-            })
-        )
-        last_items.append(
-            last_modified_date(IPAddress.objects, filter_dict={
-                'network__in': networks
-            })
-        )
-        last_items = [item for item in last_items if item is not None]
-        if not last_items:
-            return None
-        return max(last_items)
+        IPs (DHCP entries), ethernets and deployments and ETag based on it
+        and number of DHCP entries (so removing entry changes ETag too).
+
+        Everything is calculated using single aggregate query.
+        """
+        state = networks.annotate(
+            ip_modified=latest_modified(
+                IPAddress.objects.filter(network=OuterRef('pk'))
+            ),
+            ethernet_modified=latest_modified(
+                Ethernet.objects.filter(ipaddress__network=OuterRef('pk'))
+            ),
+            deployment_modified=latest_modified(Deployment.objects.all()),
+            network_entries_count=count_subquery(
+                DHCPEntry.objects.filter(network=OuterRef('pk')), 'network'
+            ),
+        ).aggregate(
+            networks_modified=Max('modified'),
+            ips_modified=Max('ip_modified'),
+            ethernets_modified=Max('ethernet_modified'),
+            deployments_modified=Max('deployment_modified'),
+            entries_count=Sum('network_entries_count'),
+            networks_count=Count('pk'),
+        )
+        last_modified = _max_date(
+            state['networks_modified'], state['ips_modified'],
+            state['ethernets_modified'], state['deployments_modified'],
+        )
+        return last_modified, self._make_etag(
+            last_modified and last_modified.isoformat(),
+            state['networks_count'], state['entries_count'] or 0,
+        )
 
     def _filter_dhcp_entries(self, entries):
         """
@@ -184,6 +319,67 @@ class DHCPEntriesView(
             network__in=networks
         ).order_by('hostname'))
 
+    def _iter_dhcp_entries_values(self, networks, chunk_size):
+        """
+        Iterate over filtered DHCP entries for given networks (as dicts with
+        fields used in config), fetching `chunk_size` entries at once (using
+        keyset pagination on (unique after filtering) hostname).
+        """
+        entries = self._get_dhcp_entries(networks).values(
+            'hostname', 'address', mac=F('ethernet__mac')
+        )
+        last_hostname = None
+        while True:
+            chunk = entries
+            if last_hostname is not None:
+                chunk = chunk.filter(hostname__gt=last_hostname)
+            chunk = list(chunk[:chunk_size])
+            yield from chunk
+            if len(chunk) < chunk_size:
+                break
+            last_hostname = chunk[-1]['hostname']
+
+    def is_streaming(self):
+        return settings.DHCP_ENTRIES_STREAMING
+
+    def iter_content(self):
+        """
+        Render config in chunks - template is rendered part by part (text
+        before entries loop, loop body for every entry and text after the
+        loop), so the result is exactly the same as the whole template.
+        """
+        template = get_template(self.template_name).template
+        loop_idx, loop_node = next(
+            (idx, node) for idx, node in enumerate(template.nodelist)
+            if isinstance(node, ForNode)
+        )
+        entries = self._iter_dhcp_entries_values(
+            self.networks, settings.DHCP_ENTRIES_STREAMING_CHUNK_SIZE
+        )
+        context = make_context(
+            {'last_modified': self.last_modified}, self.request
+        )
+        with context.render_context.push_state(template), \
+                context.bind_template(template):
+            yield self._render_nodes(template.nodelist[:loop_idx], context)
+            chunk = []
+            for entry in entries:
+                with context.push({loop_node.loopvars[0]: entry}):
+                    chunk.append(loop_node.nodelist_loop.render(context))
+                if len(chunk) >= settings.DHCP_ENTRIES_STREAMING_CHUNK_SIZE:
+                    yield ''.join(chunk).encode(settings.DEFAULT_CHARSET)
+                    chunk = []
+            yield ''.join(chunk).encode(settings.DEFAULT_CHARSET)
+            yield self._render_nodes(
+                template.nodelist[loop_idx + 1:], context
+            )
+
+    @staticmethod
+    def _render_nodes(nodes, context):
+        return ''.join(
+            node.render_annotated(context) for node in nodes
+        ).encode(settings.DEFAULT_CHARSET)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
@@ -194,28 +390,38 @@ class DHCPEntriesView(
 
 
 class DHCPNetworksView(
-    DHCPConfigMixin, LastModifiedMixin, TemplateView, APIView
+    DHCPConfigMixin, LastModifiedMixin, DHCPConfigSnapshotMixin, TemplateView,
+    APIView
 ):
     template_name = 'dhcp/networks.conf'
+    snapshot_name = 'networks'
 
-    def get_last_modified(self, networks):
-        last_items = []
-        last_items.append(last_modified_date(networks))
-        last_items.append(
-            last_modified_date(NetworkEnvironment.objects, filter_dict={
-                'network__in': networks
-            })
-        )
-        last_items.append(
-            last_modified_date(IPAddress.objects, filter_dict={
-                'network__in': networks,
-                'is_gateway': True
-            })
-        )
-        last_items = [item for item in last_items if item is not None]
-        if not last_items:
-            return None
-        return max(last_items)
+    def get_config_state(self, networks):
+        """
+        Return the latest date based on ``modified`` field from networks,
+        their environments and gateways and ETag based on it and number of
+        networks.
+
+        Everything is calculated using single aggregate query.
+        """
+        state = networks.annotate(
+            gateway_modified=latest_modified(IPAddress.objects.filter(
+                network=OuterRef('pk'), is_gateway=True
+            )),
+        ).aggregate(
+            networks_modified=Max('modified'),
+            environments_modified=Max('network_environment__modified'),
+            gateways_modified=Max('gateway_modified'),
+            networks_count=Count('pk'),
+        )
+        last_modified = _max_date(
+            state['networks_modified'], state['environments_modified'],
+            state['gateways_modified'],
+        )
+        return last_modified, self._make_etag(
+            last_modified and last_modified.isoformat(),
+            state['networks_count'],
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
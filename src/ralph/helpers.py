@@ -4,6 +4,7 @@ from functools import wraps
 
 from django.conf import settings
 from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.db.models import Case, Value, When
 from django.http import HttpResponse
 
 logger = logging.getLogger(__name__)
@@ -41,6 +42,29 @@ def generate_pdf_response(pdf_data, file_name):
     )
     return response
 
+
+def bulk_update(queryset, values, batch_size=500):
+    """
+    Update objects from `queryset` using single UPDATE query per batch.
+    `values` is a dict with dict of new values of fields (the same fields
+    for every object) by object's pk.
+    """
+    model = queryset.model
+    pks = list(values)
+    for i in range(0, len(pks), batch_size):
+        batch = pks[i:i + batch_size]
+        fields = values[batch[0]].keys()
+        queryset.filter(pk__in=batch).update(**{
+            field: Case(
+                *[
+                    When(pk=pk, then=Value(values[pk][field]))
+                    for pk in batch
+                ],
+                output_field=model._meta.get_field(field)
+            )
+            for field in fields
+        })
+
 CACHE_DEFAULT = object()
 
 
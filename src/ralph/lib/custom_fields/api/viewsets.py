@@ -23,6 +23,8 @@ class ObjectCustomFieldsViewSet(viewsets.ModelViewSet):
     related_model_router_lookup = 'object'
     # lookup field by related model in CustomFieldValue
     related_model_lookup_field = 'object_id'
+    # permissions to restricted custom fields are checked in create/update
+    bulk_write = False
     # name of related model in url pattern
     related_model_url_field = 'object_pk'
 
@@ -2,6 +2,7 @@ import time
 
 import django_rq
 from django.conf import settings
+from rq.job import JobStatus
 
 
 class QueuedServiceError(Exception):
@@ -10,6 +11,10 @@ class QueuedServiceError(Exception):
 
 class ExternalService(object):
     services = settings.RALPH_EXTERNAL_SERVICES
+    # interval of checking status of jobs is doubled (up to the max) after
+    # every check
+    poll_interval = 0.05
+    max_poll_interval = 1
 
     def __init__(self, service_name):
         """Initializing queue and check existence of service."""
@@ -18,6 +23,7 @@ class ExternalService(object):
             raise ValueError('The {} service doesn\'t exist'.format(service))
         self.method = service['method']
         self.queue = django_rq.get_queue(service['queue_name'])
+        self.timeout = service.get('timeout')
 
     def run(self, **kwargs):
         """Run function with params on external service.
@@ -34,14 +40,78 @@ class ExternalService(object):
             external method.
 
         Raises:
-            QueuedServiceError: If something goes wrong on queue.
+            QueuedServiceError: If something goes wrong on queue or job
+                didn't finish in `timeout` of service.
         """
         job = self.queue.enqueue(self.method, **kwargs)
         if not job.is_queued:
             raise QueuedServiceError
-        while job and not any([job.is_finished, job.is_failed]):
-            time.sleep(0.1)
-        return job.result
+        return self.wait_for_results([job], self.timeout)[0]
+
+    def run_many(self, kwargs_list, timeout=None):
+        """Run function on external service for every params in
+        `kwargs_list` at once and wait for all results.
+
+        Args:
+            kwargs_list: A list of dictonaries with params.
+            timeout: Max time (in seconds) of waiting for all results
+                (`timeout` of service by default).
+
+        Returns:
+            List of external function results (in order of `kwargs_list`).
+
+        Raises:
+            QueuedServiceError: If any job failed or didn't finish on time.
+        """
+        jobs = [self.run_async(**kwargs) for kwargs in kwargs_list]
+        return self.wait_for_results(
+            jobs, self.timeout if timeout is None else timeout
+        )
+
+    def wait_for_results(self, jobs, timeout=None):
+        """Wait until all `jobs` are finished and return their results.
+
+        Status of every job still being processed is checked in RQ. When any
+        job failed or `timeout` (in seconds) has passed, unfinished jobs are
+        cancelled.
+
+        Raises:
+            QueuedServiceError: If any job failed or didn't finish on time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = self.poll_interval
+        pending = list(jobs)
+        while True:
+            still_pending = []
+            for job in pending:
+                status = job.get_status()
+                if status == JobStatus.FINISHED:
+                    continue
+                if status in (JobStatus.FAILED, None):
+                    self._cancel(pending)
+                    raise QueuedServiceError(
+                        'Job {} failed: {}'.format(job.id, job.exc_info)
+                    )
+                still_pending.append(job)
+            pending = still_pending
+            if not pending:
+                return [job.result for job in jobs]
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._cancel(pending)
+                    raise QueuedServiceError(
+                        '{} of {} jobs not finished in {} seconds'.format(
+                            len(pending), len(jobs), timeout
+                        )
+                    )
+                interval = min(interval, remaining)
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+    def _cancel(self, jobs):
+        for job in jobs:
+            job.cancel()
 
     def run_async(self, **kwargs):
         job = self.queue.enqueue(self.method, kwargs=kwargs)
@@ -2,6 +2,7 @@
 import logging
 import uuid
 from datetime import date
+from functools import partial
 
 from dateutil.parser import parse
 from dj.choices import Choices
@@ -149,6 +150,21 @@ class Job(TimeStampMixin):
         ))
         self.save()
 
+    def claim(self):
+        """
+        Mark queued job as started, if it's not already taken by another
+        worker (or ended).
+
+        Returns:
+            True if job was claimed
+        """
+        claimed = Job.objects.filter(
+            pk=self.pk, status=JobStatus.QUEUED
+        ).update(status=JobStatus.STARTED)
+        if claimed:
+            self.status = JobStatus.STARTED
+        return bool(claimed)
+
     @collect_metrics('start')
     def start(self):
         """
@@ -164,11 +180,13 @@ class Job(TimeStampMixin):
         Reschedule the same job again.
         """
         # TODO: use rq scheduler
+        self.status = JobStatus.QUEUED
         self._update_dumped_params()
         logger.info('Rescheduling {}'.format(self))
         service = InternalService(self.service_name)
-        job = service.run_async(job_id=self.id)
-        return job
+        # job is queued after commit - until then worker would see it as
+        # (already) started and skip it
+        transaction.on_commit(partial(service.run_async, job_id=self.id))
 
     @collect_metrics('freeze')
     def freeze(self):
@@ -179,10 +197,25 @@ class Job(TimeStampMixin):
 
     @collect_metrics('unfreeze')
     def unfreeze(self):
+        """
+        Queue frozen job again. Job is claimed (marked as queued) first, so
+        it's queued only once, even if it's unfrozen by many processes at the
+        same time.
+
+        Returns:
+            True if job was queued
+        """
+        claimed = Job.objects.filter(
+            pk=self.pk, status=JobStatus.FROZEN
+        ).update(status=JobStatus.QUEUED)
+        if not claimed:
+            logger.info('{} is not frozen anymore'.format(self))
+            return False
         logger.info('Unfreezing {}'.format(self))
+        self.status = JobStatus.QUEUED
         service = InternalService(self.service_name)
-        job = service.run_async(job_id=self.id)
-        return job
+        service.run_async(job_id=self.id)
+        return True
 
     @collect_metrics('kill')
     def kill(self):
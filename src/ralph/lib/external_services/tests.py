@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 import json
+from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.test import RequestFactory, TestCase, TransactionTestCase
 from djmoney.money import Money
+from rq.job import JobStatus as RQJobStatus
 
+from ralph.lib.external_services.base import ExternalService, QueuedServiceError
 from ralph.lib.external_services.models import Job, JobStatus
 from ralph.tests.models import Bar, Foo
 
@@ -100,3 +103,63 @@ class JobRunTestCase(TransactionTestCase):
         self.assertEqual(Bar.objects.count(), prev_bar_count + 1)
         self.assertEqual(self.foo.bar, 'barbar')
         self.assertTrue(Bar.objects.filter(name='test1').exists())
+
+
+def _get_rq_job(statuses, result=None):
+    job = MagicMock(result=result)
+    job.get_status.side_effect = statuses
+    return job
+
+
+@patch('ralph.lib.external_services.base.time.sleep')
+@patch('ralph.lib.external_services.base.django_rq.get_queue')
+class ExternalServiceRunManyTestCase(TestCase):
+    def test_run_many_returns_results_in_order(self, get_queue, sleep):
+        jobs = [
+            _get_rq_job(
+                [RQJobStatus.STARTED, RQJobStatus.FINISHED], result='a'
+            ),
+            _get_rq_job([RQJobStatus.FINISHED], result='b'),
+        ]
+        get_queue.return_value.enqueue.side_effect = jobs
+        results = ExternalService('PDF').run_many([{'x': 1}, {'x': 2}])
+
+        self.assertEqual(results, ['a', 'b'])
+        get_queue.return_value.enqueue.assert_any_call(
+            'inkpy_jinja.pdf', kwargs={'x': 2}
+        )
+        # every job is enqueued before waiting for any of them
+        self.assertEqual(get_queue.return_value.enqueue.call_count, 2)
+        self.assertEqual(sleep.call_count, 1)
+        # finished job is not checked again
+        self.assertEqual(jobs[1].get_status.call_count, 1)
+
+    def test_run_many_cancels_jobs_when_any_failed(self, get_queue, sleep):
+        jobs = [
+            _get_rq_job([RQJobStatus.FAILED]),
+            _get_rq_job([RQJobStatus.QUEUED]),
+        ]
+        get_queue.return_value.enqueue.side_effect = jobs
+        with self.assertRaises(QueuedServiceError):
+            ExternalService('PDF').run_many([{}, {}])
+        self.assertTrue(jobs[1].cancel.called)
+
+    def test_run_many_cancels_jobs_after_timeout(self, get_queue, sleep):
+        jobs = [
+            _get_rq_job([RQJobStatus.FINISHED]),
+            _get_rq_job([RQJobStatus.STARTED]),
+        ]
+        get_queue.return_value.enqueue.side_effect = jobs
+        with self.assertRaises(QueuedServiceError):
+            ExternalService('PDF').run_many([{}, {}], timeout=0)
+        self.assertFalse(jobs[0].cancel.called)
+        self.assertTrue(jobs[1].cancel.called)
+
+    def test_run_cancels_job_after_service_timeout(self, get_queue, sleep):
+        job = _get_rq_job([RQJobStatus.STARTED])
+        get_queue.return_value.enqueue.return_value = job
+        service = ExternalService('PDF')
+        service.timeout = 0
+        with self.assertRaises(QueuedServiceError):
+            service.run(x=1)
+        self.assertTrue(job.cancel.called)
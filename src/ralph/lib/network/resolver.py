@@ -0,0 +1,141 @@
+"""
+Reverse DNS resolver looking up many IP addresses at once.
+
+Lookups are run concurrently (at most `max_workers` at once) and every one
+of them has `timeout` seconds (from its start) to finish (lookups which
+didn't finish on time are treated as not resolved). Results (including
+addresses without hostname) are kept in (shared) Django cache for `ttl`
+seconds, so they are reused by subsequent calls (ex. next runs of OpenStack
+sync).
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ralph.lib import network
+
+logger = logging.getLogger(__name__)
+
+
+class HostnameResolver(object):
+    cache_key_prefix = 'ralph.reverse_dns.'
+
+    def __init__(
+        self, lookup=network.hostname, max_workers=None, timeout=None,
+        ttl=None
+    ):
+        self.lookup = lookup
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._ttl = ttl
+
+    @property
+    def max_workers(self):
+        return self._max_workers or settings.DNS_RESOLVER_MAX_WORKERS
+
+    @property
+    def timeout(self):
+        return self._timeout or settings.DNS_RESOLVER_TIMEOUT
+
+    @property
+    def ttl(self):
+        return self._ttl or settings.DNS_RESOLVER_CACHE_TTL
+
+    def resolve(self, ip):
+        """
+        Return hostname of `ip` (or None if it's not known).
+        """
+        return self.resolve_many([ip])[str(ip)]
+
+    def resolve_many(self, ips):
+        """
+        Return dict with hostname (or None) of every IP address from `ips`.
+        """
+        ips = list(dict.fromkeys(str(ip) for ip in ips))
+        hostnames = self._get_cached(ips)
+        missing = [ip for ip in ips if ip not in hostnames]
+        if missing:
+            resolved = self._lookup_many(missing)
+            self._set_cached(resolved)
+            hostnames.update(resolved)
+        return {ip: hostnames.get(ip) for ip in ips}
+
+    def _get_key(self, ip):
+        return self.cache_key_prefix + ip
+
+    def _get_cached(self, ips):
+        if not settings.USE_CACHE or not ips:
+            return {}
+        cached = cache.get_many([self._get_key(ip) for ip in ips])
+        # empty string is cached for address without hostname
+        return {
+            ip: cached[self._get_key(ip)] or None
+            for ip in ips if self._get_key(ip) in cached
+        }
+
+    def _set_cached(self, hostnames):
+        if not settings.USE_CACHE or not hostnames:
+            return
+        cache.set_many({
+            self._get_key(ip): hostname or ''
+            for ip, hostname in hostnames.items()
+        }, timeout=self.ttl)
+
+    def _lookup_many(self, ips):
+        """
+        Lookup hostnames of `ips` concurrently (at most `max_workers` at
+        once). Addresses for which lookup failed or timed out are skipped in
+        result.
+
+        Every lookup has its own deadline (`timeout` seconds from its start).
+        Lookup which didn't finish on time is abandoned (its thread is left
+        to finish on its own), so it doesn't hold back the remaining ones.
+        """
+        results = queue.Queue()
+        pending = deque(ips)
+        # deadline of every running lookup
+        running = {}
+        hostnames = {}
+        timed_out = 0
+        while pending or running:
+            while pending and len(running) < self.max_workers:
+                ip = pending.popleft()
+                running[ip] = time.monotonic() + self.timeout
+                threading.Thread(
+                    target=self._run_lookup, args=(ip, results), daemon=True
+                ).start()
+            try:
+                ip, succeeded, hostname = results.get(timeout=max(
+                    0, min(running.values()) - time.monotonic()
+                ))
+            except queue.Empty:
+                pass
+            else:
+                # result of abandoned lookup is ignored
+                if running.pop(ip, None) is not None and succeeded:
+                    hostnames[ip] = hostname
+            now = time.monotonic()
+            for ip, deadline in list(running.items()):
+                if deadline <= now:
+                    del running[ip]
+                    timed_out += 1
+        if timed_out:
+            logger.warning(
+                'Reverse DNS lookup of %d addresses timed out', timed_out
+            )
+        return hostnames
+
+    def _run_lookup(self, ip, results):
+        try:
+            results.put((ip, True, self.lookup(ip)))
+        except Exception:
+            logger.exception('Reverse DNS lookup of %s failed', ip)
+            results.put((ip, False, None))
+
+
+resolver = HostnameResolver()
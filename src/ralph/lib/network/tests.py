@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from django.core.cache import cache
+from django.test import override_settings, SimpleTestCase
+
+from ralph.lib.network.resolver import HostnameResolver
+
+
+class FakeLookup(object):
+    """
+    Stand-in for DNS lookup - return hostname from `hostnames`.
+    """
+    def __init__(self, hostnames, barrier=None, blocked=()):
+        self.hostnames = hostnames
+        self.barrier = barrier
+        self.blocked = blocked
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, ip):
+        self.calls.append(ip)
+        if ip in self.blocked:
+            self.release.wait(5)
+        if self.barrier:
+            self.barrier.wait()
+        return self.hostnames.get(ip)
+
+
+class HostnameResolverTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.lookup = FakeLookup({
+            '10.0.0.1': 'a.local',
+            '10.0.0.2': 'b.local',
+        })
+
+    def test_resolve_many(self):
+        resolver = HostnameResolver(self.lookup)
+        self.assertEqual(
+            resolver.resolve_many(['10.0.0.1', '10.0.0.2', '10.0.0.3']),
+            {'10.0.0.1': 'a.local', '10.0.0.2': 'b.local', '10.0.0.3': None}
+        )
+
+    def test_resolve_many_looks_up_every_address_once(self):
+        resolver = HostnameResolver(self.lookup)
+        resolver.resolve_many(['10.0.0.1', '10.0.0.1'])
+        self.assertEqual(self.lookup.calls, ['10.0.0.1'])
+
+    def test_resolve_many_concurrently(self):
+        # every lookup waits for others, so it finishes only when all of
+        # them are run at the same time
+        self.lookup.barrier = threading.Barrier(3, timeout=2)
+        resolver = HostnameResolver(self.lookup, max_workers=3)
+        result = resolver.resolve_many(['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+        self.assertEqual(result['10.0.0.1'], 'a.local')
+        self.assertEqual(result['10.0.0.2'], 'b.local')
+
+    def test_resolve_many_with_timeout(self):
+        self.lookup.blocked = ['10.0.0.2']
+        resolver = HostnameResolver(self.lookup, timeout=0.1)
+        try:
+            result = resolver.resolve_many(['10.0.0.1', '10.0.0.2'])
+        finally:
+            self.lookup.release.set()
+        self.assertEqual(result, {'10.0.0.1': 'a.local', '10.0.0.2': None})
+
+    def test_resolve_many_when_one_lookup_hangs(self):
+        # hanging lookup is abandoned after its own timeout, so lookups
+        # waiting for free worker are still run
+        self.lookup.blocked = ['10.0.0.3']
+        resolver = HostnameResolver(self.lookup, max_workers=1, timeout=0.2)
+        try:
+            result = resolver.resolve_many(
+                ['10.0.0.3', '10.0.0.1', '10.0.0.2']
+            )
+        finally:
+            self.lookup.release.set()
+        self.assertEqual(result, {
+            '10.0.0.1': 'a.local', '10.0.0.2': 'b.local', '10.0.0.3': None
+        })
+
+    @override_settings(USE_CACHE=True)
+    def test_resolve_uses_cache(self):
+        resolver = HostnameResolver(self.lookup)
+        resolver.resolve_many(['10.0.0.1', '10.0.0.3'])
+        other_resolver = HostnameResolver(FakeLookup({}))
+        self.assertEqual(
+            other_resolver.resolve_many(['10.0.0.1', '10.0.0.3']),
+            {'10.0.0.1': 'a.local', '10.0.0.3': None}
+        )
+        self.assertEqual(other_resolver.lookup.calls, [])
+
+    @override_settings(USE_CACHE=True)
+    def test_timed_out_lookup_is_not_cached(self):
+        self.lookup.blocked = ['10.0.0.2']
+        resolver = HostnameResolver(self.lookup, timeout=0.1)
+        try:
+            resolver.resolve('10.0.0.2')
+        finally:
+            self.lookup.release.set()
+        self.assertEqual(resolver.resolve('10.0.0.2'), 'b.local')
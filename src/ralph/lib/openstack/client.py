@@ -4,7 +4,7 @@ from functools import lru_cache
 
 from django.conf import settings
 
-from ralph.lib import network
+from ralph.lib.network.resolver import resolver
 from ralph.settings import DEFAULT_OPENSTACK_PROVIDER_NAME
 
 try:
@@ -297,6 +297,8 @@ class RalphOpenStackInfrastructureClient:
             logger.info('Processing {} ({})'.format(
                 client.site['auth_url'], client.site['tag']
             ))
+            # servers (with their names) which IPs are resolved at once
+            fetched_servers = []
             for server in client.get_servers_list(search_opts=search_opts):
                 project_id = server['tenant_id']
                 host_id = server['id']
@@ -322,20 +324,8 @@ class RalphOpenStackInfrastructureClient:
                     ):
                         continue
                     for ip in server['addresses'][zone]:
-                        addr = ip['addr']
-                        # fetch FQDN from DNS by IP address
-                        hostname = network.hostname(addr)
-                        logger.debug('Get IP {} ({}) for {}'.format(
-                            addr, hostname, server['id']
-                        ))
-                        new_server['ips'][addr] = hostname
-                        if not new_server['hostname']:
-                            new_server['hostname'] = hostname
-                # fallback to default behavior if FQDN could not be fetched
-                # from DNS
-                new_server['hostname'] = (
-                    new_server['hostname'] or server['name']
-                )
+                        new_server['ips'][ip['addr']] = None
+                fetched_servers.append((new_server, server['name']))
                 try:
                     openstack_projects[project_id]['servers'][host_id] = (
                         new_server
@@ -355,4 +345,29 @@ class RalphOpenStackInfrastructureClient:
                         client,
                         flavor,
                     )
+            self._resolve_hostnames(fetched_servers)
         return openstack_projects, openstack_flavors
+
+    @staticmethod
+    def _resolve_hostnames(fetched_servers):
+        """
+        Fetch FQDNs from DNS by IP addresses of all servers at once.
+
+        :param fetched_servers: list of (server data, server name) pairs
+        """
+        hostnames = resolver.resolve_many(
+            addr for new_server, _ in fetched_servers
+            for addr in new_server['ips']
+        )
+        for new_server, server_name in fetched_servers:
+            for addr in new_server['ips']:
+                hostname = hostnames[addr]
+                logger.debug('Get IP {} ({}) for {}'.format(
+                    addr, hostname, new_server['id']
+                ))
+                new_server['ips'][addr] = hostname
+                if not new_server['hostname']:
+                    new_server['hostname'] = hostname
+            # fallback to default behavior if FQDN could not be fetched
+            # from DNS
+            new_server['hostname'] = new_server['hostname'] or server_name
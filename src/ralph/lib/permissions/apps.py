@@ -8,6 +8,7 @@ class PermissionAppConfig(AppConfig):
     verbose_name = 'Permissions'
 
     def ready(self):
+        import ralph.lib.permissions.matrix  # noqa
         from ralph.lib.permissions.models import create_permissions
         from ralph.lib.permissions.views import update_extra_view_permissions
         post_migrate.disconnect(
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of permissions of users (snapshot of all permissions of user and
+field-level permissions matrix).
+
+Permissions of user and fields of model which user is allowed to view and
+to change are computed once and stored in (shared) Django cache, tagged
+with version of permissions. Version is changed after commit of every transaction which
+changed groups or permissions of any user (or permissions of any group), so
+matrix computed before such change is never used after it.
+
+Until the end of transaction which changed permissions, matrices are
+computed from the database in the current thread (changes are not visible
+for other processes yet, so version is changed only on commit).
+
+Additionally, matrix is kept on user instance (for the time of request),
+the same way as Django keeps permissions of user (`_perm_cache`).
+"""
+import hashlib
+import logging
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import (
+    _user_get_all_permissions,
+    Group,
+    Permission
+)
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.encoding import force_bytes
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'ralph.permissions.matrix.version'
+MATRIX_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def compute_allowed_fields(model, user):
+    """
+    Return dict with sets of fields of `model` which `user` is allowed to
+    view and to change.
+
+    If the user does not have rights to view, but has the right to change,
+    he can view the field.
+    """
+    from ralph.lib.permissions.models import get_perm_key
+    opts = model._meta
+    blacklist = model._permissions.blacklist
+    allowed = {'view': set(), 'change': set()}
+    for field in (opts.fields + opts.many_to_many):
+        if field.name in blacklist:
+            continue
+        for action in ('change', 'view'):
+            if user.has_perm('{}.{}'.format(
+                opts.app_label,
+                get_perm_key(action, opts.model_name, field.name)
+            )):
+                allowed[action].add(field.name)
+                if action == 'change':
+                    allowed['view'].add(field.name)
+                break
+    return {
+        action: frozenset(fields) for action, fields in allowed.items()
+    }
+
+
+def compute_permissions(user):
+    """
+    Return snapshot of permissions of `user` - set of all permissions
+    (from all authentication backends) and hash of it (used ex. as a key of
+    cached template fragments).
+    """
+    perms = frozenset(_user_get_all_permissions(user, None))
+    key = ':'.join([str(user.pk)] + sorted(perms))
+    return {
+        'perms': perms,
+        'hash': hashlib.md5(force_bytes(key)).hexdigest(),
+    }
+
+
+class _PermissionsChange(object):
+    """
+    On-commit callback of transaction which changed any permissions - it
+    changes shared version of permissions.
+    """
+    def __call__(self):
+        cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+class PermissionsMatrixCache(object):
+    def _has_pending_changes(self):
+        # callbacks registered with `transaction.on_commit` are discarded by
+        # Django when transaction (or savepoint) is rolled back, so pending
+        # callback means uncommitted change of permissions in this thread
+        return any(
+            isinstance(func, _PermissionsChange)
+            for sids, func in connection.run_on_commit
+        )
+
+    def _get_version(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, uuid4().hex, None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def _get_cache_key(self, user, name):
+        """
+        Return key of `name` entry (ex. matrix for model) of `user` in shared
+        cache (or None if it could not be used).
+        """
+        if (
+            not settings.USE_CACHE or
+            user.pk is None or
+            self._has_pending_changes()
+        ):
+            return None
+        version = self._get_version()
+        if version is None:
+            return None
+        return 'ralph.permissions.matrix:{}:{}:{:d}{:d}:{}'.format(
+            version, user.pk, user.is_superuser, user.is_active, name
+        )
+
+    def _get_or_compute(self, user, name, compute):
+        key = self._get_cache_key(user, name)
+        value = cache.get(key) if key else None
+        if value is None:
+            logger.debug('Computing permissions (%s) of %s', name, user)
+            value = compute()
+            if key:
+                cache.set(key, value, MATRIX_CACHE_TIMEOUT)
+        return value
+
+    def _get(self, user, name, compute):
+        user_cache = getattr(user, '_permissions_matrix_cache', None)
+        if user_cache is None:
+            user_cache = user._permissions_matrix_cache = {}
+        user_key = (name, user.is_superuser, user.is_active)
+        if self._has_pending_changes():
+            user_cache.clear()
+        value = user_cache.get(user_key)
+        if value is None:
+            value = user_cache[user_key] = self._get_or_compute(
+                user, name, compute
+            )
+        return value
+
+    def get(self, model, user):
+        """
+        Return permissions matrix (dict with sets of fields allowed to view
+        and to change) of `user` for `model`.
+        """
+        return self._get(
+            user, model._meta.label_lower,
+            lambda: compute_allowed_fields(model, user)
+        )
+
+    def get_permissions(self, user):
+        """
+        Return snapshot of permissions of `user` (dict with set of all
+        permissions and hash of them).
+        """
+        # model labels always contain a dot, so it can't collide with matrix
+        return self._get(user, 'all', lambda: compute_permissions(user))
+
+    def invalidate(self):
+        """
+        Mark permissions as changed in current transaction.
+        """
+        transaction.on_commit(_PermissionsChange())
+
+
+permissions_matrix = PermissionsMatrixCache()
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_matrix_on_m2m_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        permissions_matrix.invalidate()
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_matrix_on_change(sender, **kwargs):
+    permissions_matrix.invalidate()
@@ -243,20 +243,8 @@ class PermByFieldMixin(models.Model, metaclass=PermissionsBase):
         :return: List of field names
         :rtype: list
         """
-        result = set()
-        blacklist = cls._permissions.blacklist
-
-        for field in (cls._meta.fields + cls._meta.many_to_many):
-            if (
-                field.name not in blacklist and
-                cls.has_access_to_field(field.name, user, action)
-            ):
-                result.add(field.name)
-        # If the user does not have rights to view,
-        # but has the right to change he can view the field
-        if action == 'view':
-            result |= cls.allowed_fields(user, 'change')
-        return result
+        from ralph.lib.permissions.matrix import permissions_matrix
+        return set(permissions_matrix.get(cls, user)[action])
 
     class Meta:
         abstract = True
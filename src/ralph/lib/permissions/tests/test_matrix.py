@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.test import override_settings, TransactionTestCase
+
+from ralph.assets.models.assets import AssetModel
+
+
+def _get_user(username):
+    # fresh instance, without permissions cached by Django
+    return get_user_model().objects.get(username=username)
+
+
+@override_settings(USE_CACHE=True)
+class PermissionsMatrixCacheTest(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='user')
+        self.permission = Permission.objects.get(
+            codename='change_assetmodel_height_of_device_field',
+        )
+        self.view_permission = Permission.objects.get(
+            codename='view_assetmodel_cores_count_field',
+        )
+        self.user.user_permissions.add(self.permission)
+
+    def test_allowed_fields(self):
+        user = _get_user('user')
+        self.assertEqual(
+            AssetModel.allowed_fields(user, 'change'), {'height_of_device'}
+        )
+        self.assertEqual(
+            AssetModel.allowed_fields(user, 'view'), {'height_of_device'}
+        )
+
+    def test_matrix_is_reused_between_requests(self):
+        AssetModel.allowed_fields(_get_user('user'), 'view')
+        user = _get_user('user')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                AssetModel.allowed_fields(user, 'change'),
+                {'height_of_device'}
+            )
+
+    def test_matrix_after_user_permissions_change(self):
+        AssetModel.allowed_fields(_get_user('user'), 'view')
+        self.user.user_permissions.add(self.view_permission)
+        self.assertEqual(
+            AssetModel.allowed_fields(_get_user('user'), 'view'),
+            {'height_of_device', 'cores_count'}
+        )
+
+    def test_matrix_after_group_permissions_change(self):
+        group = Group.objects.create(name='group')
+        self.user.groups.add(group)
+        AssetModel.allowed_fields(_get_user('user'), 'view')
+        group.permissions.add(self.view_permission)
+        self.assertEqual(
+            AssetModel.allowed_fields(_get_user('user'), 'view'),
+            {'height_of_device', 'cores_count'}
+        )
+        group.delete()
+        self.assertEqual(
+            AssetModel.allowed_fields(_get_user('user'), 'view'),
+            {'height_of_device'}
+        )
+
+    def test_matrix_with_uncommitted_change(self):
+        AssetModel.allowed_fields(_get_user('user'), 'view')
+        with transaction.atomic():
+            self.user.user_permissions.remove(self.permission)
+            self.assertEqual(
+                AssetModel.allowed_fields(_get_user('user'), 'change'), set()
+            )
+            transaction.set_rollback(True)
+        self.assertEqual(
+            AssetModel.allowed_fields(_get_user('user'), 'change'),
+            {'height_of_device'}
+        )
+
+    def test_matrix_of_superuser(self):
+        AssetModel.allowed_fields(_get_user('user'), 'view')
+        user = _get_user('user')
+        user.is_superuser = True
+        self.assertIn('manufacturer', AssetModel.allowed_fields(user))
+
+    def test_permissions_snapshot_is_reused_between_requests(self):
+        permissions_hash = _get_user('user').permissions_hash
+        user = _get_user('user')
+        with self.assertNumQueries(0):
+            self.assertEqual(user.permissions_hash, permissions_hash)
+            self.assertTrue(
+                user.has_perm('assets.change_assetmodel_height_of_device_field')
+            )
+            self.assertFalse(
+                user.has_perm('assets.view_assetmodel_cores_count_field')
+            )
+
+    def test_permissions_snapshot_after_group_membership_change(self):
+        group = Group.objects.create(name='group')
+        group.permissions.add(self.view_permission)
+        permissions_hash = _get_user('user').permissions_hash
+        self.user.groups.add(group)
+        user = _get_user('user')
+        self.assertNotEqual(user.permissions_hash, permissions_hash)
+        self.assertTrue(
+            user.has_perm('assets.view_assetmodel_cores_count_field')
+        )
+        self.user.groups.remove(group)
+        self.assertEqual(_get_user('user').permissions_hash, permissions_hash)
@@ -12,9 +12,8 @@ Example:
         <Model3: model3: test>
     ]
 """
-from collections import defaultdict
-from itertools import groupby
-from typing import Dict, Iterable, List, Tuple
+from collections import defaultdict, OrderedDict
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
@@ -22,9 +21,14 @@ from django.core import exceptions
 from django.db import models
 from django.db.models import QuerySet
 from django.db.models.base import ModelBase
+from django.db.models.query import ModelIterable
 
 
 class PolymorphicQuerySet(models.QuerySet):
+    # max number of (ordered) objects for which descendants are fetched at
+    # once (with single query for every descendant model)
+    fetch_chunk_size = 2000
+
     def __init__(self, *args, **kwargs):
         self._polymorphic_select_related = {}
         self._polymorphic_prefetch_related = {}
@@ -34,69 +38,86 @@ class PolymorphicQuerySet(models.QuerySet):
         self._extra_kwargs = {}
         self._polymorphic_filter_args = []
         self._polymorphic_filter_kwargs = {}
-        self._my_cache = None
-        self._pks_order = None
         super().__init__(*args, **kwargs)
 
+    def _is_polymorphic_fetch(self) -> bool:
+        return self._iterable_class is ModelIterable
+
     def _fetch_all(self):
         if self._result_cache is not None:
             return
-        self._result_cache = None
-        self._my_cache = None
-        self._pks_order = None
+        if not self._is_polymorphic_fetch():
+            return super()._fetch_all()
+        self._result_cache = list(self._iter_descendants())
+        self._prefetch_related_objects()
 
-        if self.query.select_related:
-            self._select_related = self.query.select_related
-            self.query.select_related = False
-        else:
-            self._select_related = None
+    def _get_pks_order(self) -> List[Tuple[int, int]]:
+        """
+        Return (pk, content_type_id) of every object (in order of this
+        queryset) - using single, narrow query.
+        """
+        rows = self.values_list('pk', 'content_type_id')
+        # the same object could be returned many times (ex. when joining
+        # m2m) - all its instances are returned at its first occurrence
+        return list(OrderedDict.fromkeys(rows))
 
-        super()._fetch_all()
-        try:
-            self._pks_order = [obj.pk for obj in self._result_cache]  # type: ignore
-        except AttributeError:
-            return self._result_cache
-
-        result = groupby(
-            sorted(self._result_cache, key=lambda x: x.content_type_id),
-            lambda x: x.content_type_id,
-        )  # type: Iterable[Tuple[int, object]]
-        self._my_cache = self._subquery_for_children_models(result)
-
-    def _subquery_for_children_models(self, result) -> Dict[int, List[object]]:
-        result_mapping = defaultdict(list)
-        for ct_id, objects_of_type in result:
-            content_type = ContentType.objects.get_for_id(id=ct_id)
-            model = content_type.model_class()
-            polymorphic_models = getattr(model, "_polymorphic_models", [])
-            if not (polymorphic_models and model not in polymorphic_models):
-                continue
-            model_name = model._meta.object_name
-            ids = {obj.id for obj in objects_of_type}  # type: set[int]
-            model_query = model.objects.filter(pk__in=ids)
-            model_query = self._add_select_related_to_subquery(model_query)
-            model_query = self._add_polymorphic_select_related_to_subquery(
-                model_query, model_name
-            )
-            model_query = self._add_polymorphic_prefetch_related_to_subquery(
-                model_query, model_name
-            )
-            model_query = self._add_polymorphic_filter_to_subquery(model_query)
-            model_query = model_query.annotate(
-                *self._annotate_args, **self._annotate_kwargs
-            )
-            model_query = self._add_extra_to_subquery(model_query)
+    def _iter_descendants(self) -> Iterator[object]:
+        """
+        Yield descendant model instance of every object (in order of this
+        queryset).
 
-            for obj in model_query:
-                result_mapping[obj.pk].append(obj)
-        return result_mapping
+        Descendants are fetched in chunks of `fetch_chunk_size` objects,
+        with single query for every descendant model in the chunk.
+        """
+        pks_order = self._get_pks_order()
+        subqueries = {}
+        for i in range(0, len(pks_order), self.fetch_chunk_size):
+            chunk = pks_order[i:i + self.fetch_chunk_size]
+            ids_by_content_type = defaultdict(list)
+            for pk, ct_id in chunk:
+                ids_by_content_type[ct_id].append(pk)
+            descendants = defaultdict(list)
+            for ct_id, ids in ids_by_content_type.items():
+                if ct_id not in subqueries:
+                    subqueries[ct_id] = self._subquery_for_children_model(
+                        ct_id
+                    )
+                if subqueries[ct_id] is None:
+                    continue
+                for obj in subqueries[ct_id].filter(pk__in=ids):
+                    descendants[obj.pk].append(obj)
+            for pk, ct_id in chunk:
+                yield from descendants.pop(pk, [])
+
+    def _subquery_for_children_model(self, ct_id: int) -> Optional[QuerySet]:
+        content_type = ContentType.objects.get_for_id(id=ct_id)
+        model = content_type.model_class()
+        polymorphic_models = getattr(model, "_polymorphic_models", [])
+        if not (polymorphic_models and model not in polymorphic_models):
+            return None
+        model_name = model._meta.object_name
+        model_query = model.objects.all()
+        model_query = self._add_select_related_to_subquery(model_query)
+        model_query = self._add_polymorphic_select_related_to_subquery(
+            model_query, model_name
+        )
+        model_query = self._add_polymorphic_prefetch_related_to_subquery(
+            model_query, model_name
+        )
+        model_query = self._add_polymorphic_filter_to_subquery(model_query)
+        model_query = model_query.annotate(
+            *self._annotate_args, **self._annotate_kwargs
+        )
+        return self._add_extra_to_subquery(model_query)
 
     def _add_select_related_to_subquery(self, query: QuerySet):
-        if self._select_related:
-            query.query.select_related = self._select_related.copy()
-            return query
-        else:
-            return query
+        select_related = self.query.select_related
+        if select_related:
+            query.query.select_related = (
+                select_related.copy() if isinstance(select_related, dict)
+                else select_related
+            )
+        return query
 
     def _add_polymorphic_select_related_to_subquery(
         self, query: QuerySet, model_name: str
@@ -222,20 +243,14 @@ class PolymorphicQuerySet(models.QuerySet):
                 )
         return query
 
-    def __iter__(self):
-        self._fetch_all()
-        try:
-            cache_ = self._my_cache.copy()
-            pks = [pk for pk in self._pks_order]
-        except AttributeError as e:
-            yield from self._result_cache
-        else:
-            for pk in pks:
-                while cache_[pk]:
-                    yield cache_[pk].pop()
-
     def iterator(self):
-        yield from self.__iter__()
+        """
+        Yield descendants without caching them (fetching them in chunks).
+        """
+        if not self._is_polymorphic_fetch():
+            yield from super().iterator()
+        else:
+            yield from self._iter_descendants()
 
     def annotate(self, *args, **kwargs):
         self._annotate_args.extend(args)
@@ -257,16 +272,8 @@ class PolymorphicQuerySet(models.QuerySet):
         clone._extra_kwargs = self._extra_kwargs.copy()
         clone._polymorphic_filter_args = self._polymorphic_filter_args.copy()
         clone._polymorphic_filter_kwargs = self._polymorphic_filter_kwargs.copy()
-        clone._my_cache = self._my_cache.clone() if self._my_cache else None
-        clone._pks_order = self._pks_order.clone() if self._pks_order else None
         return clone
 
-    def get(self, *args, **kwargs):
-        obj = super().get(*args, **kwargs)
-        if hasattr(obj, 'content_type'):
-            obj = obj.content_type.get_object_for_this_type(pk=obj.pk)
-        return obj
-
     def polymorphic_select_related(self, **kwargs):
         """
         Apply select related on descendant model (passed as model name). Usage:
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+from collections import defaultdict
+from itertools import groupby
+from unittest import skipUnless
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ralph.lib.polymorphic.tests.models import (
+    PolymorphicModelBaseTest,
+    PolymorphicModelTest,
+    PolymorphicModelTest2,
+    SomethingRelated
+)
+
+# run only when RUN_BENCHMARKS=1 env is set
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS', False)
+
+
+def legacy_polymorphic_list(queryset):
+    """
+    Previous implementation of `PolymorphicQuerySet` fetch (full base objects
+    fetched first, then grouped by content type and fetched again as
+    descendants).
+    """
+    base_objects = list(
+        queryset.model.objects.order_by(*queryset.query.order_by)
+    )
+    pks_order = [obj.pk for obj in base_objects]
+    descendants = defaultdict(list)
+    for ct_id, objects_of_type in groupby(
+        sorted(base_objects, key=lambda x: x.content_type_id),
+        lambda x: x.content_type_id,
+    ):
+        model = ContentType.objects.get_for_id(ct_id).model_class()
+        for obj in model.objects.filter(
+            pk__in={obj.pk for obj in objects_of_type}
+        ):
+            descendants[obj.pk].append(obj)
+    return [obj for pk in pks_order for obj in descendants[pk]]
+
+
+def _measure(func, *args):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = func(*args)
+        duration = time.perf_counter() - start
+    return result, duration, len(queries)
+
+
+@skipUnless(RUN_BENCHMARKS, 'RUN_BENCHMARKS env is not set')
+class PolymorphicQuerySetBenchmark(TestCase):
+    objects_count = 10000
+
+    def _create_objects(self):
+        related = SomethingRelated.objects.create(name='rel')
+        for i in range(self.objects_count):
+            if i % 2:
+                PolymorphicModelTest.objects.create(
+                    name='obj{:05d}'.format(i), sth_related=related
+                )
+            else:
+                PolymorphicModelTest2.objects.create(
+                    name='obj{:05d}'.format(i), another_related=related
+                )
+
+    def test_mixed_types_list(self):
+        self._create_objects()
+        queryset = PolymorphicModelBaseTest.polymorphic_objects.order_by(
+            'name'
+        )
+        legacy, legacy_time, legacy_queries = _measure(
+            legacy_polymorphic_list, queryset
+        )
+        result, fetch_time, fetch_queries = _measure(list, queryset.all())
+        iterated, iterator_time, iterator_queries = _measure(
+            lambda: list(queryset.all().iterator())
+        )
+
+        self.assertEqual(result, legacy)
+        self.assertEqual(iterated, legacy)
+        self.assertEqual(
+            [type(obj) for obj in result], [type(obj) for obj in legacy]
+        )
+        print(
+            '\n{} objects of 2 models: legacy {:.3f}s ({} queries), fetch '
+            '{:.3f}s ({} queries), iterator {:.3f}s ({} queries)'.format(
+                self.objects_count, legacy_time, legacy_queries,
+                fetch_time, fetch_queries, iterator_time, iterator_queries,
+            )
+        )
@@ -232,7 +232,11 @@ class PolymorphicTestCaseNew(TestCase):
         z1 = PolymorphicModelTest.objects.create(sth_related=self.sth_related)
         z2 = PolymorphicModelTest.objects.create(sth_related=self.sth_related)
 
-        with self.assertNumQueries(4):
+        # queries:
+        # select PolymorphicModelBaseTest ids
+        # select PolymorphicModelTest
+        # select SomethingRelated (prefetched for descendants)
+        with self.assertNumQueries(3):
             (item,) = [
                 item
                 for item in PolymorphicModelBaseTest.polymorphic_objects.filter(
@@ -240,3 +244,52 @@ class PolymorphicTestCaseNew(TestCase):
                 ).prefetch_related("sth_related")
             ]
             self.assertEqual(item.sth_related.name, "Rel1")
+
+    def test_polymorphic_queryset_keeps_order_between_chunks(self):
+        objs = [
+            model.objects.create(name='Obj{:02d}'.format(i))
+            for i, model in enumerate(
+                [PolymorphicModelTest, PolymorphicModelTest2] * 5
+            )
+        ]
+        queryset = PolymorphicModelBaseTest.polymorphic_objects.filter(
+            name__startswith='Obj'
+        ).order_by('-name')
+        queryset.fetch_chunk_size = 3
+        # 1 query for ids + 2 queries (one per model) for each of 3 full
+        # chunks + 1 query for the last chunk (single object)
+        with self.assertNumQueries(8):
+            result = list(queryset)
+        self.assertEqual(result, objs[::-1])
+        self.assertEqual(
+            [type(obj) for obj in result], [type(obj) for obj in objs[::-1]]
+        )
+
+    def test_polymorphic_queryset_iterated_many_times(self):
+        queryset = PolymorphicModelBaseTest.polymorphic_objects.order_by('name')
+        with self.assertNumQueries(3):
+            self.assertEqual(list(queryset), list(queryset))
+            self.assertEqual(len(queryset), 3)
+            self.assertIsInstance(queryset[2], PolymorphicModelTest2)
+
+    def test_polymorphic_queryset_iterator(self):
+        queryset = PolymorphicModelBaseTest.polymorphic_objects.order_by('name')
+        with self.assertNumQueries(3):
+            result = list(queryset.iterator())
+        self.assertEqual(result, [self.pol_1, self.pol_2, self.pol_3])
+        self.assertIsNone(queryset._result_cache)
+
+    def test_polymorphic_queryset_get(self):
+        with self.assertNumQueries(2):
+            obj = PolymorphicModelBaseTest.polymorphic_objects.get(
+                pk=self.pol_3.pk
+            )
+        self.assertIsInstance(obj, PolymorphicModelTest2)
+
+    def test_polymorphic_queryset_values(self):
+        self.assertEqual(
+            list(PolymorphicModelBaseTest.polymorphic_objects.order_by(
+                'name'
+            ).values_list('name', flat=True)),
+            ['Pol1', 'Pol2', 'Pol3'],
+        )
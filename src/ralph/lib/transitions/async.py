@@ -2,10 +2,13 @@
 Asynchronous runner for transitions
 """
 import logging
+from collections import defaultdict
 
 from django.db import transaction
+from django.utils import timezone
 
 from ralph.attachments.models import Attachment
+from ralph.lib.external_services.models import JobStatus
 from ralph.lib.transitions.exceptions import (
     AsyncTransitionError,
     FailedActionError,
@@ -48,6 +51,17 @@ def _check_previous_actions(job, executed_actions):
 
 def run_async_transition(job_id):
     transition_job = TransitionJob.objects.get(pk=job_id)
+    # the same job could be queued more than once (ex. unfrozen by many
+    # DHCP servers) - only single worker could run it
+    if not transition_job.claim():
+        logger.warning(
+            'Skipping %s - it is %s', transition_job,
+            JobStatus.from_id(transition_job.status).name
+        )
+        return
+    if transition_job.is_batch_leader:
+        _run_async_batch_transition(transition_job)
+        return
     transition_job.start()
     try:
         _perform_async_transition(transition_job)
@@ -56,6 +70,227 @@ def run_async_transition(job_id):
         transition_job.fail(str(e))
 
 
+def _run_async_batch_transition(batch_job):
+    jobs = list(
+        batch_job.batch_jobs.active().select_related(
+            'transition', 'content_type'
+        ).order_by('created')
+    )
+    for job in jobs:
+        job.start()
+    try:
+        _perform_async_batch_transition(batch_job, jobs)
+    except Exception as e:
+        logger.exception(e)
+        for job in jobs:
+            job.fail(str(e))
+
+
+def _get_jobs_objects(jobs):
+    """
+    Fetch objects of all jobs (of the same type) at once.
+    """
+    model = jobs[0].content_type.model_class()
+    objs = {
+        str(pk): obj for pk, obj in model._base_manager.in_bulk(
+            [job.object_id for job in jobs]
+        ).items()
+    }
+    return [objs[job.object_id] for job in jobs]
+
+
+def _merge_batch_params(jobs):
+    """
+    Merge params of jobs in batch - `history_kwargs` and `shared_params` are
+    dicts with separate entry for every object, rest of params is the same
+    for every job.
+    """
+    params = dict(jobs[0].params)
+    for param_name in ['history_kwargs', 'shared_params']:
+        merged = defaultdict(dict)
+        for job in jobs:
+            merged.update(job.params[param_name])
+        params[param_name] = merged
+    return params
+
+
+def _split_batch_params(jobs, params):
+    """
+    Store (merged) `history_kwargs` and `shared_params` back in every job's
+    params.
+    """
+    for job in jobs:
+        for param_name in ['history_kwargs', 'shared_params']:
+            job.params[param_name] = defaultdict(dict, {
+                key: params[param_name][key]
+                for key in job.params[param_name]
+            })
+
+
+def _is_killed(transition_job):
+    # fetch only job status (params are already restored)
+    transition_job.refresh_from_db(fields=['status'])
+    return transition_job.is_killed
+
+
+def _get_batch_completed_actions(jobs):
+    """
+    Check previously executed actions of every job in batch (failing the
+    whole batch if any of them has failed) and return names of actions
+    completed for every job (None if batch has failed).
+    """
+    executed_actions = defaultdict(list)
+    for tja in TransitionJobAction.objects.filter(transition_job__in=jobs):
+        executed_actions[tja.transition_job_id].append(tja)
+    try:
+        for job in jobs:
+            _check_previous_actions(job, executed_actions[job.pk])
+    except AsyncTransitionError:
+        for job in jobs:
+            if job.is_running:
+                job.fail('Other job in batch has failed.')
+        return None
+    return set.intersection(*[
+        set(
+            tja.action_name for tja in executed_actions[job.pk]
+            if tja.status != TransitionJobActionStatus.STARTED
+        )
+        for job in jobs
+    ])
+
+
+def _perform_batch_action(
+    action, batch_job, jobs, objs, params, requester, attachments
+):
+    """
+    Run single action for all objects of the batch.
+
+    Returns:
+        True if batch processing should be continued
+    """
+    func = getattr(objs[0], action.name)
+    defaults = _prepare_action_data(action=action, **params)
+    tjas = [
+        TransitionJobAction.objects.get_or_create(
+            transition_job=job,
+            action_name=action.name,
+            defaults=dict(
+                status=TransitionJobActionStatus.STARTED,
+            )
+        )[0]
+        for job in jobs
+    ]
+    freeze = False
+    # status is not changed when action is rescheduled
+    status = None
+    try:
+        with transaction.atomic():
+            try:
+                result = func(
+                    instances=objs,
+                    requester=requester,
+                    tja=tjas[0],
+                    **defaults
+                )
+            except RescheduleAsyncTransitionActionLater as e:
+                # action is not ready - reschedule the whole batch later and
+                # continue when you left off
+                _split_batch_params(jobs, params)
+                if e.freeze:
+                    _freeze_batch(jobs)
+                else:
+                    for job in jobs[1:]:
+                        job._update_dumped_params()
+                    batch_job.reschedule()
+                return False
+            except FreezeAsyncTransition:
+                freeze = True
+            else:
+                if isinstance(result, Attachment):
+                    attachments.append(result)
+        status = TransitionJobActionStatus.FINISHED
+    except Exception as e:
+        logger.exception(e)
+        status = TransitionJobActionStatus.FAILED
+        raise FailedActionError('Action {} has failed'.format(action.name)) from e  # noqa
+    finally:
+        _split_batch_params(jobs, params)
+        if status is not None:
+            TransitionJobAction.objects.filter(
+                pk__in=[tja.pk for tja in tjas]
+            ).update(status=status, modified=timezone.now())
+    if freeze:
+        _freeze_batch(jobs)
+        return False
+    return True
+
+
+def _freeze_batch(jobs):
+    # frozen jobs are continued separately (ex. every deployed server
+    # unfreezes its own job), so batch is dissolved here
+    for job in jobs:
+        job.batch = None
+        job.freeze()
+
+
+def _perform_async_batch_transition(batch_job, jobs):
+    """
+    Perform transition for all objects of the batch of jobs - every action
+    is run once for all objects. Kill status is checked (before every
+    action) only on the batch leader job.
+    """
+    transition = batch_job.transition
+    requester = batch_job.user
+    objs = _get_jobs_objects(jobs)
+    _check_instances_for_transition(
+        instances=objs,
+        transition=transition,
+        check_async_job=False,
+        requester=requester
+    )
+    _check_action_with_instances(objs, transition)
+    if not batch_job.is_running:
+        logger.warning(
+            'Running previously ended transition job: %s', batch_job
+        )
+        return
+    completed_actions_names = _get_batch_completed_actions(jobs)
+    if completed_actions_names is None:
+        return
+
+    params = _merge_batch_params(jobs)
+    attachments = []
+    for action in _order_actions_by_requirements(
+        transition.actions.all(), objs[0]
+    ):
+        if _is_killed(batch_job):
+            logger.info('Transition job: {} is killed'.format(batch_job))
+            return
+
+        if action.name in completed_actions_names:
+            logger.debug('Action {} already performed - skipping'.format(
+                action.name
+            ))
+            continue
+        logger.info(
+            'Performing action {} in transition {} (batch job: {}, {} '
+            'objects)'.format(action, transition, batch_job, len(objs))
+        )
+        if not _perform_batch_action(
+            action, batch_job, jobs, objs, params, requester, attachments
+        ):
+            return
+        completed_actions_names.add(action.name)
+
+    for job, obj in zip(jobs, objs):
+        _post_transition_instance_processing(
+            obj, transition, job.params['data'],
+            history_kwargs=params['history_kwargs'],
+            requester=requester, attachments=attachments,
+        )
+        job.success()
+
+
 # TODO: unify this function with `ralph.lib.transitions.models.run_field_transition`  # noqa
 def _perform_async_transition(transition_job):
     transition = transition_job.transition
@@ -89,8 +324,7 @@ def _perform_async_transition(transition_job):
     # TODO: move this to transition (sth like
     # `for action in transition.get_actions(obj)`)
     for action in _order_actions_by_requirements(transition.actions.all(), obj):
-        transition_job.refresh_from_db()
-        if transition_job.is_killed:
+        if _is_killed(transition_job):
             logger.info('Transition job: {} is killed'.format(transition_job))
             return
 
@@ -132,7 +366,10 @@ def _perform_async_transition(transition_job):
                 except RescheduleAsyncTransitionActionLater as e:
                     # action is not ready - reschedule this job later and
                     # continue when you left off
-                    transition_job.reschedule()
+                    if e.freeze:
+                        transition_job.freeze()
+                    else:
+                        transition_job.reschedule()
                     return
                 except FreezeAsyncTransition:
                     # if action raise this exception, we're assumming that it's
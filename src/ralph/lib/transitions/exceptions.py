@@ -17,7 +17,16 @@ class TransitionModelNotFoundError(TransitionError):
 
 
 class RescheduleAsyncTransitionActionLater(Exception):
-    pass
+    """
+    Action is not ready yet - it will be run again later.
+
+    By default job is queued again right away. When `freeze` is True, job is
+    frozen instead (and action is run again after job is unfrozen by some
+    external event, ex. ping from DHCP server).
+    """
+    def __init__(self, *args, freeze=False):
+        super().__init__(*args)
+        self.freeze = freeze
 
 
 class FreezeAsyncTransition(Exception):
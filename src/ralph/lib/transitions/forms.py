@@ -63,6 +63,7 @@ class TransitionForm(forms.ModelForm):
             ),
             required=False,
         )
+        self.fields['async_batch_size'].required = False
         actions_choices = [
             (i.id, wrap_action_name(getattr(self.model, i.name)))
             for i in Action.objects.filter(
@@ -82,6 +83,9 @@ class TransitionForm(forms.ModelForm):
         else:
             self.fields['template_name'].widget.attrs['disabled'] = True
 
+    def clean_async_batch_size(self):
+        return self.cleaned_data['async_batch_size'] or 1
+
     def clean(self):
         self.cleaned_data['actions'] = [a.id for a in self.cleaned_data['actions']]
         cleaned_data = super().clean()
@@ -130,5 +134,6 @@ class TransitionForm(forms.ModelForm):
         model = Transition
         fields = [
             'name', 'source', 'target', 'run_asynchronously',
-            'async_service_name', 'template_name', 'success_url', 'actions',
+            'async_service_name', 'async_batch_size', 'template_name',
+            'success_url', 'actions',
         ]
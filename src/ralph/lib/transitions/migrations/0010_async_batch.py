@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transitions', '0009_transition_success_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transition',
+            name='async_batch_size',
+            field=models.PositiveIntegerField(default=1, help_text='Maximum number of objects processed by single background job of asynchronous transition (every action is run once for all objects of the batch).', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='transitionjob',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batch_jobs', to='transitions.TransitionJob'),
+        ),
+    ]
@@ -11,6 +11,7 @@ from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models, transaction
 from django.db.models.base import ModelBase
 from django.db.models.signals import (
@@ -31,6 +32,7 @@ from ralph.admin.helpers import (
     get_field_by_relation_path
 )
 from ralph.attachments.models import Attachment
+from ralph.lib.external_services.base import InternalService
 from ralph.lib.external_services.models import (
     Job,
     JOB_NOT_ENDED_STATUSES,
@@ -285,8 +287,22 @@ def run_transition(
     )
     if transition.is_async:
         job_ids = []
+        service_name = transition.async_service_name or DEFAULT_ASYNC_TRANSITION_SERVICE_NAME # noqa
+        batch_size = transition.async_batch_size
+        if batch_size > 1:
+            instances = list(instances)
+            for idx in range(0, len(instances), batch_size):
+                job_ids.extend(TransitionJob.run_batch(
+                    service_name=service_name,
+                    requester=requester,
+                    objs=instances[idx:idx + batch_size],
+                    transition=transition,
+                    data=data,
+                    transition_id=transition.id,
+                    **kwargs
+                ))
+            return job_ids
         for instance in instances:
-            service_name = transition.async_service_name or DEFAULT_ASYNC_TRANSITION_SERVICE_NAME # noqa
             job_id, job = TransitionJob.run(
                 service_name=service_name,
                 requester=requester,
@@ -542,6 +558,13 @@ class Transition(models.Model):
     source = JSONField()
     target = models.CharField(max_length=50)
     actions = models.ManyToManyField('Action')
+    async_batch_size = models.PositiveIntegerField(
+        default=1, validators=[MinValueValidator(1)], help_text=_(
+            'Maximum number of objects processed by single background job of '
+            'asynchronous transition (every action is run once for all '
+            'objects of the batch).'
+        )
+    )
     template_name = models.CharField(max_length=255, blank=True, default='')
     success_url = NullableCharField(
         max_length=255, blank=True, null=True, default=None
@@ -656,6 +679,15 @@ class TransitionJob(Job):
         on_delete=models.CASCADE,
         related_name='jobs'
     )
+    # job processing the whole batch of jobs (including itself) - only this
+    # job is queued, see `run_batch`
+    batch = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='batch_jobs',
+    )
     # TODO: field?
 
     objects = JobQuerySet.as_manager()
@@ -666,11 +698,16 @@ class TransitionJob(Job):
             self.transition._get_metric_name(),
         )
 
+    @property
+    def is_batch_leader(self):
+        if self.batch_id is None:
+            return False
+        # value of FK to UUID field is not converted by some DB backends
+        to_python = self._meta.get_field('id').to_python
+        return to_python(self.batch_id) == to_python(self.pk)
+
     @classmethod
-    def run(
-        cls, service_name, obj, transition, requester, defaults=None,
-        **kwargs
-    ):
+    def _prepare_run_params(cls, obj, transition, defaults=None, **kwargs):
         defaults = defaults or {}
         defaults.update(
             content_type=ContentType.objects.get_for_model(obj),
@@ -685,6 +722,16 @@ class TransitionJob(Job):
                 # (json needs str as the key of an object)
                 # we need to restore it in `_restore_params`
                 kwargs[p] = {obj.pk: {}}
+        return defaults, kwargs
+
+    @classmethod
+    def run(
+        cls, service_name, obj, transition, requester, defaults=None,
+        **kwargs
+    ):
+        defaults, kwargs = cls._prepare_run_params(
+            obj, transition, defaults, **kwargs
+        )
         return super().run(
             service_name=service_name,
             requester=requester,
@@ -692,6 +739,50 @@ class TransitionJob(Job):
             **kwargs
         )
 
+    @classmethod
+    def run_batch(cls, service_name, objs, transition, requester, **kwargs):
+        """
+        Run transition for many objects in single background job.
+
+        Job is created for every object (to track its progress and status),
+        but only the first one (batch leader) is queued - it runs every
+        action once for all objects of the batch.
+
+        Returns:
+            list of ids of created jobs
+        """
+        service = InternalService(service_name)
+        jobs = []
+        for obj in objs:
+            defaults, params = cls._prepare_run_params(
+                obj, transition, **kwargs
+            )
+            jobs.append(cls._default_manager.create(
+                service_name=service_name,
+                username=requester.username if requester else None,
+                _dumped_params=cls.prepare_params(
+                    requester=requester, **params
+                ),
+                batch=jobs[0] if jobs else None,
+                **defaults
+            ))
+        leader = jobs[0]
+        leader.batch = leader
+        leader.save(update_fields=['batch'])
+        # commit transaction to allow worker to fetch it using job id
+        transaction.commit()
+        service.run_async(job_id=leader.id)
+        return [job.id for job in jobs]
+
+    def kill(self):
+        # the whole batch is processed together, so it's killed together
+        if self.batch_id is not None:
+            for job in self.__class__._default_manager.filter(
+                batch_id=self.batch_id
+            ).active().exclude(pk=self.pk):
+                super(TransitionJob, job).kill()
+        super().kill()
+
     @classmethod
     def _restore_params(cls, obj):
         params = super()._restore_params(obj)
@@ -1,18 +1,28 @@
 """
 Test asynchronous transitions
 """
+from importlib import import_module
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import RequestFactory, TransactionTestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase
 
 from ralph.lib.external_services.models import JobStatus
 from ralph.lib.transitions.models import (
     run_transition,
     TransitionJob,
+    TransitionJobActionStatus,
     TransitionsHistory
 )
 from ralph.lib.transitions.tests import TransitionTestCaseMixin
+from ralph.lib.transitions.tests.factories import TransitionJobFactory
 from ralph.tests.models import AsyncOrder, Foo, OrderStatus
 
+# `async` is a reserved word since Python 3.7
+run_async_transition = import_module(
+    'ralph.lib.transitions.async'
+).run_async_transition
+
 
 class AsyncTransitionsTest(TransitionTestCaseMixin, TransactionTestCase):
 
@@ -178,3 +188,133 @@ class AsyncTransitionsTest(TransitionTestCaseMixin, TransactionTestCase):
             )
             with self.assertRaises(TransitionsHistory.DoesNotExist):
                 TransitionsHistory.objects.get(object_id=async_order.id)
+
+    def _run_batch_transition(self, actions, batch_size=2, count=3):
+        async_orders = [
+            AsyncOrder.objects.create(name='test{}'.format(i))
+            for i in range(count)
+        ]
+        _, transition, _ = self._create_transition(
+            model=async_orders[0], name='prepare',
+            source=[OrderStatus.new.id], target=OrderStatus.to_send.id,
+            actions=actions,
+            async_service_name='ASYNC_TRANSITIONS',
+        )
+        transition.async_batch_size = batch_size
+        transition.save()
+        job_ids = run_transition(
+            instances=async_orders,
+            transition_obj_or_name=transition,
+            requester=self.user,
+            field='status',
+            data={'name': 'def', 'foo': self.foo}
+        )
+        return async_orders, job_ids
+
+    def test_run_batch_async_transition(self):
+        async_orders, job_ids = self._run_batch_transition(
+            actions=[
+                'long_running_action',
+                'long_running_action_with_precondition',
+                'assing_user',
+            ],
+        )
+        self.assertEqual(len(job_ids), 3)
+        jobs = [TransitionJob.objects.get(pk=job_id) for job_id in job_ids]
+        # 2 objects in first batch, last one in second batch
+        self.assertTrue(jobs[0].is_batch_leader)
+        self.assertEqual(jobs[1].batch, jobs[0])
+        self.assertTrue(jobs[2].is_batch_leader)
+        for job, async_order in zip(jobs, async_orders):
+            async_order.refresh_from_db()
+            self.assertEqual(job.status, JobStatus.FINISHED.id)
+            self.assertEqual(async_order.name, 'def')
+            self.assertEqual(async_order.username, 'test1')
+            self.assertEqual(async_order.status, OrderStatus.to_send.id)
+            # progress of every action is stored for every job
+            self.assertEqual(
+                job.transition_job_actions.filter(
+                    status=TransitionJobActionStatus.FINISHED
+                ).count(),
+                3
+            )
+            self.assertEqual(
+                job.params['shared_params'][async_order.pk]['counter'], 5
+            )
+            th = TransitionsHistory.objects.get(object_id=async_order.id)
+            self.assertEqual(th.kwargs, {'hist_counter': 5})
+
+    def test_freezing_batch_async_transition(self):
+        async_orders, job_ids = self._run_batch_transition(
+            actions=['freezing_action', 'long_running_action'], count=2,
+        )
+        for job_id in job_ids:
+            job = TransitionJob.objects.get(pk=job_id)
+            self.assertEqual(job.status, JobStatus.FROZEN)
+            # frozen batch is continued separately for every object
+            self.assertIsNone(job.batch_id)
+            job.unfreeze()
+
+        for job_id, async_order in zip(job_ids, async_orders):
+            job = TransitionJob.objects.get(pk=job_id)
+            async_order.refresh_from_db()
+            self.assertEqual(job.status, JobStatus.FINISHED)
+            self.assertEqual(async_order.counter, 2)
+
+    def test_run_failing_batch_async_transition(self):
+        async_orders, job_ids = self._run_batch_transition(
+            actions=['failing_action'], count=2,
+        )
+        for job_id, order in zip(job_ids, async_orders):
+            job = TransitionJob.objects.get(pk=job_id)
+            self.assertEqual(job.status, JobStatus.FAILED.id)
+            self.assertFalse(
+                TransitionsHistory.objects.filter(object_id=order.id).exists()
+            )
+
+    def test_kill_batch_job_kills_whole_batch(self):
+        async_orders = [
+            AsyncOrder.objects.create(name='test{}'.format(i))
+            for i in range(2)
+        ]
+        _, transition, _ = self._create_transition(
+            model=async_orders[0], name='prepare',
+            source=[OrderStatus.new.id], target=OrderStatus.to_send.id,
+            actions=['long_running_action'],
+            async_service_name='ASYNC_TRANSITIONS',
+        )
+        jobs = [
+            TransitionJob.objects.create(
+                obj=order, transition=transition, service_name='TEST',
+                _dumped_params={}, username=self.user.username,
+            )
+            for order in async_orders
+        ]
+        TransitionJob.objects.filter(
+            pk__in=[job.pk for job in jobs]
+        ).update(batch=jobs[0])
+        jobs[1].refresh_from_db()
+        jobs[1].kill()
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, JobStatus.KILLED)
+
+
+class RunAsyncTransitionTest(TestCase):
+    @patch('ralph.lib.transitions.async._perform_async_transition')
+    def test_job_is_run_only_when_queued(self, perform_mock):
+        for status in (
+            JobStatus.STARTED, JobStatus.FINISHED, JobStatus.FAILED
+        ):
+            job = TransitionJobFactory(status=status)
+            run_async_transition(job.id)
+            job.refresh_from_db()
+            self.assertEqual(job.status, status)
+        self.assertEqual(perform_mock.call_count, 0)
+
+    @patch('ralph.lib.transitions.async._perform_async_transition')
+    def test_queued_job_is_run_once(self, perform_mock):
+        job = TransitionJobFactory(status=JobStatus.QUEUED)
+        run_async_transition(job.id)
+        run_async_transition(job.id)
+        self.assertEqual(perform_mock.call_count, 1)
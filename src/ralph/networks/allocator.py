@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Free IP addresses allocation.
+
+Used IP addresses of a network are kept as a sorted list of closed intervals
+(runs of consecutive used IP numbers) instead of a set of every used address.
+Runs are detected in the database: run starts at address which predecessor
+is not used and ends at address which successor is not used, so only
+boundaries of runs are fetched (both lookups use unique index on `number`).
+
+Example:
+    >>> allocator = NetworkIPAllocator(network)
+    >>> allocator.first_free()
+    3232235786
+    >>> allocator.find_free_range(4)
+    3232235790
+"""
+import bisect
+
+from django.db.models import Exists, F, OuterRef
+
+
+class IPIntervalSet(object):
+    """
+    Sorted set of non-overlapping, non-adjacent closed intervals of IP numbers.
+    """
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._ends)
+
+    def __contains__(self, number):
+        idx = bisect.bisect_right(self._starts, number) - 1
+        return idx >= 0 and self._ends[idx] >= number
+
+    def add(self, start, end=None):
+        """
+        Add interval `start`-`end` (or single number when `end` is not passed)
+        merging it with overlapping and adjacent intervals.
+        """
+        if end is None:
+            end = start
+        # first interval which could be merged (ends right before start or
+        # later)
+        lo = bisect.bisect_left(self._ends, start - 1)
+        # first interval which could not be merged (starts after end + 1)
+        hi = bisect.bisect_right(self._starts, end + 1)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def gaps(self, low, high):
+        """
+        Yield free (not covered by any interval) closed intervals between
+        `low` and `high` (inclusive) in ascending order.
+        """
+        current = low
+        idx = bisect.bisect_left(self._ends, low)
+        while current <= high:
+            if idx >= len(self._starts) or self._starts[idx] > high:
+                yield current, high
+                return
+            start, end = self._starts[idx], self._ends[idx]
+            if start > current:
+                yield current, start - 1
+            current = max(current, end + 1)
+            idx += 1
+
+
+def get_used_intervals(min_ip, max_ip, limit=None):
+    """
+    Return list of (start, end) runs of used IP numbers between `min_ip` and
+    `max_ip` (inclusive) using SQL gap detection (at most `limit` first runs
+    when `limit` is passed).
+    """
+    min_ip, max_ip = int(min_ip), int(max_ip)
+    starts = _get_run_boundaries(min_ip, max_ip, -1)
+    ends = _get_run_boundaries(min_ip, max_ip, 1)
+    if limit is not None:
+        starts, ends = starts[:limit], ends[:limit]
+    return [(int(start), int(end)) for start, end in zip(starts, ends)]
+
+
+def _get_run_boundaries(min_ip, max_ip, offset):
+    """
+    Return queryset of used IP numbers between `min_ip` and `max_ip` which
+    neighbour (number + `offset`) is not used (or is outside of the range),
+    i.e. starts (offset -1) or ends (offset 1) of runs of used numbers.
+    """
+    from ralph.networks.models import IPAddress
+
+    neighbours = IPAddress.objects.filter(
+        number__gte=min_ip,
+        number__lte=max_ip,
+        number=OuterRef('neighbour'),
+    )
+    return IPAddress.objects.filter(
+        number__gte=min_ip,
+        number__lte=max_ip,
+    ).annotate(
+        neighbour=F('number') + offset,
+    ).annotate(
+        has_neighbour=Exists(neighbours),
+    ).filter(
+        has_neighbour=False,
+    ).order_by('number').values_list('number', flat=True)
+
+
+class NetworkIPAllocator(object):
+    """
+    Find free IP numbers in network, omitting network and broadcast addresses
+    and reserved addresses at the beginning and at the end of the network.
+
+    Runs of used numbers are loaded lazily, in chunks (growing up to
+    `max_chunk_size` runs), so looking for first free IP does not need to
+    fetch whole network. Numbers marked as used (`mark_used`) are remembered
+    by the allocator, so single instance could be used to pick many
+    addresses one by one.
+    """
+    min_chunk_size = 64
+    max_chunk_size = 4096
+
+    def __init__(self, network):
+        self.network = network
+        # add one to omit network address
+        self.low = int(
+            network.min_ip + 1 + network.reserved_from_beginning
+        )
+        # subtract 1 to omit broadcast address
+        self.high = int(
+            network.max_ip - 1 - network.reserved_from_end
+        )
+        self.used = IPIntervalSet()
+        # numbers lower than this one are already loaded from the database
+        self._loaded_to = self.low
+        self._chunk_size = self.min_chunk_size
+
+    def _load_chunk(self):
+        """
+        Load next chunk of runs of used numbers. One additional run start is
+        fetched, so every gap in the loaded part is complete (it ends right
+        before used number).
+        """
+        starts = list(_get_run_boundaries(
+            self._loaded_to, self.high, -1
+        )[:self._chunk_size + 1])
+        ends = _get_run_boundaries(
+            self._loaded_to, self.high, 1
+        )[:self._chunk_size]
+        for start, end in zip(starts, ends):
+            self.used.add(int(start), int(end))
+        if len(starts) > self._chunk_size:
+            self._loaded_to = int(starts[-1])
+        else:
+            self._loaded_to = self.high + 1
+        self._chunk_size = min(self._chunk_size * 2, self.max_chunk_size)
+
+    def mark_used(self, number):
+        self.used.add(int(number))
+
+    def iter_gaps(self):
+        """
+        Yield closed intervals of free numbers in ascending order.
+        """
+        position = self.low
+        while position <= self.high:
+            if position >= self._loaded_to:
+                self._load_chunk()
+            # materialize gaps of current part to allow marking numbers as
+            # used while iterating
+            yield from list(self.used.gaps(position, self._loaded_to - 1))
+            position = self._loaded_to
+
+    def iter_free(self):
+        """
+        Yield free IP numbers in ascending order.
+        """
+        for start, end in self.iter_gaps():
+            yield from range(start, end + 1)
+
+    def first_free(self):
+        return next(self.iter_free(), None)
+
+    def find_free_range(self, count):
+        """
+        Return first number of `count` consecutive free IP numbers or None
+        if there is no such range in the network.
+        """
+        for start, end in self.iter_gaps():
+            if end - start + 1 >= count:
+                return start
+        return None
@@ -85,6 +85,7 @@ class IPAddressViewSet(RalphAPIViewSet):
     queryset = IPAddress.objects.all()
     serializer_class = IPAddressSerializer
     save_serializer_class = IPAddressSaveSerializer
+    bulk_write = True
     prefetch_related = [
         'ethernet', 'ethernet__base_object', 'ethernet__base_object__tags',
         'network',
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Process-local cache of networks for finding the smallest network containing
+IP address (or another network) without querying the database.
+
+Every process keeps in memory longest-prefix-match index of all networks
+ranges, tagged with version of networks stored in (shared) Django cache.
+Version is changed after commit of every transaction which created, deleted
+or changed address of any network, so every process rebuilds its index on
+the next lookup.
+
+Changes of networks which are not committed yet are not visible for other
+processes, so until the end of such transaction lookups in the current
+thread fall back to the database (see `NetworkMixin.get_network_id`).
+"""
+import logging
+from collections import defaultdict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'ralph.networks.lookup.version'
+
+
+class NetworkLookup(object):
+    """
+    Longest-prefix-match index of networks.
+
+    Networks are grouped by their size (number of host bits). In every group
+    network is stored under its address shifted right by host bits, so
+    finding the smallest network containing IP (or range of IPs) takes
+    single dict lookup for every distinct size of network, starting from
+    the smallest one (at most 129 lookups for IPv6).
+    """
+    def __init__(self, networks, version=None):
+        """
+        Args:
+            networks: iterable of (pk, min_ip, max_ip) tuples
+            version: version of networks used to build the index
+        """
+        self.version = version
+        prefixes = defaultdict(dict)
+        for pk, min_ip, max_ip in networks:
+            min_ip, max_ip = int(min_ip), int(max_ip)
+            host_bits = (max_ip - min_ip + 1).bit_length() - 1
+            prefixes[host_bits][min_ip >> host_bits] = pk
+        self._prefixes = [
+            (host_bits, prefixes[host_bits]) for host_bits in sorted(prefixes)
+        ]
+        self._count = sum(len(nets) for nets in prefixes.values())
+
+    @classmethod
+    def from_db(cls, version=None):
+        from ralph.networks.models import Network
+        return cls(
+            Network.objects.values_list('pk', 'min_ip', 'max_ip').iterator(),
+            version=version,
+        )
+
+    def __len__(self):
+        return self._count
+
+    def find(self, min_ip, max_ip=None, exclude=None):
+        """
+        Return pk of the smallest network containing range (min_ip, max_ip)
+        (or single IP, when max_ip is not passed), other than `exclude`.
+        Return None if there is no such network.
+        """
+        if max_ip is None:
+            max_ip = min_ip
+        for host_bits, networks in self._prefixes:
+            key = min_ip >> host_bits
+            if max_ip >> host_bits != key:
+                continue
+            pk = networks.get(key)
+            if pk is not None and pk != exclude:
+                return pk
+        return None
+
+
+class _NetworksChange(object):
+    """
+    On-commit callback of transaction which changed any network - it
+    changes shared version of networks.
+    """
+    def __call__(self):
+        cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+class NetworkLookupCache(object):
+    def __init__(self):
+        self._lookup = None
+
+    def _has_pending_changes(self):
+        # callbacks registered with `transaction.on_commit` are discarded by
+        # Django when transaction (or savepoint) is rolled back, so pending
+        # callback means uncommitted change of networks in this thread
+        return any(
+            isinstance(func, _NetworksChange)
+            for sids, func in connection.run_on_commit
+        )
+
+    def _get_version(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, uuid4().hex, None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def get(self):
+        """
+        Return `NetworkLookup` with current networks or None if it could not
+        be used (cache disabled, uncommitted changes of networks in current
+        transaction or version could not be stored in Django cache).
+        """
+        if not settings.USE_CACHE or self._has_pending_changes():
+            return None
+        version = self._get_version()
+        if version is None:
+            return None
+        lookup = self._lookup
+        if lookup is None or lookup.version != version:
+            logger.debug('Building networks lookup (version %s)', version)
+            lookup = NetworkLookup.from_db(version=version)
+            self._lookup = lookup
+        return lookup
+
+    def invalidate(self):
+        """
+        Mark networks as changed in current transaction.
+        """
+        self._lookup = None
+        transaction.on_commit(_NetworksChange())
+
+
+network_lookup = NetworkLookupCache()
@@ -0,0 +1,19 @@
+# Generated by Django 2.0.13 on 2026-10-18 23:25
+
+from django.db import migrations
+import ralph.lib.mixins.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('networks', '0017_merge_20240925_1101'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ipaddress',
+            name='hostname',
+            field=ralph.lib.mixins.fields.NullableCharFieldWithAutoStrip(blank=True, db_index=True, default=None, max_length=255, null=True, verbose_name='hostname'),
+        ),
+    ]
@@ -3,13 +3,20 @@ import ipaddress
 import logging
 import socket
 import struct
+from collections import defaultdict
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models.signals import post_migrate, pre_save
-from django.db.utils import ProgrammingError
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save
+)
+from django.db.utils import IntegrityError, ProgrammingError
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from mptt.models import MPTTModel, TreeForeignKey
 
@@ -27,9 +34,17 @@ from ralph.lib.mixins.models import (
     PreviousStateMixin,
     TimeStampMixin
 )
+from ralph.lib.network.resolver import resolver
 from ralph.lib.polymorphic.fields import PolymorphicManyToManyField
+from ralph.networks.allocator import NetworkIPAllocator
 from ralph.networks.fields import IPNetwork
+from ralph.networks.lookup import network_lookup
 from ralph.networks.models.choices import IPAddressStatus
+from ralph.networks.tree import (
+    get_mptt_fields,
+    get_networks_for_numbers,
+    get_parents
+)
 
 logger = logging.getLogger(__name__)
 
@@ -130,7 +145,7 @@ class NetworkEnvironment(
                     self.hostname_template_prefix,
                     self.hostname_template_postfix,
                     self.hostname_template_counter_length,
-                    self.check_hostname_is_available
+                    self.get_taken_hostnames
             )
         else:
             result = self.next_hostname_without_model_counter()
@@ -147,22 +162,48 @@ class NetworkEnvironment(
 
         return True
 
+    def get_taken_hostnames(self, hostnames):
+        """
+        Return (lowercased) hostnames from `hostnames` which are already
+        used by any of hostname models (single query per model).
+        """
+        taken = set()
+        for model_class in self.HOSTNAME_MODELS:
+            taken.update(
+                hostname.lower()
+                for hostname in model_class.objects.filter(
+                    hostname__in=hostnames
+                ).values_list('hostname', flat=True)
+            )
+        return taken
+
     def issue_next_free_hostname(self):
         """
         Retrieve and reserve next free hostname
         """
-        if self.use_hostname_counter:
-            hostname = None
-
-            while not self.check_hostname_is_available(hostname):
-                hostname = AssetLastHostname.increment_hostname(
-                    self.hostname_template_prefix,
-                    self.hostname_template_postfix,
-                ).formatted_hostname(self.hostname_template_counter_length)
-
-            return hostname
+        return self.issue_next_free_hostnames(1)[0]
 
-        return self.next_hostname_without_model_counter()
+    def issue_next_free_hostnames(self, count):
+        """
+        Retrieve and reserve `count` next free hostnames
+        """
+        if self.use_hostname_counter:
+            return AssetLastHostname.issue_next_free_hostnames(
+                self.hostname_template_prefix,
+                self.hostname_template_postfix,
+                self.hostname_template_counter_length,
+                count,
+                self.get_taken_hostnames
+            )
+        counter = self.current_counter_without_model()
+        return [
+            AssetLastHostname(
+                prefix=self.hostname_template_prefix,
+                counter=counter + i,
+                postfix=self.hostname_template_postfix
+            ).formatted_hostname(self.hostname_template_counter_length)
+            for i in range(1, count + 1)
+        ]
 
     def current_counter_without_model(self):
         """
@@ -216,21 +257,82 @@ class NetworkEnvironment(
         )
 
 
+BULK_UPDATE_CHUNK_SIZE = 500
+
+
+def _chunks(items, size):
+    for idx in range(0, len(items), size):
+        yield items[idx:idx + size]
+
+
+def _send_post_save(model, pks, exclude=None):
+    """
+    Send post_save signal (if there is any receiver) for objects updated
+    with queryset `update`.
+    """
+    if not post_save.has_listeners(model):
+        return
+    for chunk in _chunks(list(pks), BULK_UPDATE_CHUNK_SIZE):
+        for obj in model._default_manager.filter(pk__in=chunk):
+            if obj.pk == exclude:
+                continue
+            post_save.send(
+                sender=model, instance=obj, created=False,
+                update_fields=None, raw=False, using=obj._state.db,
+            )
+
+
+def _move_ips(ips, network):
+    """
+    Assign IP addresses from queryset `ips` to `network` with single UPDATE
+    (sending post_save for every moved IP, if there is any receiver).
+    """
+    if post_save.has_listeners(IPAddress):
+        pks = list(ips.values_list('pk', flat=True))
+        ips = IPAddress.objects.filter(pk__in=pks)
+    else:
+        pks = []
+    ips.update(network=network, modified=timezone.now())
+    _send_post_save(IPAddress, pks)
+
+
 class NetworkMixin(object):
     _parent_attr = None
 
     def _assign_parent(self):
-        setattr(self, self._parent_attr, self.get_network())
+        field = self._meta.get_field(self._parent_attr)
+        network_id = self.get_network_id()
+        if getattr(self, field.attname) != network_id:
+            setattr(self, field.attname, network_id)
+            # cached network object is not valid anymore
+            if field.is_cached(self):
+                field.delete_cached_value(self)
 
     def search_networks(self):
         raise NotImplementedError()
 
+    def _get_lookup_range(self):
+        """
+        Return (min_ip, max_ip, excluded network pk) used to find network
+        in networks lookup.
+        """
+        raise NotImplementedError()
+
+    def get_network_id(self):
+        lookup = network_lookup.get()
+        if lookup is None:
+            network = self.search_networks().first()
+            return network.pk if network else None
+        return lookup.find(*self._get_lookup_range())
+
     def get_network(self):
-        network = None
-        networks = self.search_networks()
-        if networks:
-            network = networks[0]
-        return network
+        lookup = network_lookup.get()
+        if lookup is None:
+            return self.search_networks().first()
+        network_id = lookup.find(*self._get_lookup_range())
+        if network_id is None:
+            return None
+        return Network.objects.filter(pk=network_id).first()
 
 
 class Network(
@@ -437,15 +539,17 @@ class Network(
             'update_subnetworks_parent', True
         )
         creating = not self.pk
-        # store previous subnetworks to update them when address has changed
+        # store previous range to update ips and subnetworks which were in
+        # scope of this network before address change
         if (
             self._has_address_changed and
-            update_subnetworks_parent and
-            not creating
+            not creating and
+            self.min_ip is not None and
+            self.max_ip is not None
         ):
-            prev_subnetworks = self.get_immediate_subnetworks()
+            prev_range = (int(self.min_ip), int(self.max_ip))
         else:
-            prev_subnetworks = []
+            prev_range = None
 
         self.min_ip = int(self.network_address)
         self.max_ip = int(self.broadcast_address)
@@ -454,13 +558,10 @@ class Network(
 
         # change related ips and (sub)networks only if address has changed
         if self._has_address_changed or creating:
-            # after changing address, assign new ips to this network
-            self._assign_new_ips_to_network()
-            # change also ip addresses which are no longer in scope of current
-            # network
-            self._unassign_ips_from_network()
-            if update_subnetworks_parent:
-                self._update_subnetworks_parent(prev_subnetworks)
+            self._update_ips_and_subnetworks(
+                prev_range, update_subnetworks_parent
+            )
+        self._old_address = self.address
 
     def delete(self):
         # Save fake address so that all children of network changed its
@@ -470,58 +571,140 @@ class Network(
             self.save()
             super().delete()
 
-    def _update_subnetworks_parent(self, prev_subnetworks):
+    def _update_ips_and_subnetworks(
+        self, prev_range=None, update_subnetworks_parent=True
+    ):
+        """
+        Reassign IP addresses and subnetworks after creating this network
+        or changing its address.
+
+        Every network overlapping current (or previous) range of this
+        network is fetched at once and the new tree is computed in memory,
+        then IPs and networks are moved with set-based UPDATEs (instead of
+        re-saving each of them).
+        """
+        ranges = [(self.min_ip, self.max_ip)]
+        if prev_range:
+            ranges.append(prev_range)
+        query = models.Q()
+        for min_ip, max_ip in ranges:
+            query |= models.Q(min_ip__lte=max_ip, max_ip__gte=min_ip)
+        networks = list(self.__class__._default_manager.filter(query))
+        parents = get_parents(networks)
+
+        # after changing address, assign new ips to this network
+        self._assign_new_ips_to_network(networks, parents)
+        # change also ip addresses which are no longer in scope of current
+        # network
+        if prev_range:
+            self._unassign_ips_from_network(networks)
+        if update_subnetworks_parent:
+            self._update_subnetworks_parent(networks, parents)
+
+    def _update_subnetworks_parent(self, networks, parents):
         """
         When address change, update information about parent in previous and
         current subnetworks.
+
+        Example:
+        previous state:
+        * netX: 10.20.30.0/24 (parent)
+        * netY: 10.20.30.240/28 (child)
+        adding new network netZ 10.20.30.128/25
+        -> should change parent of netY to netZ
         """
-        # re-save previous subnetworks
-        for network in prev_subnetworks:
-            network.save(update_subnetworks_parent=False)
-        # re-save current subnetworks
-        for network in self.get_immediate_subnetworks():
-            network.save(update_subnetworks_parent=False)
-        # current network is intermediate network between previous parent and
-        # previous child - re-save child to assign current network as a parent
-        # example:
-        # previous state:
-        # * netX: 10.20.30.0/24 (parent)
-        # * netY: 10.20.30.240/28 (child)
-        # adding new network netZ 10.20.30.128/25
-        # -> should change parent of netY to netZ
-        for network in self.__class__._default_manager.filter(
-            parent=self.parent, min_ip__gte=self.min_ip, max_ip__lte=self.max_ip
-        ):
-            network.save(update_subnetworks_parent=False)
+        moved = defaultdict(list)
+        for network in networks:
+            if network.parent_id != parents[network.pk]:
+                moved[parents[network.pk]].append(network.pk)
+        if not moved:
+            return
+        manager = self.__class__._default_manager
+        for parent_id, pks in moved.items():
+            manager.filter(pk__in=pks).update(parent_id=parent_id)
+        self._rebuild_trees({network.tree_id for network in networks})
+        moved_pks = [pk for pks in moved.values() for pk in pks]
+        _send_post_save(self.__class__, moved_pks, exclude=self.pk)
+
+    def _rebuild_trees(self, tree_ids):
+        """
+        Refresh MPTT fields of networks in trees with passed ids (using parent
+        link) at once, updating only changed networks.
+        """
+        manager = self.__class__._default_manager
+        networks = list(manager.filter(tree_id__in=tree_ids).only(
+            'min_ip', 'max_ip', 'parent', 'tree_id', 'lft', 'rght', 'level'
+        ))
+        parents = {network.pk: network.parent_id for network in networks}
+        roots_tree_ids = {}
+        next_tree_id = manager._get_next_tree_id()
+        for network in sorted(networks, key=lambda net: net.pk):
+            if parents[network.pk] is not None:
+                continue
+            if network.tree_id in roots_tree_ids.values():
+                roots_tree_ids[network.pk] = next_tree_id
+                next_tree_id += 1
+            else:
+                roots_tree_ids[network.pk] = network.tree_id
+        fields = get_mptt_fields(networks, parents, roots_tree_ids)
+        changed = [
+            (network.pk, fields[network.pk]) for network in networks
+            if fields[network.pk] != (
+                network.tree_id, network.lft, network.rght, network.level
+            )
+        ]
+        for chunk in _chunks(changed, BULK_UPDATE_CHUNK_SIZE):
+            updates = {}
+            for idx, field_name in enumerate(
+                ['tree_id', 'lft', 'rght', 'level']
+            ):
+                updates[field_name] = models.Case(
+                    *[
+                        models.When(pk=pk, then=models.Value(values[idx]))
+                        for pk, values in chunk
+                    ],
+                    output_field=models.PositiveIntegerField()
+                )
+            manager.filter(pk__in=[pk for pk, _ in chunk]).update(**updates)
+        if self.pk in fields:
+            self.tree_id, self.lft, self.rght, self.level = fields[self.pk]
 
-    def _assign_new_ips_to_network(self):
+    def _assign_new_ips_to_network(self, networks, parents):
         """
-        Filter IP addresses in scope of this network and save them, to
-        (possibly) assign them to current network (according to rules in
-        IPAddress.save)
+        Assign IP addresses in scope of this network (but not in scope of any
+        of its subnetworks) to current network.
         """
-        for ip in IPAddress.objects.exclude(
-            network=self,
-        ).exclude(
-            network__in=self.get_subnetworks()
-        ).filter(
+        ips = IPAddress.objects.filter(
             number__gte=self.min_ip,
             number__lte=self.max_ip
-        ):
-            # call save instead of update - ip might be assigned to another
-            # (smaller) network, which became subnetwork of current network
-            ip.save()
+        ).exclude(network=self)
+        for network in networks:
+            if parents[network.pk] == self.pk:
+                ips = ips.exclude(
+                    number__gte=network.min_ip, number__lte=network.max_ip
+                )
+        _move_ips(ips, self)
 
-    def _unassign_ips_from_network(self):
+    def _unassign_ips_from_network(self, networks):
         """
-        Filter IPAddresses which are assigned to current network, but should
-        NOT be (their address is not in scope of current network) and save them
-        (to reassign them to another network).
+        Reassign IPAddresses which are assigned to current network, but should
+        NOT be (their address is not in scope of current network) to the
+        smallest network containing them.
         """
-        for ip in IPAddress.objects.filter(
-            network=self, number__lt=self.min_ip, number__gt=self.max_ip
-        ):
-            ip.save()
+        ips = dict(IPAddress.objects.filter(network=self).filter(
+            models.Q(number__lt=self.min_ip) | models.Q(number__gt=self.max_ip)
+        ).values_list('number', 'pk'))
+        if not ips:
+            return
+        new_networks = get_networks_for_numbers(
+            [network for network in networks if network.pk != self.pk], ips
+        )
+        ips_by_network = defaultdict(list)
+        for number, network in new_networks.items():
+            ips_by_network[network].append(ips[number])
+        for network, pks in ips_by_network.items():
+            for chunk in _chunks(pks, BULK_UPDATE_CHUNK_SIZE):
+                _move_ips(IPAddress.objects.filter(pk__in=chunk), network)
 
     def get_subnetworks(self):
         return self.get_descendants()
@@ -529,31 +712,141 @@ class Network(
     def get_immediate_subnetworks(self):
         return self.get_children()
 
-    def get_first_free_ip(self):
-        used_ips = set(IPAddress.objects.filter(
-            number__range=(self.min_ip, self.max_ip)
-        ).values_list(
-            'number', flat=True
-        ))
-        # add one to omit network address
-        min_ip = int(self.min_ip + 1 + self.reserved_from_beginning)
-        # subtract 1 to omit broadcast address
-        max_ip = int(self.max_ip - 1 - self.reserved_from_end)
-        free_ip_as_int = None
-        for free_ip_as_int in range(min_ip, max_ip + 1):
-            if free_ip_as_int not in used_ips:
-                next_free_ip = ipaddress.ip_address(free_ip_as_int)
-                if is_in_dnsaas(next_free_ip):
-                    logger.warning(
-                        'IP %s is already in DNS', next_free_ip
-                    )
-                else:
-                    return next_free_ip
+    def get_ip_allocator(self):
+        return NetworkIPAllocator(self)
+
+    def _is_free_in_dnsaas(self, ip):
+        if is_in_dnsaas(ip):
+            logger.warning('IP %s is already in DNS', ip)
+            return False
+        return True
+
+    def get_first_free_ip(self, allocator=None):
+        allocator = allocator or self.get_ip_allocator()
+        for free_ip_as_int in allocator.iter_free():
+            next_free_ip = ipaddress.ip_address(free_ip_as_int)
+            if self._is_free_in_dnsaas(next_free_ip):
+                return next_free_ip
+
+    def get_free_ip_range(self, count, allocator=None):
+        """
+        Return list of `count` consecutive free IP addresses (the lowest
+        in the network) or empty list if there is no such range.
+        """
+        allocator = allocator or self.get_ip_allocator()
+        while True:
+            start = allocator.find_free_range(count)
+            if start is None:
+                return []
+            ips = [
+                ipaddress.ip_address(number)
+                for number in range(start, start + count)
+            ]
+            in_dnsaas = [ip for ip in ips if not self._is_free_in_dnsaas(ip)]
+            if not in_dnsaas:
+                return ips
+            # try again omitting addresses already existing in DNS
+            for ip in in_dnsaas:
+                allocator.mark_used(int(ip))
+
+    def get_free_ips(self, count, allocator=None):
+        """
+        Return list of (at most) `count` first free IP addresses.
+        """
+        allocator = allocator or self.get_ip_allocator()
+        ips = []
+        if count <= 0:
+            return ips
+        for free_ip_as_int in allocator.iter_free():
+            next_free_ip = ipaddress.ip_address(free_ip_as_int)
+            if self._is_free_in_dnsaas(next_free_ip):
+                ips.append(next_free_ip)
+                if len(ips) >= count:
+                    break
+        return ips
+
+    def _lock_tree(self):
+        """
+        Lock root network of the tree containing this network (till the end
+        of current transaction). Every network overlapping this one belongs to
+        the same tree, so IP reservations in any of them are serialized.
+        """
+        list(
+            self.__class__._default_manager.select_for_update().filter(
+                tree_id=self.tree_id, parent__isnull=True
+            ).values_list('pk', flat=True)
+        )
+
+    def _get_network_for_ips(self):
+        """
+        Return function returning the smallest network (this one or any of
+        its subnetworks) containing passed IP number.
+        """
+        networks = self.__class__._default_manager.filter(
+            min_ip__gte=self.min_ip, max_ip__lte=self.max_ip
+        ).order_by('-min_ip', 'max_ip')
+
+        def get_network(number):
+            for network in networks:
+                if network.min_ip <= number <= network.max_ip:
+                    return network
+        return get_network
+
+    def issue_next_free_ips(self, count, max_retries=3):
+        """
+        Reserve `count` free IP addresses in this network at once (creating
+        them in bulk).
+
+        Networks tree is locked for the time of the reservation, so
+        concurrent reservations don't race for the same addresses. If some
+        address is created in the meantime without the lock (ex. manually),
+        reservation is retried (at most `max_retries` times).
+
+        Returns:
+            list of created IPAddress objects (ordered by address)
+        """
+        for retry in range(max_retries + 1):
+            try:
+                with transaction.atomic():
+                    self._lock_tree()
+                    return self._create_free_ips(count)
+            except IntegrityError:
+                if retry >= max_retries:
+                    raise
+                logger.warning(
+                    'Free IP in %s taken during reservation, retrying', self
+                )
+
+    def _create_free_ips(self, count):
+        free_ips = self.get_free_ips(count)
+        if len(free_ips) < count:
+            raise ValidationError(
+                'Not enough free IP addresses in {} ({} requested)'.format(
+                    self, count
+                )
+            )
+        get_network = self._get_network_for_ips()
+        hostnames = (
+            resolver.resolve_many(free_ips)
+            if settings.CHECK_IP_HOSTNAME_ON_SAVE else {}
+        )
+        IPAddress.objects.bulk_create([
+            IPAddress(
+                address=str(ip),
+                number=int(ip),
+                network=get_network(int(ip)),
+                is_public=not ip.is_private,
+                hostname=hostnames.get(str(ip)),
+            )
+            for ip in free_ips
+        ])
+        # bulk_create does not set primary keys (on MySQL)
+        return list(IPAddress.objects.filter(
+            number__in=[int(ip) for ip in free_ips]
+        ).order_by('number'))
 
     def issue_next_free_ip(self):
-        # TODO: exception when any free IP found
-        ip_address = self.get_first_free_ip()
-        return IPAddress.objects.create(address=str(ip_address))
+        return self.issue_next_free_ips(1)[0]
 
     def search_networks(self):
         """
@@ -567,6 +860,9 @@ class Network(
         ).exclude(pk=self.id).order_by('-min_ip', 'max_ip')
         return nets
 
+    def _get_lookup_range(self):
+        return int(self.min_ip), int(self.max_ip), self.pk
+
 
 # TODO: remove
 class DiscoveryQueue(AdminAbsoluteUrlMixin, NamedMixin, models.Model):
@@ -628,6 +924,7 @@ class IPAddress(
         null=True,
         blank=True,
         default=None,
+        db_index=True,
         # TODO: unique
     )
     number = models.DecimalField(
@@ -759,7 +1056,7 @@ class IPAddress(
                     self.hostname, reverse=True
                 )
             if not self.hostname and self.address:
-                self.hostname = network_tools.hostname(self.address)
+                self.hostname = resolver.resolve(self.address)
         if self.number and not self.address:
             self.address = ipaddress.ip_address(int(self.number))
         else:
@@ -802,6 +1099,35 @@ class IPAddress(
         ).order_by('-min_ip', 'max_ip')
         return nets
 
+    def _get_lookup_range(self):
+        int_value = int(self.ip)
+        return int_value, int_value, None
+
+    @classmethod
+    def get_networks_ids(cls, numbers):
+        """
+        Return dict with id of network (the smallest one containing IP) or
+        None for every IP number from `numbers` (resolved at once).
+        """
+        numbers = set(numbers)
+        if not numbers:
+            return {}
+        lookup = network_lookup.get()
+        if lookup is not None:
+            return {
+                number: lookup.find(number, number, None)
+                for number in numbers
+            }
+        networks = Network.objects.filter(
+            min_ip__lte=max(numbers), max_ip__gte=min(numbers)
+        ).only('min_ip', 'max_ip')
+        return {
+            number: network.pk if network else None
+            for number, network in get_networks_for_numbers(
+                networks, numbers
+            ).items()
+        }
+
 
 @receiver(post_migrate)
 def rebuild_handler(sender, **kwargs):
@@ -816,6 +1142,20 @@ def rebuild_handler(sender, **kwargs):
             # this may happen during unapplying initial migration for networks
             # app
             logger.warning('ProgrammingError during Network rebuilding')
+        network_lookup.invalidate()
+
+
+@receiver(post_save, sender=Network)
+def invalidate_network_lookup_on_save(sender, instance, created, **kwargs):
+    # parent changes of networks (ex. saving moved subnetworks) don't change
+    # lookup - only addresses matter
+    if created or instance._has_address_changed:
+        network_lookup.invalidate()
+
+
+@receiver(post_delete, sender=Network)
+def invalidate_network_lookup_on_delete(sender, instance, **kwargs):
+    network_lookup.invalidate()
 
 
 @receiver(pre_save, sender=NetworkEnvironment)
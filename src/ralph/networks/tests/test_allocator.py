@@ -0,0 +1,113 @@
+from ipaddress import ip_address
+
+from ddt import data, ddt, unpack
+from django.test import TestCase
+
+from ralph.networks.allocator import (
+    get_used_intervals,
+    IPIntervalSet,
+    NetworkIPAllocator
+)
+from ralph.networks.models import IPAddress, Network
+
+
+@ddt
+class IPIntervalSetTest(TestCase):
+    @unpack
+    @data(
+        ([(1, 1), (2, 2), (3, 3)], [(1, 3)]),
+        ([(5, 7), (1, 2)], [(1, 2), (5, 7)]),
+        ([(1, 2), (5, 7), (3, 4)], [(1, 7)]),
+        ([(1, 10), (3, 4)], [(1, 10)]),
+        ([(5, 7), (1, 20)], [(1, 20)]),
+        ([(1, 2), (4, 5), (8, 9), (3, 8)], [(1, 9)]),
+    )
+    def test_add_merges_intervals(self, intervals, expected):
+        self.assertEqual(list(IPIntervalSet(intervals)), expected)
+
+    def test_contains(self):
+        intervals = IPIntervalSet([(1, 3), (10, 10)])
+        self.assertIn(1, intervals)
+        self.assertIn(3, intervals)
+        self.assertIn(10, intervals)
+        self.assertNotIn(0, intervals)
+        self.assertNotIn(4, intervals)
+        self.assertNotIn(11, intervals)
+
+    @unpack
+    @data(
+        ([], 1, 5, [(1, 5)]),
+        ([(1, 5)], 1, 5, []),
+        ([(2, 3)], 1, 5, [(1, 1), (4, 5)]),
+        ([(0, 2), (4, 4), (9, 12)], 1, 10, [(3, 3), (5, 8)]),
+        ([(7, 9)], 1, 5, [(1, 5)]),
+        ([(1, 2)], 5, 1, []),
+    )
+    def test_gaps(self, intervals, low, high, expected):
+        self.assertEqual(
+            list(IPIntervalSet(intervals).gaps(low, high)), expected
+        )
+
+
+class GetUsedIntervalsTest(TestCase):
+    def _create_ips(self, *numbers):
+        IPAddress.objects.bulk_create([
+            IPAddress(address=str(ip_address(number)), number=number)
+            for number in numbers
+        ])
+
+    def test_used_intervals(self):
+        self._create_ips(9, 10, 11, 12, 20, 22, 23, 30, 31)
+        self.assertEqual(
+            get_used_intervals(10, 30),
+            [(10, 12), (20, 20), (22, 23), (30, 30)]
+        )
+
+    def test_used_intervals_empty(self):
+        self._create_ips(1, 2)
+        self.assertEqual(get_used_intervals(10, 30), [])
+
+
+class NetworkIPAllocatorTest(TestCase):
+    def setUp(self):
+        self.net = Network.objects.create(
+            address='10.0.0.0/29', reserved_from_beginning=0,
+            reserved_from_end=0,
+        )
+
+    def _create_ips(self, *addresses):
+        for address in addresses:
+            IPAddress.objects.create(address=address)
+
+    def test_first_free(self):
+        self._create_ips('10.0.0.1', '10.0.0.2', '10.0.0.4')
+        allocator = NetworkIPAllocator(self.net)
+        self.assertEqual(allocator.first_free(), int(ip_address('10.0.0.3')))
+
+    def test_first_free_with_marked_as_used(self):
+        self._create_ips('10.0.0.1')
+        allocator = NetworkIPAllocator(self.net)
+        allocator.mark_used(int(ip_address('10.0.0.2')))
+        self.assertEqual(allocator.first_free(), int(ip_address('10.0.0.3')))
+
+    def test_find_free_range(self):
+        self._create_ips('10.0.0.2', '10.0.0.4')
+        allocator = NetworkIPAllocator(self.net)
+        self.assertEqual(
+            allocator.find_free_range(2), int(ip_address('10.0.0.5'))
+        )
+        self.assertIsNone(allocator.find_free_range(3))
+
+    def test_iter_gaps_loads_runs_in_chunks(self):
+        self._create_ips('10.0.0.1', '10.0.0.3', '10.0.0.5', '10.0.0.6')
+        allocator = NetworkIPAllocator(self.net)
+        allocator._chunk_size = 1
+        with self.assertNumQueries(4):
+            gaps = list(allocator.iter_gaps())
+        self.assertEqual(
+            gaps,
+            [
+                (int(ip_address('10.0.0.2')), int(ip_address('10.0.0.2'))),
+                (int(ip_address('10.0.0.4')), int(ip_address('10.0.0.4'))),
+            ]
+        )
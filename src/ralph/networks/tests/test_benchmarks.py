@@ -0,0 +1,177 @@
+import os
+import random
+import time
+from ipaddress import ip_address
+from unittest import skipUnless
+
+from ddt import data, ddt, unpack
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ralph.networks.lookup import NetworkLookup
+from ralph.networks.models import IPAddress, Network
+
+# Benchmarks are slow (they create up to ~1M IP addresses), so they are
+# run only when RUN_BENCHMARKS=1 env is set
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS', False)
+OCCUPANCIES = (0.1, 0.5, 0.9)
+
+
+def legacy_get_first_free_ip(network):
+    """
+    Previous implementation of `Network.get_first_free_ip` (set of every used
+    address scanned one by one).
+    """
+    used_ips = set(IPAddress.objects.filter(
+        number__range=(network.min_ip, network.max_ip)
+    ).values_list('number', flat=True))
+    min_ip = int(network.min_ip + 1 + network.reserved_from_beginning)
+    max_ip = int(network.max_ip - 1 - network.reserved_from_end)
+    for free_ip_as_int in range(min_ip, max_ip + 1):
+        if free_ip_as_int not in used_ips:
+            return ip_address(free_ip_as_int)
+
+
+def _measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+@ddt
+@skipUnless(RUN_BENCHMARKS, 'RUN_BENCHMARKS env is not set')
+class FreeIPAllocationBenchmark(TestCase):
+    def _fill_network(self, network, occupancy):
+        """
+        Mark `occupancy` fraction of network addresses as used - first half
+        of them as one consecutive block (typical for sequential
+        allocation), second half randomly spread over the rest of network.
+        """
+        rand = random.Random(network.address)
+        min_ip, max_ip = int(network.min_ip) + 1, int(network.max_ip) - 1
+        used_count = int((max_ip - min_ip + 1) * occupancy)
+        block = list(range(min_ip, min_ip + used_count // 2))
+        spread = rand.sample(
+            range(min_ip + len(block), max_ip + 1), used_count - len(block)
+        )
+        IPAddress.objects.bulk_create(
+            [
+                IPAddress(address=str(ip_address(number)), number=number)
+                for number in block + spread
+            ],
+            batch_size=500,
+        )
+
+    @unpack
+    @data(*[
+        (address, occupancy)
+        for address in ('10.0.0.0/16', '10.16.0.0/12')
+        for occupancy in OCCUPANCIES
+    ])
+    def test_first_free_ip(self, address, occupancy):
+        network = Network.objects.create(
+            address=address, reserved_from_beginning=0, reserved_from_end=0
+        )
+        self._fill_network(network, occupancy)
+
+        legacy_ip, legacy_time = _measure(legacy_get_first_free_ip, network)
+        new_ip, new_time = _measure(network.get_first_free_ip)
+        ip_range, range_time = _measure(network.get_free_ip_range, 4)
+
+        self.assertEqual(legacy_ip, new_ip)
+        self.assertEqual(len(ip_range), 4)
+        print(
+            '\n{} ({:.0%} used): legacy first free IP {:.3f}s, '
+            'allocator first free IP {:.3f}s, 4 consecutive IPs {:.3f}s'
+            .format(address, occupancy, legacy_time, new_time, range_time)
+        )
+
+
+@skipUnless(RUN_BENCHMARKS, 'RUN_BENCHMARKS env is not set')
+class CoveringNetworkBenchmark(TestCase):
+    def test_create_covering_network(self):
+        # 100k IPs in /24 blocks - every 4th block covered by subnetwork
+        subnetworks = []
+        ips = []
+        for block in range(400):
+            address = '10.{}.{}.0/24'.format(block // 256, block % 256)
+            if block % 4 == 0:
+                subnetworks.append(
+                    Network.objects.create(name=address, address=address)
+                )
+            base = int(ip_address('10.0.0.0')) + block * 256
+            ips.extend(
+                IPAddress(address=str(ip_address(number)), number=number)
+                for number in range(base + 1, base + 251)
+            )
+        IPAddress.objects.bulk_create(ips, batch_size=500)
+
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            supernet = Network.objects.create(
+                name='super', address='10.0.0.0/15'
+            )
+        duration = time.perf_counter() - start
+
+        self.assertEqual(supernet.ips.count(), 300 * 250)
+        self.assertEqual(supernet.get_children().count(), len(subnetworks))
+        print(
+            '\ncovering network over {} IPs: {:.3f}s, {} queries'.format(
+                len(ips), duration, len(queries)
+            )
+        )
+
+
+@skipUnless(RUN_BENCHMARKS, 'RUN_BENCHMARKS env is not set')
+class NetworkLookupBenchmark(TestCase):
+    networks_count = 50000
+    lookups_count = 1000
+
+    def _create_networks(self):
+        # /24 networks (with MPTT fields of separate trees - tree structure
+        # doesn't matter for lookup)
+        base = int(ip_address('10.0.0.0'))
+        Network.objects.bulk_create(
+            [
+                Network(
+                    name='net{}'.format(i),
+                    address='{}/24'.format(ip_address(base + i * 256)),
+                    min_ip=base + i * 256,
+                    max_ip=base + i * 256 + 255,
+                    tree_id=i + 1, lft=1, rght=2, level=0,
+                )
+                for i in range(self.networks_count)
+            ],
+            batch_size=100,
+        )
+
+    def test_network_lookup(self):
+        self._create_networks()
+        rand = random.Random(0)
+        base = int(ip_address('10.0.0.0'))
+        ips = [
+            IPAddress(address=str(ip_address(
+                base + rand.randrange(self.networks_count * 256)
+            )))
+            for _ in range(self.lookups_count)
+        ]
+
+        query_networks, query_time = _measure(
+            lambda: [ip.search_networks().first().pk for ip in ips]
+        )
+        lookup, build_time = _measure(NetworkLookup.from_db)
+        lookup_networks, lookup_time = _measure(
+            lambda: [lookup.find(*ip._get_lookup_range()) for ip in ips]
+        )
+
+        self.assertEqual(query_networks, lookup_networks)
+        print(
+            '\n{} networks, {} lookups: query {:.1f}us per IP, lookup '
+            '{:.1f}us per IP (building lookup {:.3f}s)'.format(
+                self.networks_count, self.lookups_count,
+                query_time / self.lookups_count * 10 ** 6,
+                lookup_time / self.lookups_count * 10 ** 6,
+                build_time,
+            )
+        )
@@ -0,0 +1,95 @@
+from ipaddress import ip_address, ip_network
+
+from django.db import transaction
+from django.test import override_settings, SimpleTestCase, TransactionTestCase
+
+from ralph.networks.lookup import network_lookup, NetworkLookup
+from ralph.networks.models import IPAddress, Network
+
+
+def _ip(address):
+    return int(ip_address(address))
+
+
+def _net(pk, address):
+    network = ip_network(address)
+    return pk, int(network.network_address), int(network.broadcast_address)
+
+
+class NetworkLookupTest(SimpleTestCase):
+    def setUp(self):
+        self.lookup = NetworkLookup([
+            _net(1, '10.0.0.0/8'),
+            _net(2, '10.1.0.0/16'),
+            _net(3, '10.1.1.0/24'),
+            _net(4, '192.168.0.0/24'),
+            _net(5, '2001:db8::/32'),
+        ])
+
+    def test_find_ip(self):
+        self.assertEqual(self.lookup.find(_ip('10.1.1.1')), 3)
+        self.assertEqual(self.lookup.find(_ip('10.1.2.1')), 2)
+        self.assertEqual(self.lookup.find(_ip('10.2.0.1')), 1)
+        self.assertEqual(self.lookup.find(_ip('192.168.0.255')), 4)
+        self.assertEqual(self.lookup.find(_ip('2001:db8::1')), 5)
+
+    def test_find_ip_outside_networks(self):
+        self.assertIsNone(self.lookup.find(_ip('11.0.0.1')))
+        self.assertIsNone(self.lookup.find(_ip('192.168.1.1')))
+
+    def test_find_network(self):
+        _, min_ip, max_ip = _net(None, '10.1.0.0/17')
+        self.assertEqual(self.lookup.find(min_ip, max_ip), 2)
+
+    def test_find_network_exclude_itself(self):
+        pk, min_ip, max_ip = _net(2, '10.1.0.0/16')
+        self.assertEqual(self.lookup.find(min_ip, max_ip, exclude=pk), 1)
+
+    def test_len(self):
+        self.assertEqual(len(self.lookup), 5)
+
+
+@override_settings(USE_CACHE=True)
+class NetworkLookupCacheTest(TransactionTestCase):
+    def setUp(self):
+        self.net = Network.objects.create(name='net', address='10.0.0.0/16')
+
+    def test_get_lookup_is_reused(self):
+        lookup = network_lookup.get()
+        with self.assertNumQueries(0):
+            self.assertIs(network_lookup.get(), lookup)
+        self.assertEqual(lookup.find(_ip('10.0.0.1')), self.net.pk)
+
+    def test_get_lookup_after_network_change(self):
+        network_lookup.get()
+        subnet = Network.objects.create(name='subnet', address='10.0.1.0/24')
+        self.assertEqual(network_lookup.get().find(_ip('10.0.1.1')), subnet.pk)
+
+    def test_get_lookup_with_uncommitted_change(self):
+        network_lookup.get()
+        with transaction.atomic():
+            Network.objects.create(name='subnet', address='10.0.1.0/24')
+            self.assertIsNone(network_lookup.get())
+            transaction.set_rollback(True)
+        self.assertEqual(
+            network_lookup.get().find(_ip('10.0.1.1')), self.net.pk
+        )
+
+    def test_ip_network_from_lookup(self):
+        network_lookup.get()
+        ip = IPAddress(address='10.0.1.1')
+        with self.assertNumQueries(0):
+            self.assertEqual(ip.get_network_id(), self.net.pk)
+
+    def test_assign_network_to_ip(self):
+        ip = IPAddress.objects.create(address='10.0.1.1')
+        self.assertEqual(ip.network, self.net)
+        subnet = Network.objects.create(name='subnet', address='10.0.1.0/24')
+        ip.refresh_from_db()
+        self.assertEqual(ip.network, subnet)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    })
+    def test_get_lookup_without_shared_cache(self):
+        self.assertIsNone(network_lookup.get())
@@ -1,9 +1,11 @@
 from ipaddress import ip_address, ip_network
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from ddt import data, ddt, unpack
 from django.core.exceptions import ValidationError
 from django.db.models import F
+from django.db.models.signals import post_save
+from django.db.utils import IntegrityError
 from django.test import override_settings, RequestFactory
 
 from ralph.admin.helpers import CastToInteger
@@ -243,6 +245,98 @@ class NetworkTest(RalphTestCase):
             self.assertEqual(net.get_first_free_ip(), first_free)
             patcher.stop()
 
+    @unpack
+    @data(
+        ('192.168.1.0/29', 3, [], ['192.168.1.1', '192.168.1.2', '192.168.1.3']),  # noqa
+        ('192.168.1.0/29', 2, ['192.168.1.2'], ['192.168.1.3', '192.168.1.4']),  # noqa
+        ('192.168.1.0/29', 4, ['192.168.1.4'], []),
+        ('192.168.1.0/31', 1, [], []),
+    )
+    def test_get_free_ip_range(self, network_addr, count, used, expected):
+        net = Network.objects.create(
+            address=network_addr, reserved_from_beginning=0, reserved_from_end=0
+        )
+        for ip in used:
+            IPAddress.objects.create(address=ip, network=net)
+        self.assertEqual(
+            net.get_free_ip_range(count), [ip_address(ip) for ip in expected]
+        )
+
+    def test_get_free_ip_range_respect_DNSaaS(self):
+        net = Network.objects.create(
+            address='192.168.1.0/29',
+            reserved_from_beginning=0,
+            reserved_from_end=0,
+        )
+        with patch(
+            'ralph.networks.models.networks.is_in_dnsaas',
+            lambda ip: str(ip) == '192.168.1.2'
+        ):
+            self.assertEqual(
+                net.get_free_ip_range(2),
+                [ip_address('192.168.1.3'), ip_address('192.168.1.4')]
+            )
+
+    def test_issue_next_free_ips(self):
+        net = Network.objects.create(
+            name='net',
+            address='192.168.1.0/24',
+            reserved_from_beginning=0,
+            reserved_from_end=0,
+        )
+        subnet = Network.objects.create(
+            name='subnet', address='192.168.1.2/31'
+        )
+        IPAddress.objects.create(address='192.168.1.1')
+        # savepoint, lock, runs of used IPs (2), networks, insert, select,
+        # savepoint release
+        with self.assertNumQueries(8):
+            ips = net.issue_next_free_ips(3)
+        self.assertEqual(
+            [(ip.address, ip.network) for ip in ips],
+            [
+                ('192.168.1.2', subnet),
+                ('192.168.1.3', subnet),
+                ('192.168.1.4', net),
+            ]
+        )
+        self.assertTrue(all(ip.pk for ip in ips))
+
+    def test_issue_next_free_ips_not_enough_free_ips(self):
+        net = Network.objects.create(
+            address='192.168.1.0/30',
+            reserved_from_beginning=0,
+            reserved_from_end=0,
+        )
+        with self.assertRaises(ValidationError):
+            net.issue_next_free_ips(3)
+        self.assertFalse(IPAddress.objects.exists())
+
+    def test_issue_next_free_ips_retries_when_ip_taken(self):
+        net = Network.objects.create(
+            address='192.168.1.0/29',
+            reserved_from_beginning=0,
+            reserved_from_end=0,
+        )
+        create_free_ips = Network._create_free_ips
+        calls = []
+
+        def create_free_ips_with_race(network, count):
+            calls.append(count)
+            if len(calls) == 1:
+                # simulate IP created concurrently (without lock)
+                raise IntegrityError()
+            return create_free_ips(network, count)
+
+        with patch.object(
+            Network, '_create_free_ips', create_free_ips_with_race
+        ):
+            ips = net.issue_next_free_ips(2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            [ip.address for ip in ips], ['192.168.1.1', '192.168.1.2']
+        )
+
     def test_min_and_max_ip_are_assigned(self):
         net = Network.objects.create(
             name='net', address='1.0.0.0/16'
@@ -315,6 +409,82 @@ class NetworkTest(RalphTestCase):
         self.refresh_objects_from_db(ip, sub1, sub2)
         self.assertEqual(ip.network, sub1)
 
+    def _assert_networks_tree_is_valid(self):
+        for network in Network.objects.all():
+            self.assertEqual(
+                set(network.get_descendants()),
+                set(Network.objects.filter(
+                    min_ip__gte=network.min_ip, max_ip__lte=network.max_ip
+                ).exclude(pk=network.pk)),
+                network
+            )
+
+    def test_covering_network_should_update_tree(self):
+        net1 = Network.objects.create(name='net1', address='10.0.0.0/24')
+        Network.objects.create(name='net2', address='10.0.1.0/24')
+        Network.objects.create(name='net3', address='10.0.1.128/25')
+        Network.objects.create(name='other', address='10.1.0.0/24')
+        supernet = Network.objects.create(name='super', address='10.0.0.0/23')
+        self._assert_networks_tree_is_valid()
+        self.assertEqual(
+            set(supernet.get_children().values_list('name', flat=True)),
+            {'net1', 'net2'}
+        )
+        # resize network to cover another one
+        net1.address = '10.0.0.0/16'
+        net1.save()
+        self._assert_networks_tree_is_valid()
+        supernet.refresh_from_db()
+        self.assertEqual(supernet.parent, net1)
+        net1.delete()
+        self._assert_networks_tree_is_valid()
+        supernet.refresh_from_db()
+        self.assertIsNone(supernet.parent)
+
+    def test_covering_network_should_reassign_ips_in_constant_queries(self):
+        Network.objects.create(name='net1', address='10.0.0.0/24')
+        for address in ['10.0.0.1', '10.0.1.1', '10.0.1.2', '10.0.2.1']:
+            IPAddress.objects.create(address=address)
+        with patch('ralph.networks.models.networks.post_save.has_listeners',
+                   return_value=False):
+            with self.assertNumQueries(11):
+                supernet = Network.objects.create(
+                    name='super', address='10.0.0.0/23'
+                )
+        self.assertEqual(
+            dict(IPAddress.objects.values_list('address', 'network__name')),
+            {
+                '10.0.0.1': 'net1',
+                '10.0.1.1': 'super',
+                '10.0.1.2': 'super',
+                '10.0.2.1': None,
+            }
+        )
+        self.assertEqual(supernet.ips.count(), 2)
+
+    def test_shrinking_network_should_reassign_ips_to_parent(self):
+        parent = Network.objects.create(name='parent', address='10.0.0.0/23')
+        net = Network.objects.create(name='net', address='10.0.0.0/24')
+        ip = IPAddress.objects.create(address='10.0.0.200')
+        outside_ip = IPAddress.objects.create(address='10.0.0.1')
+        self.assertEqual(ip.network, net)
+        net.address = '10.0.0.0/25'
+        net.save()
+        self.refresh_objects_from_db(ip, outside_ip)
+        self.assertEqual(ip.network, parent)
+        self.assertEqual(outside_ip.network, net)
+
+    def test_covering_network_should_send_post_save_for_moved_ips(self):
+        ip = IPAddress.objects.create(address='10.0.1.1')
+        receiver = MagicMock()
+        post_save.connect(receiver, sender=IPAddress)
+        try:
+            Network.objects.create(name='super', address='10.0.0.0/23')
+        finally:
+            post_save.disconnect(receiver, sender=IPAddress)
+        self.assertEqual(receiver.call_count, 1)
+        self.assertEqual(receiver.call_args[1]['instance'].pk, ip.pk)
+
     def test_delete_network_shouldnt_delete_related_ip(self):
         net = Network.objects.create(
             name='net', address='192.169.58.0/24'
@@ -373,6 +543,57 @@ class NetworkEnvironmentTest(RalphTestCase):
             's1230000{}.dc.local'.format(len(hostname_model_factories))
         )
 
+    def test_issue_next_hostnames_skips_taken_in_batch(self):
+        for i in [1, 2, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14]:
+            DataCenterAssetFactory(hostname='s123{:05d}.dc.local'.format(i))
+        IPAddressFactory(hostname='s12300015.dc.local')
+        ne = NetworkEnvironmentFactory(
+            hostname_template_prefix='s123',
+            hostname_template_postfix='.dc.local',
+            hostname_template_counter_length=5,
+        )
+        # every window of candidates (1-10 and 11-30) is checked with single
+        # query per hostname model
+        with self.assertNumQueries(2 * len(ne.HOSTNAME_MODELS) + 8):
+            hostnames = ne.issue_next_free_hostnames(3)
+        self.assertEqual(hostnames, [
+            's12300003.dc.local', 's12300013.dc.local', 's12300016.dc.local'
+        ])
+        self.assertEqual(
+            AssetLastHostname.objects.get(
+                prefix='s123', postfix='.dc.local'
+            ).counter,
+            16
+        )
+        self.assertEqual(ne.next_free_hostname, 's12300017.dc.local')
+
+    def test_issue_next_hostnames_with_long_hole(self):
+        for i in range(1, 40):
+            VirtualServerFactory(hostname='s123{:05d}.dc.local'.format(i))
+        ne = NetworkEnvironmentFactory(
+            hostname_template_prefix='s123',
+            hostname_template_postfix='.dc.local',
+            hostname_template_counter_length=5,
+        )
+        self.assertEqual(ne.next_free_hostname, 's12300040.dc.local')
+        self.assertEqual(
+            ne.issue_next_free_hostnames(2),
+            ['s12300040.dc.local', 's12300041.dc.local']
+        )
+
+    def test_issue_next_hostnames_without_counter(self):
+        ne = NetworkEnvironmentFactory(
+            hostname_template_prefix='s123',
+            hostname_template_postfix='.dc.local',
+            hostname_template_counter_length=5,
+            use_hostname_counter=False,
+        )
+        DataCenterAssetFactory(hostname='s12300007.dc.local')
+        self.assertEqual(
+            ne.issue_next_free_hostnames(2),
+            ['s12300008.dc.local', 's12300009.dc.local']
+        )
+
     def test_issue_next_hostname_overflow(self):
         alhg = AssetLastHostname.objects.create(
             prefix='s123',
@@ -511,6 +732,15 @@ class IPAddressTest(RalphTestCase):
         self.ip.clean()
         self.ip.save()
 
+    @override_settings(CHECK_IP_HOSTNAME_ON_SAVE=True)
+    @patch('ralph.networks.models.networks.resolver')
+    def test_hostname_is_resolved_on_save(self, resolver_mock):
+        resolver_mock.resolve.return_value = 'resolved.local'
+        ip = IPAddress(address='10.20.30.40')
+        ip.save()
+        resolver_mock.resolve.assert_called_once_with('10.20.30.40')
+        self.assertEqual(ip.hostname, 'resolved.local')
+
     def test_clear_hostname_with_dhcp_exposition_should_not_pass(self):
         self.ip.dhcp_expose = True
         self.ip.save()
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+from django.test import SimpleTestCase
+
+from ralph.networks.tree import (
+    get_mptt_fields,
+    get_networks_for_numbers,
+    get_parents
+)
+
+Net = namedtuple('Net', ['pk', 'min_ip', 'max_ip'])
+
+
+class NetworksTreeTest(SimpleTestCase):
+    def setUp(self):
+        self.root = Net(1, 0, 255)
+        self.left = Net(2, 0, 127)
+        self.left_child = Net(3, 64, 127)
+        self.right = Net(4, 128, 191)
+        self.other_root = Net(5, 256, 511)
+        self.networks = [
+            self.other_root, self.right, self.left_child, self.root, self.left
+        ]
+
+    def test_get_parents(self):
+        self.assertEqual(get_parents(self.networks), {
+            1: None, 2: 1, 3: 2, 4: 1, 5: None,
+        })
+
+    def test_get_networks_for_numbers(self):
+        self.assertEqual(
+            get_networks_for_numbers(self.networks, [0, 64, 130, 200, 300]),
+            {
+                0: self.left,
+                64: self.left_child,
+                130: self.right,
+                200: self.root,
+                300: self.other_root,
+            }
+        )
+
+    def test_get_networks_for_numbers_outside_networks(self):
+        self.assertEqual(
+            get_networks_for_numbers([self.right], [0, 200]),
+            {0: None, 200: None}
+        )
+
+    def test_get_mptt_fields(self):
+        fields = get_mptt_fields(
+            self.networks, get_parents(self.networks), {1: 10, 5: 11}
+        )
+        self.assertEqual(fields, {
+            1: (10, 1, 8, 0),
+            2: (10, 2, 5, 1),
+            3: (10, 3, 4, 2),
+            4: (10, 6, 7, 1),
+            5: (11, 1, 2, 0),
+        })
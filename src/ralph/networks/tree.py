@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory computations on networks tree.
+
+Networks (CIDR ranges) are either nested or disjoint, so the parent of the
+network (or the network of IP address) is the smallest network containing
+it. Functions in this module compute parents and MPTT fields for a batch of
+networks with single sweep over networks sorted by (min_ip, -max_ip), instead
+of querying the database for each network (or IP) separately.
+
+Networks passed to these functions are any objects with `pk`, `min_ip` and
+`max_ip` attributes.
+"""
+from collections import defaultdict
+
+
+def _sort_key(network):
+    return (network.min_ip, -network.max_ip)
+
+
+def get_parents(networks):
+    """
+    Return dict with pk of the smallest network containing (another) network
+    for every network pk (None for top-level networks).
+    """
+    parents = {}
+    stack = []
+    for network in sorted(networks, key=_sort_key):
+        while stack and stack[-1].max_ip < network.max_ip:
+            stack.pop()
+        parents[network.pk] = stack[-1].pk if stack else None
+        stack.append(network)
+    return parents
+
+
+def get_networks_for_numbers(networks, numbers):
+    """
+    Return dict with the smallest network containing IP number for every
+    number from `numbers` (None if number does not belong to any network).
+    """
+    networks = sorted(networks, key=_sort_key)
+    result = {}
+    stack = []
+    idx = 0
+    for number in sorted(numbers):
+        while idx < len(networks) and networks[idx].min_ip <= number:
+            network = networks[idx]
+            while stack and stack[-1].max_ip < network.min_ip:
+                stack.pop()
+            stack.append(network)
+            idx += 1
+        while stack and stack[-1].max_ip < number:
+            stack.pop()
+        result[number] = stack[-1] if stack else None
+    return result
+
+
+def get_mptt_fields(networks, parents, tree_ids):
+    """
+    Compute MPTT fields for complete trees of networks.
+
+    Args:
+        networks: every network in rebuilt trees
+        parents: dict with parent pk for every network pk
+        tree_ids: dict with tree id for every root network pk
+
+    Returns:
+        dict with (tree_id, lft, rght, level) tuple for every network pk
+    """
+    children = defaultdict(list)
+    roots = []
+    for network in sorted(networks, key=_sort_key):
+        parent_pk = parents[network.pk]
+        if parent_pk is None:
+            roots.append(network)
+        else:
+            children[parent_pk].append(network)
+
+    fields = {}
+    for root in roots:
+        tree_id = tree_ids[root.pk]
+        counter = 1
+        lefts = {}
+        # iterative DFS - (network, level, visited) entries
+        stack = [(root, 0, False)]
+        while stack:
+            network, level, visited = stack.pop()
+            if visited:
+                fields[network.pk] = (
+                    tree_id, lefts[network.pk], counter, level
+                )
+                counter += 1
+                continue
+            lefts[network.pk] = counter
+            counter += 1
+            stack.append((network, level, True))
+            for child in reversed(children[network.pk]):
+                stack.append((child, level + 1, False))
+    return fields
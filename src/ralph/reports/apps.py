@@ -5,3 +5,8 @@ from ralph.apps import RalphAppConfig
 class ReportsConfig(RalphAppConfig):
     name = 'ralph.reports'
     verbose_name = 'Reports'
+
+    def ready(self):
+        super().ready()
+        from ralph.reports.rollups import connect_signals
+        connect_signals()
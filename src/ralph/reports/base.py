@@ -36,6 +36,7 @@ class ReportNode(object):
         return {
             'name': self.name,
             'count': self.count,
+            'uid': self.uid,
         }
 
     def __str__(self):
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ralph.reports.rollups import get_reports, get_variants, refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Refresh precomputed results (rollups) of reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help=(
+                'Refresh every variant (asset type, data center) of every '
+                'report (by default only variants requested so far are '
+                'refreshed)'
+            ),
+        )
+
+    def handle(self, **options):
+        if not settings.USE_CACHE:
+            raise CommandError('Rollups are not stored when USE_CACHE is off')
+        variants = None
+        if options['all']:
+            variants = [
+                (slug, asset_type, dc_id)
+                for slug in get_reports()
+                for asset_type, dc_id in get_variants(slug)
+            ]
+        refreshed = refresh_rollups(variants)
+        self.stdout.write('Rollups refreshed: {}'.format(refreshed))
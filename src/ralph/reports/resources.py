@@ -10,6 +10,7 @@ from ralph.data_center.models import (
     Orientation,
     RackOrientation
 )
+from ralph.data_importer.mixins import IPAddressesExportMixin
 
 
 class ChoiceWidget(Widget):
@@ -38,7 +39,7 @@ DATA_CENTER_ASSET_FIELDS = (
 )
 
 
-class DataCenterAssetTextResource(ModelResource):
+class DataCenterAssetTextResource(IPAddressesExportMixin, ModelResource):
     """
     DataCenterAsset resource with relations expressed in
     human friendly text form instead of database `id` field
@@ -98,15 +99,10 @@ class DataCenterAssetTextResource(ModelResource):
         export_order = DATA_CENTER_ASSET_FIELDS
 
     def _get_ip(self, dc_asset, is_management=True):
-        # Due to multiple model inheritance, `prefetch_related` for
-        # `ethernet_set` on DataCenterAsset does not work. For that reason,
-        # a separate query will be issued here to fetch related `ethernet_set`.
-        # To minimise the number of queries to the possible extent,
-        # `select_related` for `ipaddress` field is used here.
-        ethernet = dc_asset.ethernet_set.select_related('ipaddress').filter(
-            ipaddress__is_management=is_management
-        ).first()
-        return getattr(ethernet, 'ipaddress', None)
+        for ip in self.get_ip_addresses(dc_asset):
+            if ip.is_management == is_management:
+                return ip
+        return None
 
     def dehydrate_management_ip(self, dc_asset):
         return str(self._get_ip(dc_asset))
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Store of precomputed report results (rollups).
+
+Aggregations behind reports are run over the whole asset tables, so result of
+every report variant (report, asset type and data center) is kept in (shared)
+Django cache together with time of its computation and served (as HTML and
+CSV) from there. Rollups are marked as outdated after commit of every change
+of models used by reports (see `ROLLUP_SOURCE_MODELS` and
+`ROLLUP_SOURCE_M2M`) and then:
+
+* recomputed on the next request of report, or
+* (when REPORTS_ROLLUP_BACKGROUND_REFRESH is set) refreshed by single RQ job
+  in `ralph_reports` queue - till then the last rollup is served.
+
+Rollups which were requested could be also refreshed periodically by
+`refresh_report_rollups` management command.
+"""
+import logging
+from collections import namedtuple
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from ralph.lib.external_services.base import InternalService
+from ralph.signals import post_commit
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'ralph.reports.rollups.version'
+INDEX_CACHE_KEY = 'ralph.reports.rollups.index'
+REFRESH_PENDING_CACHE_KEY = 'ralph.reports.rollups.refresh_pending'
+# max time (in seconds) of serving outdated rollups while waiting for
+# background refresh
+REFRESH_PENDING_TIMEOUT = 3600
+REFRESH_ROLLUPS_SERVICE = 'REPORTS_ROLLUP_REFRESH'
+ROLLUP_SOURCE_MODELS = [
+    'accounts.RalphUser',
+    'accounts.Region',
+    'assets.AssetHolder',
+    'assets.AssetModel',
+    'assets.Category',
+    'assets.Environment',
+    'assets.Manufacturer',
+    'assets.Service',
+    'assets.ServiceEnvironment',
+    'attachments.Attachment',
+    'attachments.AttachmentItem',
+    'back_office.BackOfficeAsset',
+    'back_office.OfficeInfrastructure',
+    'back_office.Warehouse',
+    'data_center.DataCenter',
+    'data_center.DataCenterAsset',
+    'data_center.Rack',
+    'data_center.ServerRoom',
+    'licences.BaseObjectLicence',
+    'licences.Licence',
+    'licences.LicenceUser',
+    'licences.Software',
+    'operations.Failure',
+    'operations.OperationType',
+    'supports.BaseObjectsSupport',
+    'supports.Support',
+    'taggit.Tag',
+]
+# (model, m2m field) pairs - changes of their relations are sent only as
+# m2m_changed signal (with `through` model as a sender)
+ROLLUP_SOURCE_M2M = [
+    # assets attached to (or detached from) failures
+    ('operations.Failure', 'base_objects'),
+    # tags of assets
+    ('assets.BaseObject', 'tags'),
+]
+
+Rollup = namedtuple('Rollup', ['data', 'computed_at', 'version'])
+
+
+def get_rollups_version():
+    """
+    Return current version of reports data (None if it could not be stored
+    in cache).
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def get_reports():
+    """
+    Return dict with report class for every report slug (url name).
+    """
+    from ralph.reports.urls import urlpatterns
+    return {
+        pattern.name: pattern.callback.view_class for pattern in urlpatterns
+    }
+
+
+def get_variants(slug):
+    """
+    Return every (asset type, data center id) variant of report `slug`.
+    """
+    from ralph.data_center.models.physical import DataCenter
+    report = get_reports()[slug]()
+    variants = []
+    for mode in report.modes:
+        variants.append((mode['name'], None))
+        if report.with_datacenters and mode['name'] == 'dc':
+            variants.extend(
+                (mode['name'], dc_id)
+                for dc_id in DataCenter.objects.values_list('id', flat=True)
+            )
+    return variants
+
+
+def _get_key(slug, asset_type, dc_id):
+    return 'ralph.reports.rollups.{}:{}:{}'.format(
+        slug, asset_type, dc_id or 'all'
+    )
+
+
+def _register_variant(slug, asset_type, dc_id):
+    index = cache.get(INDEX_CACHE_KEY) or set()
+    if (slug, asset_type, dc_id) not in index:
+        index.add((slug, asset_type, dc_id))
+        cache.set(INDEX_CACHE_KEY, index, None)
+
+
+def compute_rollup(slug, asset_type, dc_id=None):
+    """
+    Compute report `slug` for `asset_type` and data center and store it as
+    rollup.
+    """
+    from ralph.data_center.models.physical import DataCenter
+    report = get_reports()[slug]()
+    dc = DataCenter.objects.filter(pk=dc_id).first() if dc_id else None
+    # version is fetched before computing, so changes made in the meantime
+    # make this rollup outdated
+    version = get_rollups_version() if settings.USE_CACHE else None
+    rollup = Rollup(
+        data=report.compute(report.get_model(asset_type), dc),
+        computed_at=timezone.now(),
+        version=version,
+    )
+    if version is not None:
+        cache.set(
+            _get_key(slug, asset_type, dc_id), rollup,
+            settings.REPORTS_ROLLUP_TIMEOUT
+        )
+        _register_variant(slug, asset_type, dc_id)
+        logger.debug(
+            'Rollup of report %s (%s, %s) stored', slug, asset_type, dc_id
+        )
+    return rollup
+
+
+def get_rollup(slug, asset_type, dc_id=None, compute=True):
+    """
+    Return rollup of report `slug` for `asset_type` and data center.
+
+    Outdated rollup is returned only when its background refresh is pending.
+    Otherwise rollup is computed (or None is returned, if `compute` is not
+    set).
+    """
+    if settings.USE_CACHE:
+        rollup = cache.get(_get_key(slug, asset_type, dc_id))
+        if rollup is not None and (
+            rollup.version == get_rollups_version() or
+            cache.get(REFRESH_PENDING_CACHE_KEY)
+        ):
+            return rollup
+    if not compute:
+        return None
+    return compute_rollup(slug, asset_type, dc_id)
+
+
+def refresh_rollups(variants=None):
+    """
+    Recompute rollups of every report variant (`(slug, asset_type, dc_id)`
+    tuple) from `variants` (by default of every one requested so far).
+
+    Returns:
+        number of refreshed rollups
+    """
+    # changes committed from now on schedule another refresh
+    cache.delete(REFRESH_PENDING_CACHE_KEY)
+    if variants is None:
+        variants = cache.get(INDEX_CACHE_KEY) or set()
+    reports = get_reports()
+    refreshed = 0
+    for slug, asset_type, dc_id in sorted(variants, key=str):
+        if slug not in reports:
+            continue
+        # single failing report shouldn't stop refreshing the others
+        try:
+            compute_rollup(slug, asset_type, dc_id)
+        except Exception:
+            logger.exception(
+                'Refreshing rollup of report %s (%s, %s) failed',
+                slug, asset_type, dc_id
+            )
+        else:
+            refreshed += 1
+    return refreshed
+
+
+def invalidate_rollups(instance=None):
+    """
+    Change version of reports data (making every rollup outdated) and
+    schedule background refresh of rollups (if it's turned on and it's not
+    already pending).
+    """
+    cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+    if not (settings.USE_CACHE and settings.REPORTS_ROLLUP_BACKGROUND_REFRESH):
+        return
+    if cache.add(REFRESH_PENDING_CACHE_KEY, True, REFRESH_PENDING_TIMEOUT):
+        InternalService(REFRESH_ROLLUPS_SERVICE).run_async()
+
+
+def connect_signals():
+    """
+    Make rollups outdated after every committed change of report sources.
+    """
+    for model in ROLLUP_SOURCE_MODELS:
+        for signal in (post_save, post_delete):
+            post_commit(invalidate_rollups, model, signal, single_call=False)
+    for model, field_name in ROLLUP_SOURCE_M2M:
+        field = apps.get_model(model)._meta.get_field(field_name)
+        post_commit(
+            invalidate_rollups, field.remote_field.through, m2m_changed,
+            single_call=False
+        )
@@ -63,7 +63,7 @@ class TestEmailReports(RalphTestCase):
         self.assertEqual(expected_headers, lines[0])
         self.assertEqual(expected_line, lines[1])
 
-    def test_queries_number(self):
+    def _create_assets(self):
         for _ in range(0, 10):
             rack = RackFactory()
             for position in range(1, 6):
@@ -82,5 +82,19 @@ class TestEmailReports(RalphTestCase):
                     base_object=asset, is_management=True,
                     ethernet=ethernets[1]
                 )
-        with self.assertNumQueries(103):
+
+    def test_queries_number(self):
+        self._create_assets()
+        # assets and IP addresses of all of them
+        with self.assertNumQueries(2):
             DataCenterAssetTextResource().export()
+
+    def test_queries_number_in_chunks(self):
+        self._create_assets()
+        resource = DataCenterAssetTextResource()
+        resource.export_chunk_size = 20
+        # 51 assets in 3 chunks
+        with self.assertNumQueries(6):
+            dataset = resource.export()
+        self.assertEqual(len(dataset), 51)
+        self.assertNotIn('None', dataset['management_ip'])
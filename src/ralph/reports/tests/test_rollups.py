@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings, TransactionTestCase
+from django.urls import reverse
+from taggit.models import Tag
+
+from ralph.accounts.tests.factories import UserFactory
+from ralph.assets.models.choices import ObjectModelType
+from ralph.assets.tests.factories import (
+    CategoryFactory,
+    DataCenterAssetModelFactory
+)
+from ralph.data_center.tests.factories import DataCenterAssetFactory
+from ralph.reports import rollups
+from ralph.tests import RalphTestCase
+from ralph.tests.mixins import ClientMixin
+
+
+@override_settings(USE_CACHE=True)
+class ReportRollupsTest(ClientMixin, RalphTestCase):
+    def setUp(self):
+        cache.clear()
+        self.login_as_user()
+        self.model = DataCenterAssetModelFactory(
+            category=CategoryFactory(name='Keyboard'),
+            type=ObjectModelType.data_center,
+            name='Keyboard1',
+        )
+        DataCenterAssetFactory.create_batch(2, model=self.model)
+
+    def _get_count(self, rollup):
+        return rollup.data[0]['count']
+
+    def test_report_is_served_from_rollup(self):
+        url = reverse('category_model_report') + '?asset_type=dc'
+        self.client.get(url)
+        self.assertEqual(self._get_count(rollups.get_rollup(
+            'category_model_report', 'dc'
+        )), 2)
+        DataCenterAssetFactory(model=self.model)
+        response = self.client.get(url)
+        self.assertEqual(response.context['result'][0]['count'], 2)
+        self.assertIsNotNone(response.context['computed_at'])
+
+    def test_outdated_rollup_is_recomputed(self):
+        rollups.get_rollup('category_model_report', 'dc')
+        DataCenterAssetFactory(model=self.model)
+        rollups.invalidate_rollups()
+        self.assertEqual(self._get_count(rollups.get_rollup(
+            'category_model_report', 'dc'
+        )), 3)
+
+    def test_csv_is_served_from_rollup(self):
+        url = reverse('asset-relations') + '?asset_type=dc&csv=1'
+        self.client.get(url)
+        DataCenterAssetFactory(model=self.model)
+        response = self.client.get(url)
+        self.assertEqual(len(response.content.decode().splitlines()), 3)
+        self.assertIn('Last-Modified', response)
+
+    def test_relations_page_does_not_compute_rollup(self):
+        self.client.get(reverse('asset-relations') + '?asset_type=dc')
+        self.assertIsNone(
+            rollups.get_rollup('asset-relations', 'dc', compute=False)
+        )
+
+    @override_settings(REPORTS_ROLLUP_BACKGROUND_REFRESH=True)
+    @patch('ralph.reports.rollups.InternalService')
+    def test_background_refresh(self, service_mock):
+        rollups.get_rollup('category_model_report', 'dc')
+        DataCenterAssetFactory(model=self.model)
+        rollups.invalidate_rollups()
+        rollups.invalidate_rollups()
+        # single refresh is scheduled and outdated rollup is served till then
+        service_mock.return_value.run_async.assert_called_once_with()
+        self.assertEqual(self._get_count(rollups.get_rollup(
+            'category_model_report', 'dc'
+        )), 2)
+        self.assertEqual(rollups.refresh_rollups(), 1)
+        self.assertEqual(self._get_count(rollups.get_rollup(
+            'category_model_report', 'dc', compute=False
+        )), 3)
+
+    def test_refresh_all_rollups(self):
+        out = StringIO()
+        call_command('refresh_report_rollups', '--all', stdout=out)
+        self.assertIn('Rollups refreshed', out.getvalue())
+        self.assertEqual(self._get_count(rollups.get_rollup(
+            'category_model_report', 'dc', compute=False
+        )), 2)
+
+
+@override_settings(USE_CACHE=True)
+class ReportRollupsInvalidationTest(ClientMixin, TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.login_as_user()
+        self.asset = DataCenterAssetFactory()
+
+    def _get_csv(self):
+        return self.client.get(
+            reverse('asset-relations') + '?asset_type=dc&csv=1'
+        ).content.decode()
+
+    def test_rollup_is_outdated_after_user_change(self):
+        version = rollups.get_rollups_version()
+        user = UserFactory()
+        user.first_name = 'Test'
+        user.save()
+        self.assertNotEqual(rollups.get_rollups_version(), version)
+
+    def test_relations_csv_is_refreshed_after_tags_change(self):
+        tag = Tag.objects.create(name='abc')
+        self.assertNotIn('abc', self._get_csv())
+        self.asset.tags.add(tag)
+        self.assertIn('abc', self._get_csv())
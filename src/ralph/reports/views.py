@@ -8,6 +8,7 @@ from django.db.models import Count, Prefetch
 from django.http import HttpResponse
 from django.urls import reverse
 from django.utils.encoding import smart_str
+from django.utils.http import http_date
 from django.utils.translation import ugettext_lazy as _
 
 from ralph.admin.helpers import getattr_dunder
@@ -18,6 +19,7 @@ from ralph.back_office.models import BackOfficeAsset
 from ralph.data_center.models.physical import DataCenter, DataCenterAsset
 from ralph.licences.models import BaseObjectLicence, Licence, LicenceUser
 from ralph.operations.models import Failure, OperationType
+from ralph.reports import rollups
 from ralph.reports.base import ReportContainer
 from ralph.supports.models import BaseObjectsSupport
 
@@ -70,6 +72,8 @@ class ReportDetail(RalphTemplateView):
     with_datacenters = False
     with_counter = True
     links = False
+    # compute (not yet stored) rollup of report when its page is displayed
+    rollup_in_html = True
     modes = [
         {
             'name': 'all',
@@ -101,6 +105,19 @@ class ReportDetail(RalphTemplateView):
     def prepare(self, model, dc):
         raise NotImplemented()
 
+    def compute(self, model, dc=None):
+        """
+        Return result of report stored in rollup.
+        """
+        self.execute(model, dc)
+        return self.report.to_dict()
+
+    def get_rollup(self, compute=True):
+        return rollups.get_rollup(
+            self.slug, self.asset_type, self.dc.id if self.dc else None,
+            compute=compute
+        )
+
     def is_async(self, request):
         return False
 
@@ -134,9 +151,6 @@ class ReportDetail(RalphTemplateView):
     def get_template_names(self, *args, **kwargs):
         return [self.template_name]
 
-    def get_result(self, request, model, *args, **kwargs):
-        return list(self.prepare(model, *args, **kwargs))
-
     def dispatch(self, request, *args, **kwargs):
         try:
             self.dc = DataCenter.objects.get(
@@ -150,13 +164,12 @@ class ReportDetail(RalphTemplateView):
 
     def get_context_data(self, **kwargs):
         context_data = super().get_context_data(**kwargs)
+        rollup = self.get_rollup(compute=self.rollup_in_html)
         context_data.update({
             'report': self,
             'subsection': self.name,
-            'result': self.execute(
-                self.get_model(self.asset_type),
-                self.dc,
-            ),
+            'result': rollup.data if rollup else [],
+            'computed_at': rollup.computed_at if rollup else None,
             'cache_key': (
                 self.asset_type +
                 (str(self.dc.id) if self.dc else 'all') +
@@ -172,8 +185,12 @@ class ReportDetail(RalphTemplateView):
 
     def get(self, request, *args, **kwargs):
         if request.GET.get('csv'):
-            model = self.get_model(self.asset_type)
-            return self.get_response(request, self.get_result(request, model))
+            rollup = self.get_rollup()
+            response = self.get_response(request, rollup.data)
+            response['Last-Modified'] = http_date(
+                rollup.computed_at.timestamp()
+            )
+            return response
         return super().get(request, *args, **kwargs)
 
 
@@ -313,6 +330,10 @@ class BaseRelationsReport(
     template_name = 'reports/report_relations.html'
     with_modes = True
     links = False
+    rollup_in_html = False
+
+    def compute(self, model, dc=None):
+        return list(self.prepare(model, dc=dc))
 
 
 class AssetRelationsReport(BaseRelationsReport):
@@ -3,10 +3,16 @@ from collections import OrderedDict
 
 import django_filters
 from django.db import transaction
-from rest_framework import serializers
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions, serializers, status
+from rest_framework.decorators import list_route
+from rest_framework.response import Response
 
 from ralph.api import RalphAPISerializer, RalphAPIViewSet, router
+from ralph.api.fields import ReversedChoiceField
 from ralph.api.serializers import RalphAPISaveSerializer
+from ralph.helpers import bulk_update
 from ralph.networks.models.networks import IPAddress
 from ralph.security.models import any_exceeded, SecurityScan, Vulnerability
 
@@ -87,6 +93,30 @@ class SaveSecurityScanSerializer(RalphAPISaveSerializer):
         return result
 
 
+class UpsertSecurityScanSerializer(serializers.ModelSerializer):
+    """
+    Validates single scan of upsert (hosts and vulnerabilities are resolved
+    for all scans at once, see `SecurityScanViewSet._upsert`).
+    """
+    serializer_choice_field = ReversedChoiceField
+
+    host_ip = serializers.CharField()
+    vulnerabilities = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    external_vulnerabilities = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+    class Meta:
+        model = SecurityScan
+        fields = (
+            'last_scan_date', 'scan_status', 'next_scan_date', 'details_url',
+            'rescan_url', 'host_ip', 'vulnerabilities',
+            'external_vulnerabilities',
+        )
+
+
 class IPFilter(django_filters.FilterSet):
     ip = django_filters.CharFilter(
         name='base_object__ethernet_set__ipaddress__address'
@@ -98,12 +128,23 @@ class IPFilter(django_filters.FilterSet):
 
 
 class SecurityScanViewSet(RalphAPIViewSet):
+    """
+    Besides regular create (which replaces existing scan of the host), scans
+    could be upserted (`upsert/` for single scan, `bulk/` for list of scans
+    of many hosts) - existing scan of the host is updated in place and only
+    added and removed vulnerabilities are saved.
+    """
     queryset = SecurityScan.objects.all()
     serializer_class = SecurityScanSerializer
     save_serializer_class = SaveSecurityScanSerializer
 
     additional_filter_class = IPFilter
     prefetch_related = ("tags", "vulnerabilities__tags")
+    bulk_max_size = 5000
+    upsert_fields = [
+        'last_scan_date', 'scan_status', 'next_scan_date', 'details_url',
+        'rescan_url',
+    ]
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -116,6 +157,180 @@ class SecurityScanViewSet(RalphAPIViewSet):
             SecurityScan.objects.filter(base_object=ip.base_object.id).delete()
         return super().create(request, *args, **kwargs)
 
+    @list_route(methods=['post'], url_path='upsert')
+    def upsert(self, request, *args, **kwargs):
+        """Create or update scan of single host."""
+        created, updated, errors = self._upsert([request.data])
+        if errors:
+            return Response(errors[0], status=status.HTTP_400_BAD_REQUEST)
+        scan = self.get_queryset().get(pk=(created + updated)[0])
+        return Response(
+            self.get_serializer(scan).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @list_route(methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create or update scans of many hosts. When any scan is invalid,
+        nothing is saved and errors are returned as a list (in the same
+        order as scans in the payload).
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise exceptions.ValidationError(
+                _('Expected non-empty list of objects.')
+            )
+        if len(items) > self.bulk_max_size:
+            raise exceptions.ValidationError(
+                _('Too many objects (max %(max)s).') % {
+                    'max': self.bulk_max_size
+                }
+            )
+        created, updated, errors = self._upsert(items)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': len(created), 'updated': len(updated)})
+
+    def _validate_upsert(self, items):
+        """
+        Validate scans and resolve their hosts and vulnerabilities (using
+        single query for all scans). Return list of (base object id, scan
+        data, vulnerabilities ids) and list of errors.
+        """
+        validated = []
+        errors = []
+        for item in items:
+            serializer = UpsertSecurityScanSerializer(data=item)
+            if serializer.is_valid():
+                validated.append(serializer.validated_data)
+                errors.append({})
+            else:
+                validated.append(None)
+                errors.append(serializer.errors)
+        valid = [data for data in validated if data]
+        base_objects = dict(IPAddress.objects.filter(
+            address__in={data['host_ip'] for data in valid},
+            ethernet__base_object__isnull=False,
+        ).values_list('address', 'ethernet__base_object'))
+        external_ids = dict(Vulnerability.objects.filter(
+            external_vulnerability_id__in={
+                external_id for data in valid
+                for external_id in data['external_vulnerabilities']
+            }
+        ).values_list('external_vulnerability_id', 'id'))
+        vulnerabilities_ids = set(Vulnerability.objects.filter(
+            id__in={
+                vulnerability_id for data in valid
+                for vulnerability_id in data['vulnerabilities']
+            }
+        ).values_list('id', flat=True))
+
+        result = []
+        for data, item_errors in zip(validated, errors):
+            if data is None:
+                continue
+            if data['host_ip'] not in base_objects:
+                item_errors['host_ip'] = 'IP is not assigned to any host'
+            unknown = [
+                str(external_id)
+                for external_id in data['external_vulnerabilities']
+                if external_id not in external_ids
+            ]
+            if unknown:
+                item_errors['external_vulnerability'] = (
+                    'Unknow external_vulnerabilities: {}'.format(
+                        ', '.join(unknown)
+                    )
+                )
+            unknown = [
+                str(vulnerability_id)
+                for vulnerability_id in data['vulnerabilities']
+                if vulnerability_id not in vulnerabilities_ids
+            ]
+            if unknown:
+                item_errors['vulnerabilities'] = (
+                    'Unknown vulnerabilities: {}'.format(', '.join(unknown))
+                )
+            if item_errors:
+                continue
+            result.append((
+                base_objects[data['host_ip']],
+                {field: data[field] for field in self.upsert_fields},
+                set(data['vulnerabilities']) | {
+                    external_ids[external_id]
+                    for external_id in data['external_vulnerabilities']
+                }
+            ))
+        return result, errors if any(errors) else []
+
+    @transaction.atomic
+    def _upsert(self, items):
+        """
+        Create new or update existing scans (of hosts from `items`). Return
+        ids of created scans, ids of updated scans and errors.
+        """
+        scans, errors = self._validate_upsert(items)
+        if errors:
+            return [], [], errors
+        # the last scan wins when host is sent multiple times
+        scans = {
+            base_object_id: (data, vulnerabilities)
+            for base_object_id, data, vulnerabilities in scans
+        }
+        existing = dict(SecurityScan.objects.filter(
+            base_object_id__in=scans
+        ).values_list('base_object_id', 'id'))
+
+        SecurityScan.objects.bulk_create([
+            SecurityScan(base_object_id=base_object_id, **data)
+            for base_object_id, (data, vulnerabilities) in scans.items()
+            if base_object_id not in existing
+        ])
+        now = timezone.now()
+        bulk_update(SecurityScan.objects.all(), {
+            existing[base_object_id]: dict(data, modified=now)
+            for base_object_id, (data, vulnerabilities) in scans.items()
+            if base_object_id in existing
+        })
+        # ids of new scans are not returned by bulk_create (for every db)
+        scans_ids = dict(SecurityScan.objects.filter(
+            base_object_id__in=scans
+        ).values_list('base_object_id', 'id'))
+        self._update_vulnerabilities({
+            scans_ids[base_object_id]: vulnerabilities
+            for base_object_id, (data, vulnerabilities) in scans.items()
+        })
+        SecurityScan.update_is_patched_in_bulk(list(scans_ids.values()))
+        created = [
+            scan_id for base_object_id, scan_id in scans_ids.items()
+            if base_object_id not in existing
+        ]
+        return created, list(existing.values()), []
+
+    def _update_vulnerabilities(self, vulnerabilities):
+        """
+        Apply only added and removed vulnerabilities of scans
+        (`vulnerabilities` is a dict with set of vulnerabilities ids by scan
+        id).
+        """
+        through = SecurityScan.vulnerabilities.through
+        to_remove = []
+        current = {scan_id: set() for scan_id in vulnerabilities}
+        for pk, scan_id, vulnerability_id in through.objects.filter(
+            securityscan_id__in=vulnerabilities
+        ).values_list('pk', 'securityscan_id', 'vulnerability_id'):
+            current[scan_id].add(vulnerability_id)
+            if vulnerability_id not in vulnerabilities[scan_id]:
+                to_remove.append(pk)
+        if to_remove:
+            through.objects.filter(pk__in=to_remove).delete()
+        through.objects.bulk_create([
+            through(securityscan_id=scan_id, vulnerability_id=vulnerability_id)
+            for scan_id, scan_vulnerabilities in vulnerabilities.items()
+            for vulnerability_id in scan_vulnerabilities - current[scan_id]
+        ])
+
 
 router.register(r'vulnerabilities', VulnerabilityViewSet)
 router.register(r'security-scans', SecurityScanViewSet)
@@ -106,6 +106,20 @@ class SecurityScan(
         """Updates `is_patched` field depending on vulnerabilities"""
         self.is_patched = not any_exceeded(self.vulnerabilities.all())
 
+    @classmethod
+    def update_is_patched_in_bulk(cls, scans_ids):
+        """
+        Updates `is_patched` field of scans with `scans_ids` (using SQL
+        queries, without fetching scans or their vulnerabilities).
+        """
+        not_patched_ids = cls.vulnerabilities.through.objects.filter(
+            securityscan_id__in=scans_ids,
+            vulnerability__patch_deadline__lt=datetime.now(),
+        ).values('securityscan_id')
+        scans = cls.objects.filter(id__in=scans_ids)
+        scans.filter(id__in=not_patched_ids).update(is_patched=False)
+        scans.exclude(id__in=not_patched_ids).update(is_patched=True)
+
     def __str__(self):
         return "{} {} ({})".format(
             self.last_scan_date.strftime('%Y-%m-%d'),
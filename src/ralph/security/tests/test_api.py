@@ -227,6 +227,112 @@ class SecurityScanAPITests(RalphAPITestCase):
         )
 
 
+class SecurityScanUpsertAPITests(RalphAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ip = IPAddressFactory(address="192.168.128.66")
+        self.kept = VulnerabilityFactory()
+        self.removed = VulnerabilityFactory()
+        self.scan = SecurityScanFactory(
+            base_object=self.ip.base_object,
+            vulnerabilities=[self.kept, self.removed],
+        )
+
+    def _get_data(self, ip, vulnerabilities):
+        return {
+            'last_scan_date': '2017-01-01T00:00:00',
+            'scan_status': ScanStatus.fail.name,
+            'next_scan_date': '2017-02-01T00:00:00',
+            'details_url': 'https://example.com/scan-details',
+            'rescan_url': 'https://example.com/rescan-url',
+            'host_ip': ip.address,
+            'vulnerabilities': [v.id for v in vulnerabilities],
+        }
+
+    def test_upsert_updates_existing_scan_in_place(self):
+        kept_link = SecurityScan.vulnerabilities.through.objects.get(
+            securityscan=self.scan, vulnerability=self.kept
+        )
+        exceeded = VulnerabilityFactory(
+            patch_deadline=datetime.now() - timedelta(days=10)
+        )
+        response = self.client.post(
+            reverse('securityscan-upsert'),
+            self._get_data(self.ip, [self.kept, exceeded]),
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.scan.id)
+        self.scan.refresh_from_db()
+        self.assertEqual(self.scan.scan_status, ScanStatus.fail)
+        self.assertEqual(
+            self.scan.last_scan_date, datetime(2017, 1, 1)
+        )
+        self.assertEqual(
+            set(self.scan.vulnerabilities.all()), {self.kept, exceeded}
+        )
+        # link to vulnerability which is still there is not recreated
+        self.assertTrue(
+            SecurityScan.vulnerabilities.through.objects.filter(
+                pk=kept_link.pk
+            ).exists()
+        )
+        self.assertFalse(self.scan.is_patched)
+
+    def test_upsert_creates_new_scan(self):
+        ip = IPAddressFactory(address="192.168.128.67")
+        response = self.client.post(
+            reverse('securityscan-upsert'),
+            self._get_data(ip, [self.kept]),
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        scan = SecurityScan.objects.get(base_object=ip.base_object)
+        self.assertEqual(scan.vulnerabilities.get(), self.kept)
+        self.assertTrue(scan.is_patched)
+
+    def test_bulk_upsert(self):
+        ip = IPAddressFactory(address="192.168.128.67")
+        response = self.client.post(
+            reverse('securityscan-bulk'),
+            [
+                self._get_data(self.ip, []),
+                self._get_data(ip, [self.kept, self.removed]),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'created': 1, 'updated': 1})
+        self.assertFalse(
+            SecurityScan.objects.get(pk=self.scan.pk).vulnerabilities.exists()
+        )
+        self.assertEqual(
+            SecurityScan.objects.get(
+                base_object=ip.base_object
+            ).vulnerabilities.count(),
+            2
+        )
+
+    def test_bulk_upsert_with_unknown_ip_saves_nothing(self):
+        response = self.client.post(
+            reverse('securityscan-bulk'),
+            [
+                self._get_data(self.ip, []),
+                dict(self._get_data(self.ip, []), host_ip='10.20.30.40'),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('host_ip', response.data[1])
+        self.assertEqual(self.scan.vulnerabilities.count(), 2)
+
+
 class VulnerabilityAPITests(RalphAPITestCase):
 
     def setUp(self):
@@ -219,6 +219,10 @@ FILE_UPLOAD_PERMISSIONS = 0o644
 DEFAULT_DEPRECIATION_RATE = int(os.environ.get('DEFAULT_DEPRECIATION_RATE', 25))  # noqa
 DEFAULT_LICENCE_DEPRECIATION_RATE = int(os.environ.get('DEFAULT_LICENCE_DEPRECIATION_RATE', 50))  # noqa
 CHECK_IP_HOSTNAME_ON_SAVE = bool_from_env('CHECK_IP_HOSTNAME_ON_SAVE', True)
+# reverse DNS lookups (see `ralph.lib.network.resolver`)
+DNS_RESOLVER_MAX_WORKERS = int(os.environ.get('DNS_RESOLVER_MAX_WORKERS', 20))
+DNS_RESOLVER_TIMEOUT = float(os.environ.get('DNS_RESOLVER_TIMEOUT', 2.0))
+DNS_RESOLVER_CACHE_TTL = int(os.environ.get('DNS_RESOLVER_CACHE_TTL', 3600))
 ASSET_HOSTNAME_TEMPLATE = {
     'prefix': '{{ country_code|upper }}{{ code|upper }}',
     'postfix': '',
@@ -402,6 +406,12 @@ RALPH_QUEUES = {
     'ralph_async_transitions': {
         'DEFAULT_TIMEOUT': 3600,
     },
+    'ralph_async_export': {
+        'DEFAULT_TIMEOUT': 3600,
+    },
+    'ralph_reports': {
+        'DEFAULT_TIMEOUT': 3600,
+    },
 }
 for queue_name, options in RALPH_QUEUES.items():
     RQ_QUEUES[queue_name] = ChainMap(RQ_QUEUES['default'], options)
@@ -411,6 +421,8 @@ RALPH_EXTERNAL_SERVICES = {
     'PDF': {
         'queue_name': 'ralph_ext_pdf',
         'method': 'inkpy_jinja.pdf',
+        # max time (in seconds) of waiting for all documents of a report
+        'timeout': int(os.environ.get('PDF_SERVICE_TIMEOUT', 300)),
     },
 }
 
@@ -418,9 +430,30 @@ RALPH_INTERNAL_SERVICES = {
     'ASYNC_TRANSITIONS': {
         'queue_name': 'ralph_async_transitions',
         'method': 'ralph.lib.transitions.async.run_async_transition'
-    }
+    },
+    'ASYNC_EXPORT': {
+        'queue_name': 'ralph_async_export',
+        'method': 'ralph.admin.export.run_async_export'
+    },
+    'REPORTS_ROLLUP_REFRESH': {
+        'queue_name': 'ralph_reports',
+        'method': 'ralph.reports.rollups.refresh_rollups'
+    },
 }
 
+# run export of admin changelist in background (and save exported file as an
+# attachment) when there is more objects to export (0 to always stream it)
+ASYNC_EXPORT_THRESHOLD = int(os.environ.get('ASYNC_EXPORT_THRESHOLD', 0))
+
+# results of reports (rollups) are kept in cache till the next change of
+# assets (but no longer than timeout, in seconds)
+REPORTS_ROLLUP_TIMEOUT = int(os.environ.get('REPORTS_ROLLUP_TIMEOUT', 86400))
+# when set to True, outdated rollups are refreshed in background
+# (`ralph_reports` RQ queue) instead of on the next request of report
+REPORTS_ROLLUP_BACKGROUND_REFRESH = bool_from_env(
+    'REPORTS_ROLLUP_BACKGROUND_REFRESH', False
+)
+
 # =============================================================================
 # DC view
 # =============================================================================
@@ -537,6 +570,20 @@ DEFAULT_NETWORK_MARGIN = int(os.environ.get('DEFAULT_NETWORK_MARGIN', 10))
 # when set to True, network records (IP/Ethernet) can't be modified until
 # 'expose in DHCP' is selected
 DHCP_ENTRY_FORBID_CHANGE = bool_from_env('DHCP_ENTRY_FORBID_CHANGE', True)
+# rendered DHCP configs are cached (shared by every DHCP server) till the next
+# change of DHCP data (but no longer than timeout, in seconds)
+DHCP_CONFIG_SNAPSHOT_TIMEOUT = int(
+    os.environ.get('DHCP_CONFIG_SNAPSHOT_TIMEOUT', 3600)
+)
+DHCP_CONFIG_SNAPSHOT_COMPRESS = bool_from_env(
+    'DHCP_CONFIG_SNAPSHOT_COMPRESS', True
+)
+# render DHCP entries config in chunks and stream it to the client (instead of
+# rendering the whole config in memory)
+DHCP_ENTRIES_STREAMING = bool_from_env('DHCP_ENTRIES_STREAMING', False)
+DHCP_ENTRIES_STREAMING_CHUNK_SIZE = int(
+    os.environ.get('DHCP_ENTRIES_STREAMING_CHUNK_SIZE', 1000)
+)
 
 # disable integration with DNSaaS as it's no longer supported
 # https://github.com/allegro/django-powerdns-dnssec
@@ -46,6 +46,8 @@ URLCONF_MODULES = ['ralph.urls.base', ROOT_URLCONF]
 
 RQ_QUEUES['ralph_job_test'] = dict(ASYNC=False, **REDIS_CONNECTION)
 RQ_QUEUES['ralph_async_transitions']['ASYNC'] = False
+RQ_QUEUES['ralph_async_export']['ASYNC'] = False
+RQ_QUEUES['ralph_reports']['ASYNC'] = False
 RALPH_INTERNAL_SERVICES.update({
     'JOB_TEST': {
         'queue_name': 'ralph_job_test',
@@ -1,7 +1,14 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
+
 from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+_coalesced = threading.local()
+
 
 # TODO(mkurek): make this working as a decorator, example:
 # @post_commit(MyModel)
@@ -41,6 +48,11 @@ def post_commit(func, model, signal=post_save, single_call=True):
     """
     @receiver(signal, sender=model, weak=False)
     def wrap(sender, instance, **kwargs):
+        coalesced_calls = getattr(_coalesced, 'calls', None)
+        if coalesced_calls is not None:
+            coalesced_calls[(func, sender, instance.pk)] = (func, instance)
+            return
+
         def wrapper():
             # prevent from calling the same func multiple times for single
             # instance
@@ -53,3 +65,54 @@ def post_commit(func, model, signal=post_save, single_call=True):
                 setattr(instance, called_already_attr, True)
 
         transaction.on_commit(wrapper)
+
+
+@contextmanager
+def coalesce_post_commit():
+    """
+    Coalesce post commit handlers (see `post_commit`) of objects saved in
+    the block.
+
+    Every handler is called only once for every object (with its last saved
+    state), in single on-commit callback registered at the end of the block
+    (so it's discarded when the transaction is rolled back). Handlers could
+    additionally skip work already done for another object in the same
+    callback (see `called_in_coalesced_batch`).
+    """
+    if getattr(_coalesced, 'calls', None) is not None:
+        # nested block - handlers are coalesced by the outer one
+        yield
+        return
+    calls = _coalesced.calls = OrderedDict()
+    try:
+        yield
+    finally:
+        _coalesced.calls = None
+    if calls:
+        transaction.on_commit(
+            partial(_call_coalesced_handlers, list(calls.values()))
+        )
+
+
+def _call_coalesced_handlers(calls):
+    _coalesced.called = set()
+    try:
+        for func, instance in calls:
+            func(instance)
+    finally:
+        _coalesced.called = None
+
+
+def called_in_coalesced_batch(key):
+    """
+    Return True if `key` was already handled in currently processed batch of
+    coalesced post commit handlers (otherwise mark it as handled). Outside of
+    such batch always return False.
+    """
+    called = getattr(_coalesced, 'called', None)
+    if called is None:
+        return False
+    if key in called:
+        return True
+    called.add(key)
+    return False
@@ -151,15 +151,17 @@ class AsyncOrder(
         run_after=['long_running_action']
     )
     def long_running_action_with_precondition(cls, instances, **kwargs):
-        instance = instances[0]  # only one instance in asyc action
-        instance.counter += 1
-        instance.save()
-        kwargs['shared_params'][instance.pk]['counter'] = instance.counter
-        kwargs['history_kwargs'][instance.pk]['hist_counter'] = instance.counter
-        if instance.counter < 5:
+        # many instances are passed in batched async transition
+        for instance in instances:
+            instance.counter += 1
+            instance.save()
+            kwargs['shared_params'][instance.pk]['counter'] = instance.counter
+            kwargs['history_kwargs'][instance.pk]['hist_counter'] = instance.counter  # noqa
+        if any(instance.counter < 5 for instance in instances):
             raise RescheduleAsyncTransitionActionLater()
-        instance.foo = kwargs['foo']
-        instance.save()
+        for instance in instances:
+            instance.foo = kwargs['foo']
+            instance.save()
 
     @classmethod
     @transition_action(
@@ -6,16 +6,19 @@ from enum import auto, Enum
 from functools import lru_cache
 
 from django.conf import settings
-from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.management.base import BaseCommand
 from django.db import IntegrityError, transaction
+from django.db.models import Count
 from reversion import revisions
 
 from ralph.data_center.models.physical import DataCenterAsset
+from ralph.lib.metrics import statsd
 from ralph.lib.openstack.client import (
     RalphIronicClient,
     RalphOpenStackInfrastructureClient
 )
+from ralph.networks.models import IPAddress
 from ralph.virtual.models import (
     CloudFlavor,
     CloudHost,
@@ -26,6 +29,7 @@ from ralph.virtual.models import (
 logger = logging.getLogger(__name__)
 
 DEFAULT_OPENSTACK_PROVIDER_NAME = settings.DEFAULT_OPENSTACK_PROVIDER_NAME
+METRIC_PREFIX = 'openstack_sync'
 
 
 class SynchronizationType(Enum):
@@ -34,6 +38,16 @@ class SynchronizationType(Enum):
 
 
 class RalphClient:
+    """
+    Synchronize Ralph with data fetched from OpenStack.
+
+    Ralph data (projects, flavors and servers of the provider, with IP
+    addresses of servers) is loaded with a constant number of queries and
+    compared with OpenStack data in memory. Changes of servers are applied
+    per project, in single transaction and revision.
+
+    Every applied change is saved in `diff_report`.
+    """
     def __init__(
         self, openstack_provider_name, ironic_serial_number_param,
         ralph_serial_number_param, changes_since=None
@@ -46,6 +60,12 @@ class RalphClient:
         self.ralph_serial_number_param = ralph_serial_number_param
         self.DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
         self.summary = defaultdict(int)
+        # list of (action, object type, object id, details)
+        self.diff_report = []
+        # Ralph objects, fetched at once and reused during sync
+        self._ralph_servers = {}
+        self._hypervisors = {}
+        self._projects = None
         if changes_since:
             self.summary['sync_type'] = SynchronizationType.INCREMENTAL.name
         else:
@@ -95,43 +115,89 @@ class RalphClient:
 
     def get_ralph_servers_data(self, ralph_projects):
         """Get configuration from ralph DB"""
-        for server in CloudHost.objects.filter(
-            cloudprovider=self.cloud_provider,
-        ).select_related(
+        servers = CloudHost.objects.filter(cloudprovider=self.cloud_provider)
+        # IP addresses of all servers are fetched in single query
+        ips = defaultdict(dict)
+        for base_object_id, address, hostname in IPAddress.objects.filter(
+            ethernet__base_object__in=servers.values('pk')
+        ).values_list('ethernet__base_object', 'address', 'hostname'):
+            ips[base_object_id][address] = hostname
+        for server in servers.select_related(
             'hypervisor', 'parent', 'parent__cloudproject',
         ).prefetch_related('tags'):
-            ips = dict(
-                server.ethernet_set.select_related('ipaddress').values_list(
-                    'ipaddress__address', 'ipaddress__hostname'
-                )
-            )
+            self._ralph_servers[server.host_id] = server
             new_server = {
                 'hostname': server.hostname,
                 'hypervisor': server.hypervisor,
                 'tags': server.tags.names(),
-                'ips': ips,
+                'ips': ips[server.pk],
                 'host_id': server.host_id,
             }
             host_id = server.host_id
-            project_id = server.parent.cloudproject.project_id
+            project = server.parent.cloudproject
+            project_id = project.project_id
             # workaround for projects with the same id in multiple providers
             if project_id not in ralph_projects:
-                ralph_projects[project_id] = self._get_project_info(
-                    CloudProject.objects.get(project_id=project_id)
-                )
+                ralph_projects[project_id] = self._get_project_info(project)
             ralph_projects[project_id]['servers'][host_id] = new_server
         return ralph_projects
 
-    @staticmethod
-    def _get_hypervisor(host_name, server_id):
+    def _get_ralph_server(self, server_id):
+        if server_id not in self._ralph_servers:
+            self._ralph_servers[server_id] = CloudHost.objects.get(
+                host_id=server_id
+            )
+        return self._ralph_servers[server_id]
+
+    def _load_hypervisors(self, host_names):
+        """Fetch hypervisors (DC assets) with `host_names` in single query"""
+        host_names = set(host_names) - self._hypervisors.keys()
+        assets = defaultdict(list)
+        for asset in DataCenterAsset.objects.filter(hostname__in=host_names):
+            assets[asset.hostname].append(asset)
+        for host_name in host_names:
+            # hypervisor is assigned only when it's unique
+            found = assets[host_name]
+            self._hypervisors[host_name] = (
+                found[0] if len(found) == 1 else None
+            )
+
+    def _get_hypervisor(self, host_name, server_id):
         """get or None for CloudHost hypervisor"""
-        try:
-            obj = DataCenterAsset.objects.get(hostname=host_name)
-            return obj
-        except (MultipleObjectsReturned, ObjectDoesNotExist):
+        if host_name not in self._hypervisors:
+            self._load_hypervisors([host_name])
+        hypervisor = self._hypervisors[host_name]
+        if hypervisor is None:
             logger.warning('Hypervisor %s not found for %s',
                            host_name, server_id)
-            return None
+        return hypervisor
+
+    def _get_project(self, project_id):
+        """
+        Return CloudProject with `project_id` (of any provider). All projects
+        are fetched at once.
+        """
+        if self._projects is None:
+            self._projects = defaultdict(list)
+            for project in CloudProject.objects.all():
+                self._projects[project.project_id].append(project)
+        projects = self._projects.get(project_id, [])
+        if not projects:
+            raise CloudProject.DoesNotExist(
+                'CloudProject {} does not exist'.format(project_id)
+            )
+        if len(projects) > 1:
+            raise CloudProject.MultipleObjectsReturned(
+                'Multiple CloudProjects with id {}'.format(project_id)
+            )
+        return projects[0]
+
+    def _add_project_object(self, project):
+        if self._projects is not None:
+            self._projects[project.project_id].append(project)
+
+    def _report(self, action, object_type, object_id, details=''):
+        self.diff_report.append((action, object_type, object_id, details))
 
     def match_physical_and_cloud_hosts(self):
         """Connect CloudHosts and DC assets according to data from Ironic."""
@@ -206,7 +272,7 @@ class RalphClient:
     def _add_server(self, openstack_server, server_id, project_id):
         """add new server to ralph"""
         try:
-            project = CloudProject.objects.get(project_id=project_id)
+            project = self._get_project(project_id)
         except (
             CloudProject.DoesNotExist,
             CloudProject.MultipleObjectsReturned
@@ -215,7 +281,7 @@ class RalphClient:
                 'Unable to assign project id of %s for host %s. Reason: %s',
                 project_id, openstack_server, err
             )
-            return
+            return False
         try:
             flavor = self._get_flavor_objects()[openstack_server['flavor_id']]
         except KeyError:
@@ -223,11 +289,12 @@ class RalphClient:
                 'Flavor %s not found for host %s',
                 openstack_server['flavor_id'], openstack_server
             )
-            return
+            return False
         logger.info(
             'Creating new server %s (%s)',
             server_id, openstack_server['hostname']
         )
+        self._report('add', 'server', server_id, openstack_server['hostname'])
         new_server = CloudHost(
             hostname=openstack_server['hostname'],
             cloudflavor=flavor,
@@ -244,18 +311,19 @@ class RalphClient:
         new_server.save()
         new_server.created = datetime.strptime(openstack_server['created'],
                                                self.DATETIME_FORMAT)
-        self._save_object(new_server, 'add server %s'
-                          % new_server.hostname)
+        new_server.save()
+        self._ralph_servers[server_id] = new_server
 
         new_server.tags.add(openstack_server['tag'])
-        with transaction.atomic(), revisions.create_revision():
-            new_server.ip_addresses = openstack_server['ips']
-            revisions.set_comment('Assign ip addresses to a host')
+        new_server.ip_addresses = openstack_server['ips']
+        return True
 
-    def _update_server(self, openstack_server, server_id, ralph_server):
-        """Compare and apply changes to a CloudHost"""
-        modified = False
-        obj = CloudHost.objects.get(host_id=server_id)
+    def _get_server_changes(self, openstack_server, server_id, ralph_server):
+        """
+        Compare OpenStack server with Ralph data and return dict of changes
+        (field name: new value; `tag` to add and `ips` to set).
+        """
+        obj = self._get_ralph_server(server_id)
         try:
             flavor = self._get_flavor_objects()[openstack_server['flavor_id']]
         except KeyError:
@@ -263,59 +331,57 @@ class RalphClient:
                 'Flavor %s not found for host %s',
                 openstack_server['flavor_id'], openstack_server
             )
-            return
-
-        if obj.hostname != openstack_server['hostname']:
-            logger.info('Updating hostname ({}) for {}'.format(
-                openstack_server['hostname'], server_id
-            ))
-            obj.hostname = openstack_server['hostname']
-            self._save_object(obj, 'Modify hostname')
-            modified = True
-
-        if obj.cloudflavor != flavor:
-            logger.info('Updating flavor ({}) for {}'.format(
-                flavor, server_id
-            ))
-            obj.cloudflavor = flavor
-            self._save_object(obj, 'Modify cloudflavor')
-            modified = True
-
+            return {}
         hypervisor = self._get_hypervisor(
             openstack_server['hypervisor'], server_id
         )
-        if obj.hypervisor != hypervisor:
-            logger.info('Updating hypervisor ({}) for {}'.format(
-                hypervisor, server_id
-            ))
-            obj.hypervisor = hypervisor
-            self._save_object(obj, 'Modify hypervisor')
-            modified = True
-
+        changes = {}
+        if obj.hostname != openstack_server['hostname']:
+            changes['hostname'] = openstack_server['hostname']
+        if obj.cloudflavor_id != flavor.id:
+            changes['cloudflavor'] = flavor
+        if obj.hypervisor_id != (hypervisor.id if hypervisor else None):
+            changes['hypervisor'] = hypervisor
         if obj.image_name != openstack_server['image']:
-            logger.info('Updating image ({}) for {}'.format(
-                openstack_server['image'], server_id
-            ))
-            obj.image_name = openstack_server['image']
-            self._save_object(obj, 'Updated image info')
-            modified = True
-
+            changes['image_name'] = openstack_server['image']
         if openstack_server['tag'] not in ralph_server['tags']:
-            obj.tags.add(openstack_server['tag'])
-
+            changes['tag'] = openstack_server['tag']
         # add/remove IPs
         if openstack_server['ips'] != ralph_server['ips']:
-            modified = True
-            with transaction.atomic(), revisions.create_revision():
-                obj.ip_addresses = openstack_server['ips']
-                revisions.set_comment('Assign ip addresses to a host')
-
-        return modified
+            changes['ips'] = openstack_server['ips']
+        return changes
+
+    def _update_server(self, server_id, changes):
+        """Apply changes to a CloudHost"""
+        obj = self._get_ralph_server(server_id)
+        fields = [
+            field for field in sorted(changes) if field not in ('tag', 'ips')
+        ]
+        self._report('modify', 'server', server_id, ', '.join(sorted(changes)))
+        for field in fields:
+            logger.info('Updating {} ({}) for {}'.format(
+                field, changes[field], server_id
+            ))
+            setattr(obj, field, changes[field])
+        if fields:
+            obj.save()
+        if 'tag' in changes:
+            obj.tags.add(changes['tag'])
+        if 'ips' in changes:
+            obj.ip_addresses = changes['ips']
 
     def _add_or_update_servers(
         self, openstack_project_servers, openstack_project_id, ralph_projects
     ):
-        """Add/modify servers within project"""
+        """
+        Add/modify servers within project (in single transaction and
+        revision)
+        """
+        ralph_servers = ralph_projects.get(
+            openstack_project_id, {}
+        ).get('servers', {})
+        to_add = []
+        to_update = []
         for server_id, server in openstack_project_servers.items():
             # In case of incremental sync, servers with DELETED status are
             # included in data received from Openstack. This method only
@@ -323,22 +389,29 @@ class RalphClient:
             # for server deletion (`_delete_servers`).
             if server['status'] == 'DELETED':
                 continue
-            try:
-                ralph_server = (
-                    ralph_projects[openstack_project_id]['servers'][server_id]  # noqa
-                )
-            except KeyError:
-                self._add_server(server, server_id, openstack_project_id)
-                self.summary['new_instances'] += 1
-            else:
-                modified = self._update_server(
-                    server,
-                    server_id,
-                    ralph_server,
-                )
-                if modified:
-                    self.summary['mod_instances'] += 1
             self.summary['total_instances'] += 1
+            if server_id not in ralph_servers:
+                to_add.append((server_id, server))
+                continue
+            changes = self._get_server_changes(
+                server, server_id, ralph_servers[server_id]
+            )
+            if changes:
+                to_update.append((server_id, changes))
+                # only new tag is not counted as modification
+                if changes.keys() - {'tag'}:
+                    self.summary['mod_instances'] += 1
+        if not (to_add or to_update):
+            return
+        with transaction.atomic(), revisions.create_revision():
+            revisions.set_comment(
+                'Sync servers of project {}'.format(openstack_project_id)
+            )
+            for server_id, server in to_add:
+                if self._add_server(server, server_id, openstack_project_id):
+                    self.summary['new_instances'] += 1
+            for server_id, changes in to_update:
+                self._update_server(server_id, changes)
 
     def _calculate_servers_to_delete(
         self, openstack_project_servers, openstack_project_id, ralph_projects
@@ -361,24 +434,26 @@ class RalphClient:
 
     def _delete_servers(self, servers):
         """Remove servers which no longer exists in openstack project"""
-        try:
-            for server_id in servers:
-                host = CloudHost.objects.get(host_id=server_id)
+        hosts = list(CloudHost.objects.filter(host_id__in=servers))
+        if not hosts:
+            return
+        with transaction.atomic(), revisions.create_revision():
+            revisions.set_comment('openstack_sync::_delete_servers')
+            for host in hosts:
                 logger.warning(
                     'Removing CloudHost %s (%s)',
-                    server_id, host.hostname
+                    host.host_id, host.hostname
                 )
-                self._delete_object(host)
+                self._report('delete', 'server', host.host_id, host.hostname)
+                host.delete()
                 self.summary['del_instances'] += 1
-        except (KeyError, ObjectDoesNotExist):
-            pass
 
     def _add_or_update_projects(
         self, openstack_project_data, openstack_project_id, ralph_projects
     ):
         """Add/modify project in ralph"""
         if openstack_project_id in ralph_projects.keys():
-            project = CloudProject.objects.get(project_id=openstack_project_id)
+            project = self._get_project(openstack_project_id)
             ralph_project = ralph_projects[openstack_project_id]
             modified = False
             if ralph_project['name'] != openstack_project_data['name']:
@@ -395,6 +470,9 @@ class RalphClient:
                 for tag in openstack_project_data['tags']:
                     project.tags.add(tag)
             if modified:
+                self._report(
+                    'modify', 'project', openstack_project_id, project.name
+                )
                 self.summary['mod_projects'] += 1
         else:
             self.summary['new_projects'] += 1
@@ -403,17 +481,17 @@ class RalphClient:
                 project_id=openstack_project_id,
                 cloudprovider=self.cloud_provider,
             )
+            self._report('add', 'project', openstack_project_id, project.name)
             try:
                 with transaction.atomic():
                     self._save_object(project, 'Add project %s' % project.name)
+                self._add_project_object(project)
             except IntegrityError:
                 logger.warning(
                     'Duplicated project ID (%s) for project %s',
                     project.project_id, project.name
                 )
-                project = CloudProject.objects.get(
-                    project_id=openstack_project_id
-                )
+                project = self._get_project(openstack_project_id)
             for tag in openstack_project_data['tags']:
                 project.tags.add(tag)
         self.summary['total_projects'] += 1
@@ -431,6 +509,7 @@ class RalphClient:
             for component in ['cores', 'memory', 'disk']:
                 setattr(new_flavor, component, flavor[component])
 
+            self._report('add', 'flavor', flavor_id, flavor['name'])
             self.summary['new_flavors'] += 1
         else:
             mod = False
@@ -453,6 +532,7 @@ class RalphClient:
                         mod = True
 
             if mod:
+                self._report('modify', 'flavor', flavor_id, flavor['name'])
                 self.summary['mod_flavors'] += 1
         self.summary['total_flavors'] += 1
 
@@ -462,6 +542,12 @@ class RalphClient:
     ):
         """Update existing and add new ralph data"""
         logger.info('Updating Ralph entries')
+        # all hypervisors are fetched at once
+        self._load_hypervisors(
+            server['hypervisor']
+            for project in openstack_projects.values()
+            for server in project['servers'].values()
+        )
         for flavor_id in openstack_flavors:
             self._add_or_modify_flavours(
                 openstack_flavors[flavor_id], flavor_id, ralph_flavors
@@ -507,21 +593,20 @@ class RalphClient:
         ralph.
         """
         self._delete_servers(servers_to_delete)
-        for project_id in (set(ralph_projects.keys()) - set(
-            openstack_projects.keys())
-        ):
-            cloud_project = CloudProject.objects.get(
-                project_id=project_id,
-                cloudprovider=self.cloud_provider
-            )
-            if not cloud_project:
-                continue
-            children_count = cloud_project.children.count()
+        cloud_projects = CloudProject.objects.filter(
+            project_id__in=set(ralph_projects) - set(openstack_projects),
+            cloudprovider=self.cloud_provider
+        ).annotate(children_count=Count('children'))
+        for cloud_project in cloud_projects:
             logger_extras = {
                 'cloud_project_name': cloud_project.name,
                 'cloud_project_id': cloud_project.id
             }
-            if children_count == 0:
+            if cloud_project.children_count == 0:
+                self._report(
+                    'delete', 'project', cloud_project.project_id,
+                    cloud_project.name
+                )
                 self._delete_object(cloud_project)
                 logger.debug(
                     'Deleted Cloud Project (name: {}, id: {})'.format(
@@ -537,14 +622,16 @@ class RalphClient:
                     'because it has %s children',
                     cloud_project.name,
                     cloud_project.id,
-                    children_count,
+                    cloud_project.children_count,
                     extra=logger_extras
                 )
 
-        for del_flavor in (set(ralph_flavors) - set(openstack_flavors)):
-            flavor = CloudFlavor.objects.get(flavor_id=del_flavor)
-            assignment_count = flavor.cloudhost_set.count()
-            if assignment_count:
+        flavors = CloudFlavor.objects.filter(
+            flavor_id__in=set(ralph_flavors) - set(openstack_flavors),
+            cloudprovider=self.cloud_provider
+        ).annotate(assignment_count=Count('cloudhost'))
+        for flavor in flavors:
+            if flavor.assignment_count:
                 logger_extras = {
                     'cloud_flavor_name': flavor.name,
                     'cloud_flavor_id': flavor.flavor_id
@@ -554,13 +641,12 @@ class RalphClient:
                     'because it is assigned to %s cloud hosts.',
                     flavor.name,
                     flavor.flavor_id,
-                    assignment_count,
+                    flavor.assignment_count,
                     extra=logger_extras
                 )
             else:
-                self._delete_object(CloudFlavor.objects.get(
-                    flavor_id=del_flavor)
-                )
+                self._report('delete', 'flavor', flavor.flavor_id, flavor.name)
+                self._delete_object(flavor)
                 self.summary['del_flavors'] += 1
 
     @staticmethod
@@ -612,6 +698,19 @@ class RalphClient:
         stdout.write(msg)
         logger.info(msg)
 
+    def print_diff_report(self, stdout):
+        """Print changes made (or to be made in dry run) by sync"""
+        for action, object_type, object_id, details in self.diff_report:
+            stdout.write('{:<8}{:<9}{} {}'.format(
+                action, object_type, object_id, details
+            ).rstrip())
+        stdout.write('{} changes'.format(len(self.diff_report)))
+
+    def send_metrics(self):
+        for key, value in self.summary.items():
+            if isinstance(value, int):
+                statsd.gauge('{}.{}'.format(METRIC_PREFIX, key), value)
+
 
 class Command(BaseCommand):
     def add_arguments(self, parser):
@@ -645,6 +744,11 @@ class Command(BaseCommand):
             help="Synchronize only most recent changes. Specify number of "
                  "minutes to go back in time. 0 means synchronize everything."
         )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print changes which would be made, without saving them'
+        )
 
     def handle(self, *args, **options):
         try:
@@ -669,18 +773,49 @@ class Command(BaseCommand):
                 }
 
             # Fetch data from Openstack
-            openstack = RalphOpenStackInfrastructureClient(
-                openstack_provider_name
-            )
-            openstack_flavors = openstack.get_openstack_flavors()
-            openstack_projects = openstack.get_openstack_projects()
-            openstack_projects, openstack_flavors = \
-                openstack.get_openstack_instances_data(
-                    openstack_projects, openstack_flavors,
-                    openstack_search_options
+            with statsd.timer(METRIC_PREFIX + '.fetch_openstack'):
+                openstack = RalphOpenStackInfrastructureClient(
+                    openstack_provider_name
                 )
+                openstack_flavors = openstack.get_openstack_flavors()
+                openstack_projects = openstack.get_openstack_projects()
+                openstack_projects, openstack_flavors = \
+                    openstack.get_openstack_instances_data(
+                        openstack_projects, openstack_flavors,
+                        openstack_search_options
+                    )
+
+            sync_args = (
+                openstack_projects, openstack_flavors,
+                openstack_provider_name, ironic_serial_number_param,
+                ralph_serial_number_param, changes_since, match_ironic
+            )
+            if options['dry_run']:
+                with transaction.atomic():
+                    ralph = self._sync(*sync_args)
+                    # every change is rolled back
+                    transaction.set_rollback(True)
+            else:
+                ralph = self._sync(*sync_args)
+
+            # Print summary
+            if options['dry_run']:
+                ralph.print_diff_report(self.stdout)
+            else:
+                ralph.send_metrics()
+            ralph.print_summary(self.stdout)
+        except Exception as err:
+            logger.exception(
+                'Openstack sync failed with error: {}'.format(err)
+            )
 
-            # Fetch data from Ralph
+    def _sync(
+        self, openstack_projects, openstack_flavors, openstack_provider_name,
+        ironic_serial_number_param, ralph_serial_number_param, changes_since,
+        match_ironic
+    ):
+        # Fetch data from Ralph
+        with statsd.timer(METRIC_PREFIX + '.fetch_ralph'):
             ralph = RalphClient(
                 openstack_provider_name, ironic_serial_number_param,
                 ralph_serial_number_param, changes_since
@@ -689,15 +824,18 @@ class Command(BaseCommand):
             ralph_flavors = ralph.get_ralph_flavors()
             ralph_projects = ralph.get_ralph_servers_data(ralph_projects)
 
-            # Add and update data in Ralph
+        # Add and update data in Ralph
+        with statsd.timer(METRIC_PREFIX + '.update'):
             ralph.perform_update(
                 openstack_projects, openstack_flavors, ralph_projects,
                 ralph_flavors
             )
-            if match_ironic:
+        if match_ironic:
+            with statsd.timer(METRIC_PREFIX + '.match_ironic'):
                 ralph.match_physical_and_cloud_hosts()
 
-            # Delete data in Ralph
+        # Delete data in Ralph
+        with statsd.timer(METRIC_PREFIX + '.delete'):
             servers_to_delete = ralph.calculate_servers_to_delete(
                 openstack_projects, ralph_projects,
                 incremental=bool(changes_since)
@@ -706,10 +844,4 @@ class Command(BaseCommand):
                 openstack_projects, openstack_flavors, ralph_projects,
                 ralph_flavors, servers_to_delete
             )
-
-            # Print summary
-            ralph.print_summary(self.stdout)
-        except Exception as err:
-            logger.exception(
-                'Openstack sync failed with error: {}'.format(err)
-            )
+        return ralph
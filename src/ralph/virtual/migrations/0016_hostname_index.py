@@ -0,0 +1,18 @@
+# Generated by Django 2.0.13 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('virtual', '0015_auto_20240621_1217'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cloudhost',
+            name='hostname',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='hostname'),
+        ),
+    ]
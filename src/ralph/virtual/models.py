@@ -3,10 +3,12 @@ import logging
 from collections import OrderedDict
 
 from dj.choices import Choices
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import connection, models, transaction
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 from django_cryptography.fields import encrypt
@@ -23,6 +25,8 @@ from ralph.data_center.models.physical import (
 )
 from ralph.data_center.models.virtual import Cluster
 from ralph.data_center.publishers import publish_host_update
+from ralph.dhcp.snapshots import invalidate_snapshots
+from ralph.helpers import bulk_update
 from ralph.lib.mixins.fields import NullableCharField
 from ralph.lib.mixins.models import (
     AdminAbsoluteUrlMixin,
@@ -30,6 +34,7 @@ from ralph.lib.mixins.models import (
     PreviousStateMixin,
     TimeStampMixin
 )
+from ralph.lib.network.resolver import resolver
 from ralph.lib.transitions.fields import TransitionField
 from ralph.networks.models.networks import IPAddress
 from ralph.signals import post_commit
@@ -218,7 +223,8 @@ class CloudHost(PreviousStateMixin,
     )
     hostname = models.CharField(
         verbose_name=_('hostname'),
-        max_length=255
+        max_length=255,
+        db_index=True,
     )
     hypervisor = models.ForeignKey(DataCenterAsset, blank=True, null=True, on_delete=models.CASCADE)
     image_name = models.CharField(max_length=255, null=True, blank=True)
@@ -255,48 +261,128 @@ class CloudHost(PreviousStateMixin,
     def ip_addresses(self, value):
         # value is a list (of ips) or dict (of ip:hostname pairs)
         # when value is a dict, set will work on keys only
-        for ip in set(value) - set(self.ip_addresses):
-            try:
-                new_ip = IPAddress.objects.get(address=ip)
-                if new_ip.base_object is None:
-                    new_ip.base_object = self
-                    new_ip.save()
-                else:
-                    logger.warning(
-                        'Cannot assign IP %s to %s - it is already in use by '
-                        'another asset',
-                        ip, self.hostname
-                    )
-            except ObjectDoesNotExist:
-                logger.info('Creating new IP {} for {}'.format(ip, self))
-                new_ip = IPAddress(
-                    ethernet=Ethernet.objects.create(base_object=self),
-                    address=ip
+        # changes are computed in memory (from IPs fetched at once) and
+        # saved in bulk
+        hostnames = value if isinstance(value, dict) else {}
+        current = dict(self.ethernet_set.filter(
+            ipaddress__isnull=False
+        ).values_list('ipaddress__address', 'pk'))
+        ips = {
+            ip.address: ip
+            for ip in IPAddress.objects.filter(
+                address__in=set(value)
+            ).select_related('ethernet')
+        }
+        to_create = []
+        to_assign = []
+        for address in set(value) - set(current):
+            ip = ips.get(address)
+            if ip is None:
+                logger.info('Creating new IP {} for {}'.format(address, self))
+                to_create.append(IPAddress(
+                    address=address, hostname=hostnames.get(address)
+                ))
+            elif ip.base_object is None:
+                to_assign.append(ip)
+            else:
+                logger.warning(
+                    'Cannot assign IP %s to %s - it is already in use by '
+                    'another asset',
+                    address, self.hostname
                 )
-                new_ip.save()
+        self._assign_ips(to_assign, hostnames)
+        self._create_ips(to_create, hostnames)
         # refresh hostnames
-        if isinstance(value, dict):
-            for address, hostname in value.items():
-                try:
-                    ip = IPAddress.objects.get(address=address)
-                except IPAddress.DoesNotExist:
-                    logger.debug('IP {} not found'.format(address))
-                else:
-                    if ip.hostname != hostname:
-                        logger.info(
-                            'Setting {} for IP {} (previous value: {})'.format(
-                                hostname, address, ip.hostname
-                            )
-                        )
-                        ip.hostname = hostname
-                        ip.save()
-
-        to_delete = set(self.ip_addresses) - set(value)
+        hostname_updates = {}
+        for address, hostname in hostnames.items():
+            ip = ips.get(address)
+            if ip is None:
+                logger.debug('IP {} not found'.format(address))
+            elif ip.hostname != hostname:
+                logger.info(
+                    'Setting {} for IP {} (previous value: {})'.format(
+                        hostname, address, ip.hostname
+                    )
+                )
+                hostname_updates[ip.pk] = {
+                    'hostname': hostname, 'modified': timezone.now()
+                }
+                ip.hostname = hostname
+        if (
+            settings.ENABLE_DNSAAS_INTEGRATION and
+            settings.DNSAAS_AUTO_UPDATE_HOST_DNS
+        ):
+            # DNS records (of IPs of other assets) are updated on IP save
+            for ip in ips.values():
+                if ip.pk in hostname_updates:
+                    ip.save(update_fields=['hostname', 'modified'])
+        else:
+            bulk_update(IPAddress.objects.all(), hostname_updates)
+
+        to_delete = set(current) - set(value)
         for ip in to_delete:
             logger.warning('Deleting %s from %s', ip, self)
-        Ethernet.objects.filter(
-            base_object=self, ipaddress__address__in=to_delete
-        ).delete()
+        if to_delete:
+            Ethernet.objects.filter(
+                pk__in=[current[address] for address in to_delete]
+            ).delete()
+        # bulk writes don't send save signals, so DHCP config snapshots
+        # (which could include changed IPs, also of other assets) are
+        # invalidated explicitly
+        if to_assign or to_create or hostname_updates or to_delete:
+            transaction.on_commit(invalidate_snapshots)
+
+    def _create_ethernets(self, count):
+        ethernets = [Ethernet(base_object=self) for i in range(count)]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Ethernet.objects.bulk_create(ethernets)
+        else:
+            # primary keys are not set by bulk_create
+            for ethernet in ethernets:
+                ethernet.save()
+        return ethernets
+
+    def _assign_ips(self, ips, hostnames):
+        """Assign existing (not used, so without ethernet) IPs to this host"""
+        ethernets = self._create_ethernets(len(ips))
+        bulk_update(IPAddress.objects.all(), {
+            ip.pk: {'ethernet': ethernet.pk, 'modified': timezone.now()}
+            for ip, ethernet in zip(ips, ethernets)
+        })
+        # hostname is resolved for IPs without one (as on IP save), unless
+        # it's passed explicitly
+        unresolved = [
+            ip for ip in ips
+            if not ip.hostname and ip.address not in hostnames
+        ]
+        if unresolved and settings.CHECK_IP_HOSTNAME_ON_SAVE:
+            resolved = resolver.resolve_many(ip.address for ip in unresolved)
+            for ip in unresolved:
+                ip.hostname = resolved[ip.address]
+            bulk_update(IPAddress.objects.all(), {
+                ip.pk: {'hostname': ip.hostname}
+                for ip in unresolved if ip.hostname
+            })
+
+    def _create_ips(self, ips, hostnames):
+        """Create new IPs (with network resolved at once) for this host"""
+        if not ips:
+            return
+        if settings.CHECK_IP_HOSTNAME_ON_SAVE:
+            resolved = resolver.resolve_many(
+                ip.address for ip in ips if ip.address not in hostnames
+            )
+            for ip in ips:
+                if ip.address in resolved:
+                    ip.hostname = resolved[ip.address]
+        for ip in ips:
+            ip.number = int(ip.ip)
+            ip.is_public = not ip.ip.is_private
+        networks = IPAddress.get_networks_ids(ip.number for ip in ips)
+        for ip, ethernet in zip(ips, self._create_ethernets(len(ips))):
+            ip.ethernet = ethernet
+            ip.network_id = networks[ip.number]
+        IPAddress.objects.bulk_create(ips)
 
     @property
     def cloudproject(self):
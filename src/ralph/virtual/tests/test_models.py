@@ -1,6 +1,8 @@
 from datetime import datetime
+from unittest import mock
 
 from ddt import data, ddt, unpack
+from django.test import override_settings
 
 from ralph.assets.models.assets import ServiceEnvironment
 from ralph.assets.models.choices import ComponentType
@@ -14,6 +16,7 @@ from ralph.data_center.tests.factories import (
     DataCenterAssetFullFactory,
     RackFactory
 )
+from ralph.dhcp.snapshots import invalidate_snapshots
 from ralph.lib.custom_fields.models import (
     CustomField,
     CustomFieldTypes,
@@ -170,6 +173,57 @@ class OpenstackModelsTestCase(RalphTestCase):
         )
         self.assertEqual(set(self.cloud_host.ip_addresses), set(ip_addresses2))
 
+    def test_ip_addresses_setter_assigns_network(self):
+        network = NetworkFactory(address='10.20.0.0/24')
+        self.cloud_host.ip_addresses = ['10.20.0.5', '10.30.0.5']
+        self.assertEqual(
+            IPAddress.objects.get(address='10.20.0.5').network, network
+        )
+        self.assertIsNone(IPAddress.objects.get(address='10.30.0.5').network)
+
+    def test_ip_addresses_setter_with_existing_ips(self):
+        free_ip = IPAddress.objects.create(address='10.0.0.1')
+        other_host = CloudHostFactory(host_id='other_host_id')
+        used_ip = IPAddress.objects.create(
+            address='10.0.0.2', base_object=other_host
+        )
+        with self.assertLogs('ralph.virtual.models', 'WARNING') as logs:
+            self.cloud_host.ip_addresses = {
+                '10.0.0.1': 'hostname1.mydc.net',
+                '10.0.0.2': 'hostname2.mydc.net',
+            }
+        self.assertIn('already in use by another asset', logs.output[0])
+        self.assertEqual(set(self.cloud_host.ip_addresses), {'10.0.0.1'})
+        free_ip.refresh_from_db()
+        self.assertEqual(free_ip.base_object.pk, self.cloud_host.pk)
+        self.assertEqual(free_ip.hostname, 'hostname1.mydc.net')
+        used_ip.refresh_from_db()
+        self.assertEqual(used_ip.base_object.pk, other_host.pk)
+
+    @mock.patch('ralph.virtual.models.transaction.on_commit')
+    def test_ip_addresses_setter_invalidates_dhcp_snapshots(self, on_commit):
+        self.cloud_host.ip_addresses = ['10.20.0.5']
+        on_commit.assert_any_call(invalidate_snapshots)
+        on_commit.reset_mock()
+        # nothing changed
+        self.cloud_host.ip_addresses = ['10.20.0.5']
+        self.assertNotIn(mock.call(invalidate_snapshots), on_commit.mock_calls)
+
+    @override_settings(
+        ENABLE_DNSAAS_INTEGRATION=True, DNSAAS_AUTO_UPDATE_HOST_DNS=True
+    )
+    def test_ip_addresses_setter_saves_hostnames_with_dnsaas(self):
+        other_host = CloudHostFactory(host_id='other_host_id')
+        IPAddress.objects.create(
+            address='10.0.0.2', base_object=other_host, hostname='old.net'
+        )
+        with mock.patch.object(IPAddress, 'save') as save_mock:
+            self.cloud_host.ip_addresses = {'10.0.0.2': 'new.net'}
+        # IP of another asset is saved (with signals updating DNS records)
+        save_mock.assert_called_once_with(
+            update_fields=['hostname', 'modified']
+        )
+
     def test_service_env_inheritance_on_project_change(self):
         self.cloud_project.service_env = self.service_env[0]
         self.cloud_project.save()
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 from copy import copy
 from datetime import datetime
+from io import StringIO
 
 import mock
 from django.core.exceptions import ObjectDoesNotExist
-from django.test.utils import override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from reversion.models import Revision
 
 from ralph.assets.models.components import ComponentModel
 from ralph.assets.tests.factories import DataCenterAssetModelFactory
@@ -534,3 +538,92 @@ class TestOpenstackSync(RalphTestCase):
             self.host.host_id,
             ralph_projects_with_servers[self.cloud_project_1.project_id]['servers'].keys()
         )
+
+    def test_get_ralph_servers_data_queries_count_is_constant(self):
+        def count_queries():
+            client = RalphClient(
+                'openstack', self.ironic_serial_number_param,
+                self.ralph_serial_number_param
+            )
+            with CaptureQueriesContext(connection) as context:
+                client.get_ralph_servers_data(client.get_ralph_projects())
+            return len(context.captured_queries)
+
+        queries_count = count_queries()
+        for i in range(3):
+            host = CloudHostFactory(parent=self.cloud_project_2)
+            IPAddress.objects.create(
+                base_object=host, address='10.0.0.{}'.format(i)
+            )
+        self.assertEqual(count_queries(), queries_count)
+
+    def test_servers_of_project_are_saved_in_single_revision(self):
+        ralph_projects = self.ralph_client.get_ralph_servers_data(
+            self.ralph_client.get_ralph_projects()
+        )
+        revisions_count = Revision.objects.count()
+        self.ralph_client._add_or_update_servers(
+            OPENSTACK_INSTANCES, self.cloud_project_1.project_id, ralph_projects
+        )
+        self.assertEqual(Revision.objects.count(), revisions_count + 1)
+        self.assertEqual(self.ralph_client.summary['new_instances'], 2)
+        self.assertIn(
+            ('add', 'server', 'host_os_id1', 'host_test_1'),
+            self.ralph_client.diff_report
+        )
+        modified = [
+            details for action, _, object_id, details
+            in self.ralph_client.diff_report
+            if action == 'modify' and object_id == 'host_id1'
+        ]
+        self.assertEqual(len(modified), 1)
+        self.assertIn('hostname', modified[0])
+
+    @mock.patch(
+        'ralph.virtual.management.commands.openstack_sync.'
+        'RalphOpenStackInfrastructureClient'
+    )
+    def test_dry_run_does_not_change_anything(self, client_mock):
+        client_mock.return_value.get_openstack_instances_data.return_value = (
+            OPENSTACK_DATA, OPENSTACK_FLAVORS
+        )
+        hosts = set(CloudHost.objects.values_list('host_id', 'hostname'))
+        projects_count = CloudProject.objects.count()
+        out = StringIO()
+        with override_settings(OPENSTACK_INSTANCES=[]):
+            call_command('openstack_sync', dry_run=True, stdout=out)
+        self.assertEqual(
+            set(CloudHost.objects.values_list('host_id', 'hostname')), hosts
+        )
+        self.assertEqual(CloudProject.objects.count(), projects_count)
+        self.assertIn('add     project  project_os_id2', out.getvalue())
+        self.assertIn('add     server   host_os_2', out.getvalue())
+
+
+class TestOpenStackInstancesData(RalphTestCase):
+    @mock.patch('ralph.lib.openstack.client.resolver')
+    def test_hostnames_of_all_servers_are_resolved_at_once(
+        self, resolver_mock
+    ):
+        resolver_mock.resolve_many.return_value = {
+            '10.0.0.1': None,
+            '10.0.0.2': 'host-2.local',
+            '10.0.0.3': None,
+        }
+        server_1 = {'id': '1', 'hostname': None, 'ips': {
+            '10.0.0.1': None, '10.0.0.2': None
+        }}
+        server_2 = {'id': '2', 'hostname': None, 'ips': {'10.0.0.3': None}}
+        RalphOpenStackInfrastructureClient._resolve_hostnames([
+            (server_1, 'server-1'), (server_2, 'server-2'),
+        ])
+
+        self.assertEqual(resolver_mock.resolve_many.call_count, 1)
+        self.assertEqual(
+            sorted(resolver_mock.resolve_many.call_args[0][0]),
+            ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+        )
+        self.assertEqual(server_1['hostname'], 'host-2.local')
+        self.assertEqual(server_1['ips']['10.0.0.2'], 'host-2.local')
+        # fallback to server name
+        self.assertEqual(server_2['hostname'], 'server-2')